@@ -1,8 +1,8 @@
 import warnings
 import pytest
 from unittest.mock import patch
-from sqlmodel import create_engine
-from dundie import models
+from dundie.database import clone_database, make_engine
+from dundie.utils.user import set_password_profile
 from sqlalchemy.exc import SAWarning
 
 
@@ -20,6 +20,7 @@ low: Mark low priority tests
 def pytest_configure(config):
     for line in MARKER.split("\n"):
         config.addinivalue_line("markers", line)
+    set_password_profile("fast")
 
 
 @pytest.fixture(autouse=True)
@@ -29,15 +30,24 @@ def go_to_tmpdir(request):  # injecao de dependencias
         yield  # protocolo de generators
 
 
+@pytest.fixture(scope="session")
+def template_database(tmp_path_factory):
+    """Create the tables once, in a database cloned by every test."""
+    template_db = str(tmp_path_factory.mktemp("template") / "database.db")
+    make_engine(f"sqlite:///{template_db}").dispose()
+    return template_db
+
+
 @pytest.fixture(autouse=True, scope="function")
-def setup_testing_database(request):
-    """For each test, create a database file on tmpdir.
+def setup_testing_database(request, template_database):
+    """For each test, clone the template database on tmpdir.
     Force database.py to use that filepath.
     """
     tmpdir = request.getfixturevalue("tmpdir")
     test_db = str(tmpdir.join("database.test.db"))
+    clone_database(template_database, test_db)
 
-    engine = create_engine(f"sqlite:///{test_db}")
-    models.SQLModel.metadata.create_all(engine)
+    engine = make_engine(f"sqlite:///{test_db}", create_tables=False)
     with patch("dundie.database.engine", engine):
         yield
+    engine.dispose()
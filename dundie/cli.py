@@ -14,14 +14,26 @@ Employees can:
 """
 
 import json
+import os
+from collections import Counter
+from contextlib import nullcontext
+from functools import lru_cache
 
-import pkg_resources
 import rich_click as click
 from rich.console import Console
 from rich.table import Table
 
-from dundie import core
-from typing import Any, Dict
+from dundie.client import RemoteCore, connect
+from dundie.settings import (
+    BUCKETS,
+    RATES_SNAPSHOT,
+    READ_PAGE_SIZE,
+    SERVER_RATES_TTL,
+    SERVER_SOCKET,
+)
+from dundie.utils.output import FORMATS, print_rows, to_json
+from dundie.utils.rows import jsonable
+from typing import Any, Dict, Iterator
 
 click.rich_click.USE_RICH_MARKUP = True
 click.rich_click.USE_MARKDOWN = True
@@ -33,8 +45,43 @@ click.rich_click.APPEND_METAVARS_HELP = True
 Query = Dict[str, Any]
 
 
+@lru_cache(maxsize=None)
+def get_core() -> Any:
+    """Returns the core that runs the commands.
+
+    The database stack is only imported when DUNDIE_SERVER is not set, so the
+    commands sent to a server do not pay for importing it.
+
+    Returns:
+        Any: A `RemoteCore` of the server, or the `dundie.core` module.
+    """
+    remote = connect()
+    if remote is not None:
+        return remote
+
+    from dundie import core
+
+    return core
+
+
+def unit_of_work() -> Any:
+    """Returns a unit of work of the local core, or a no-op for a server."""
+    if isinstance(get_core(), RemoteCore):
+        return nullcontext()
+
+    from dundie.database import unit_of_work
+
+    return unit_of_work()
+
+
+format_option = click.option(
+    "--format", "fmt", type=click.Choice(FORMATS), default="table"
+)
+idempotency_option = click.option("--idempotency-key", default=None)
+
+
 @click.group()
-@click.version_option(pkg_resources.get_distribution("dundie").version)
+@click.version_option(package_name="dundie")
 def main() -> None:
     """Dundie Mifflin Rewards System CLI
 
@@ -54,7 +101,19 @@ def main() -> None:
 
 @main.command()
 @click.argument("filepath", type=click.Path(exists=True))
-def load(filepath: str) -> None:
+@click.option("--passwords-file", default=None)
+@click.option("--per-run", is_flag=True, default=False)
+@click.option("--delta", is_flag=True, default=False)
+@click.option("--dry-run", is_flag=True, default=False)
+@format_option
+def load(
+    filepath: str,
+    passwords_file: str,
+    per_run: bool,
+    delta: bool,
+    dry_run: bool,
+    fmt: str,
+) -> None:
     """Load employee data from a CSV file into the SQLite database.
 
     This command performs the following steps:
@@ -71,29 +130,98 @@ def load(filepath: str) -> None:
 
     Args:
         filepath (str): The file path to the CSV file.
+        passwords_file (str): (Optional) File receiving the generated passwords.
+        per_run (bool): (Optional) Write the generated passwords to a new
+            timestamped file for this run.
+        delta (bool): (Optional) Only write the rows that are new or changed
+            since the last load and display a summary of the changes.
+        dry_run (bool): (Optional) Only display the new and changed employees
+            and a summary, without writing anything.
+        fmt (str): (Optional) Output format of --dry-run: table (default),
+            plain, tsv or jsonl.
 
     Returns:
         None
     """
+    if dry_run:
+        statuses = Counter()
+        result = get_core().load_diff(filepath=os.path.abspath(filepath))
+        print_rows(
+            _count_changes(result, statuses),
+            fmt,
+            title="Dundler Mifflin Load Preview",
+        )
+        if fmt in ("table", "plain"):
+            Console().print(_load_summary(statuses))
+        return
+
     table = Table(title="Dundler Mifflin Employees")
     headers = ["email", "name", "dept", "role", "currency", "created"]
+    if delta:
+        headers.append("status")
 
     for header in headers:
         table.add_column(header, style="cyan")
 
-    result = core.load(filepath)
+    if passwords_file:
+        passwords_file = os.path.abspath(passwords_file)
+
+    result, errors = get_core().load(
+        filepath=os.path.abspath(filepath),
+        passwords_file=passwords_file,
+        per_run=per_run,
+        delta=delta,
+    )
+    for line, message in errors:
+        print(f"Line {line}: {message}")
+
     for person in result:
+        if delta and person["status"] == "unchanged":
+            continue
         table.add_row(*[str(value) for value in person.values()])
 
     console = Console()
     console.print(table)
 
+    if delta:
+        console.print(
+            _load_summary(Counter(person["status"] for person in result))
+        )
+
+
+def _load_summary(statuses: Counter) -> str:
+    summary = (
+        f"{statuses['new']} new, {statuses['changed']} changed, "
+        f"{statuses['unchanged']} unchanged"
+    )
+    if statuses["invalid"]:
+        summary += f", {statuses['invalid']} invalid"
+    return f"{summary}."
+
+
+def _count_changes(rows: Iterator[Dict], statuses: Counter) -> Iterator[Dict]:
+    for row in rows:
+        statuses[row["status"]] += 1
+        if row["status"] != "unchanged":
+            yield row
+
 
 @main.command()
 @click.option("--dept", required=False)
 @click.option("--email", required=False)
 @click.option("--output", default=None)
-def show(output, **query: Query) -> None:
+@format_option
+@click.option("--page-size", type=click.IntRange(min=1), default=None)
+@click.option("--cursor", default=None)
+@click.option("--order-by", type=click.Choice(["id", "dept"]), default="id")
+def show(
+    output,
+    fmt: str,
+    page_size: int,
+    cursor: str,
+    order_by: str,
+    **query: Query,
+) -> None:
     """Display employees and their account balances.
 
     Managers can filter the results by department and email. Employees, however,
@@ -102,52 +230,83 @@ def show(output, **query: Query) -> None:
     Args:
         output (str): (Optional) Path to the output file. If provided, the results
             are saved to this file.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+            The non-table formats print the rows as they are read.
+        page_size (int): (Optional) Number of employees per page.
+        cursor (str): (Optional) Cursor printed with the previous page.
+        order_by (str): (Optional) Sort by 'id' (default) or 'dept' and email.
         dept (str): (Optional) Department name to filter by.
         email (str): (Optional) Employee email address to filter by.
 
     Returns:
         None
     """
-    result = core.read(**query)
-
-    if output:
-        with open(output, "w") as output_file:
-            output_file.write(json.dumps(result, indent=4))
-        return
-
-    if not result:
-        print("No results found.")
-
-    table = Table(title="Dundler Mifflin Report")
-    for key in result[0]:
-        table.add_column(key.title(), style="cyan")
-
-    for person in result:
-        person["value"] = f"{person['value']:.2f}"
-        person["balance"] = f"{person['balance']:.2f}"
-        table.add_row(*[str(value) for value in person.values()])
-
-    console = Console()
-    console.print(table)
+    next_cursor = None
+    get_core().refresh_rates()
+    with unit_of_work():
+        if page_size is None:
+            result = _read_all(order_by, cursor, **query)
+        else:
+            result, next_cursor = get_core().read_page(
+                limit=page_size,
+                order_by=order_by,
+                cursor=cursor,
+                refresh=False,
+                **query,
+            )
+
+        if output:
+            with open(output, "w") as output_file:
+                output_file.write(
+                    json.dumps(
+                        jsonable(list(result)), indent=4, default=to_json
+                    )
+                )
+        else:
+            print_rows(
+                result,
+                fmt,
+                title="Dundler Mifflin Report",
+                decimals=("value", "balance"),
+            )
+
+    if next_cursor:
+        click.echo(f"Next page: --cursor {next_cursor}", err=True)
+
+
+def _read_all(order_by: str, cursor: str, **query: Query) -> Iterator[Dict]:
+    while True:
+        result, cursor = get_core().read_page(
+            limit=READ_PAGE_SIZE,
+            order_by=order_by,
+            cursor=cursor,
+            refresh=False,
+            **query,
+        )
+        yield from result
+        if cursor is None:
+            return
 
 
 @main.command()
 @click.argument("value", type=click.INT, required=True)
 @click.option("--dept", required=False)
 @click.option("--email", required=False)
+@idempotency_option
 @click.pass_context
-def add(ctx, value: int, **query: Query) -> None:
+def add(ctx, value: int, idempotency_key: str, **query: Query) -> None:
     """Add points to one or more employees or departments.
 
     Args:
         value (int): The number of points to add.
         dept (str): (Optional) Department name to which points should be added.
         email (str): (Optional) Email address of the employee to receive the points.
+        idempotency_key (str): (Optional) Key making retries of the command safe.
 
     Returns:
         None
     """
-    core.add(value, **query)
+    get_core().add(value=value, idempotency_key=idempotency_key, **query)
     ctx.invoke(show, **query)
 
 
@@ -155,63 +314,346 @@ def add(ctx, value: int, **query: Query) -> None:
 @click.argument("value", type=click.INT, required=True)
 @click.option("--dept", required=False)
 @click.option("--email", required=False)
+@idempotency_option
 @click.pass_context
-def remove(ctx, value: int, **query: Query) -> None:
+def remove(ctx, value: int, idempotency_key: str, **query: Query) -> None:
     """Remove points from one or more employees or departments.
 
     Args:
         value (int): The number of points to remove.
         dept (str): (Optional) Department name from which points should be removed.
         email (str): (Optional) Email address of the employee from whom points should be removed.
+        idempotency_key (str): (Optional) Key making retries of the command safe.
 
     Returns:
         None
     """
-    core.add(-value, **query)
+    get_core().add(value=-value, idempotency_key=idempotency_key, **query)
     ctx.invoke(show, **query)
 
 
 @main.command()
 @click.option("--value", type=click.INT, required=True)
 @click.option("--to", required=True)
-def transfer(value: int, to: str) -> None:
+@idempotency_option
+def transfer(value: int, to: str, idempotency_key: str) -> None:
     """Transfer points between employees.
 
     Args:
         value (int): The number of points to transfer.
         to (str): The email address of the employee who will receive the points.
+        idempotency_key (str): (Optional) Key making retries of the command safe.
 
     Returns:
         None
     """
-    core.transfer(value, to)
+    outcome = get_core().transfer(
+        value=value, to_person=to, idempotency_key=idempotency_key
+    )
+    print(
+        f"Success! You have transfered {outcome['value']} points from "
+        f"your balance to {outcome['name']}."
+    )
 
 
 @main.command()
+@click.option("--archived", is_flag=True, default=False)
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--actor", required=False)
+@click.option("--dept", required=False)
+@click.option("--email", required=False)
+@format_option
 @click.pass_context
-def movements(ctx) -> None:
+def movements(
+    ctx, archived: bool, since, until, actor: str, fmt: str, **query: Query
+) -> None:
     """Display the transaction movements history.
 
     Managers can view the complete transaction history for all employees, whereas
     employees can only view their own transactions.
 
+    Args:
+        archived (bool): (Optional) Include the movements archived by the ledger
+            compaction instead of their carry-forward movements.
+        since (datetime): (Optional) Only show the movements from this date.
+        until (datetime): (Optional) Only show the movements before this date.
+        actor (str): (Optional) Only show the movements made by this actor.
+        dept (str): (Optional) Department name to filter by.
+        email (str): (Optional) Email address of the employee to filter by.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
     Returns:
         None
     """
-    result = core.movements()
+    get_core().refresh_rates()
+    with unit_of_work():
+        result = get_core().movements(
+            archived=archived, since=since, until=until, actor=actor, **query
+        )
+        print_rows(
+            result,
+            fmt,
+            title="Dundler Mifflin Movements",
+            decimals=("Converted Movement",),
+        )
 
-    if not result:
-        print("No results found.")
+    ctx.invoke(show, fmt=fmt, **query)
 
-    table = Table(title="Dundler Mifflin Movements")
-    for key in result[0]:
-        table.add_column(key.title(), style="cyan")
 
-    for person in result:
-        person["Converted Movement"] = f"{person['Converted Movement']:.2f}"
-        table.add_row(*[str(value) for value in person.values()])
+@main.command()
+@click.option("--email", required=False)
+@click.option("--bucket", type=click.Choice(BUCKETS), default="day")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]))
+@format_option
+def history(email: str, bucket: str, since, until, fmt: str) -> None:
+    """Display the balance of an employee over time.
 
-    console = Console()
-    console.print(table)
+    Args:
+        email (str): (Optional) Email address of the employee. Defaults to the
+            authenticated user.
+        bucket (str): (Optional) Length of each point: day (default), week or month.
+        since (datetime): (Optional) Only show the balance from this date.
+        until (datetime): (Optional) Only show the balance before this date.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
+    Returns:
+        None
+    """
+    result = get_core().history(
+        email=email, bucket=bucket, since=since, until=until
+    )
+    print_rows(
+        result,
+        fmt,
+        title="Dundler Mifflin History",
+        decimals=("change", "balance"),
+    )
+
+
+@main.command()
+@click.option("--n", "n", type=click.IntRange(min=1), default=20)
+@click.option("--dept", required=False)
+@click.option("--currency-converted", "converted", is_flag=True, default=False)
+@click.option("--days", type=click.INT, required=False)
+@format_option
+def top(n: int, dept: str, converted: bool, days: int, fmt: str) -> None:
+    """Display the employees with the most points.
+
+    Args:
+        n (int): (Optional) Number of employees to display. Defaults to 20.
+        dept (str): (Optional) Department name to restrict the ranking to.
+        converted (bool): (Optional) Rank by the balance converted to each
+            employee's currency.
+        days (int): (Optional) Rank by the points received in the last days.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
+    Returns:
+        None
+    """
+    result = get_core().top(n=n, dept=dept, converted=converted, days=days)
+    print_rows(
+        result,
+        fmt,
+        title="Dundler Mifflin Leaderboard",
+        decimals=("points", "value") if converted else ("points",),
+    )
+
+
+@main.command("dept-stats")
+@click.option("--rebuild", is_flag=True, default=False)
+@format_option
+def dept_stats(rebuild: bool, fmt: str) -> None:
+    """Display headcount, balance and points granted this month per department.
+
+    Args:
+        rebuild (bool): (Optional) Recompute the department summary from
+            people and movements before displaying it.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
+    Returns:
+        None
+    """
+    result = get_core().dept_stats(rebuild=rebuild)
+    print_rows(
+        result,
+        fmt,
+        title="Dundler Mifflin Departments",
+        decimals=("balance", "average", "granted"),
+    )
+
+
+@main.command()
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]))
+@click.option("--dept", required=False)
+@format_option
+def summary(since, until, dept: str, fmt: str) -> None:
+    """Display the company totals for each currency.
+
+    Args:
+        since (datetime): (Optional) Only sum the movements from this date.
+        until (datetime): (Optional) Only sum the movements before this date.
+        dept (str): (Optional) Department name to restrict the totals to.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
+    Returns:
+        None
+    """
+    result = get_core().summary(since=since, until=until, dept=dept)
+    print_rows(
+        result["currencies"],
+        fmt,
+        title="Dundler Mifflin Summary",
+        decimals=("balance", "value", "movements", "movements value"),
+    )
+    if fmt in ("table", "plain"):
+        print(
+            f"Total value: {result['value']:.2f} | "
+            f"Total movements value: {result['movements value']:.2f}"
+        )
+
+
+@main.group()
+def ledger() -> None:
+    """Maintain the points ledger."""
+
+
+@ledger.command()
+@click.option(
+    "--before", type=click.DateTime(formats=["%Y-%m-%d"]), required=True
+)
+@click.option("--chunk-size", type=click.INT, default=1000)
+def compact(before, chunk_size: int) -> None:
+    """Archive movements older than a date into carry-forward movements.
+
+    Balances are not changed and the archived movements can still be seen
+    with `dundie movements --archived`. The operation is committed in chunks
+    and can be resumed by running it again.
+
+    Args:
+        before (datetime): Movements older than this date are archived.
+        chunk_size (int): (Optional) Number of people per transaction.
+
+    Returns:
+        None
+    """
+    result = get_core().compact(before=before, chunk_size=chunk_size)
+    print(
+        f"Archived {result['movements']} movements "
+        f"of {result['people']} people."
+    )
+
+
+@ledger.command()
+@click.option("--repair", is_flag=True, default=False)
+@click.option("--chunk-size", type=click.IntRange(min=1), default=10000)
+@click.option("--workers", type=click.IntRange(min=1), default=1)
+@format_option
+@click.pass_context
+def verify(ctx, repair: bool, chunk_size: int, workers: int, fmt: str) -> None:
+    """Check that every balance matches the sum of its movements.
+
+    Exits with status 1 when balances do not match and were not repaired.
+
+    Args:
+        repair (bool): (Optional) Rewrite the balances that do not match.
+        chunk_size (int): (Optional) Number of people checked per query.
+        workers (int): (Optional) Number of chunks checked at the same time.
+        fmt (str): (Optional) Output format: table (default), plain, tsv or jsonl.
+
+    Returns:
+        None
+    """
+    result = get_core().verify_ledger(
+        repair=repair, chunk_size=chunk_size, workers=workers
+    )
+    if result["mismatches"]:
+        print_rows(
+            result["mismatches"],
+            fmt,
+            title="Dundler Mifflin Ledger Mismatches",
+            decimals=("movements",),
+        )
+    if fmt in ("table", "plain"):
+        print(
+            f"Checked {result['people']} people: "
+            f"{len(result['mismatches'])} mismatches, "
+            f"{result['repaired']} repaired."
+        )
+    if result["mismatches"] and not repair:
+        ctx.exit(1)
+
+
+@main.group()
+def rates() -> None:
+    """Manage the exchange rates."""
+
+
+@rates.command()
+@click.option("--currency", "currencies", multiple=True)
+@click.option("--output", default=RATES_SNAPSHOT)
+def sync(currencies: tuple, output: str) -> None:
+    """Download the exchange rates to a local snapshot file.
+
+    Set DUNDIE_RATES_PROVIDER=snapshot to make the reports read the rates
+    from the snapshot instead of calling the exchange API.
+
+    Args:
+        currencies (tuple): (Optional) Currencies to download. Defaults to the
+            currencies of every employee.
+        output (str): (Optional) Path of the snapshot file.
+
+    Returns:
+        None
+    """
+    result = get_core().sync_rates(
+        currencies=list(currencies) or None, path=os.path.abspath(output)
+    )
+    print(f"Saved {len(result)} rates to {output}.")
+
+
+@rates.command("import")
+@click.argument("filepath", type=click.Path(exists=True))
+def import_(filepath: str) -> None:
+    """Import historical exchange rates from a CSV file.
+
+    The file must have `currency`, `date` (YYYY-MM-DD) and `rate` columns.
+    Movements are converted at the rate in effect on their date.
+
+    Args:
+        filepath (str): The file path to the CSV file.
+
+    Returns:
+        None
+    """
+    result = get_core().import_rates(filepath=os.path.abspath(filepath))
+    print(f"Imported {result} rates.")
+
+
+@main.command()
+@click.option("--socket", "address", default=SERVER_SOCKET)
+@click.option("--port", type=click.IntRange(1, 65535), required=False)
+@click.option("--rates-ttl", type=click.INT, default=SERVER_RATES_TTL)
+def serve(address: str, port: int, rates_ttl: int) -> None:
+    """Run a server that keeps the database, rates and logins warm.
+
+    Set DUNDIE_SERVER to the socket path (or `127.0.0.1:PORT`) to make the
+    other commands run on the server instead of opening the database.
+
+    Args:
+        address (str): (Optional) Path of the Unix socket to listen on.
+        port (int): (Optional) Listen on this local TCP port instead.
+        rates_ttl (int): (Optional) Seconds the exchange rates are cached.
+
+    Returns:
+        None
+    """
+    if port:
+        address = f"127.0.0.1:{port}"
+
+    from dundie import server
 
-    ctx.invoke(show)
+    print(f"Serving on {address}")
+    server.serve(address, rates_ttl=rates_ttl)
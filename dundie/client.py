@@ -0,0 +1,151 @@
+"""Client of the `dundie serve` daemon.
+
+The client only depends on the standard library. It sends one JSON object
+per line to the server and reads one JSON object per line back:
+
+    {"op": "read", "args": {"dept": "Sales"}, "email": "...", "password": "..."}
+    {"ok": true, "result": [...]}
+    {"ok": false, "error": "RuntimeError", "message": "..."}
+"""
+
+import builtins
+import json
+import os
+import socket
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+
+
+class RemoteError(Exception):
+    """Exception raised by the server that has no builtin equivalent."""
+
+    pass
+
+
+def parse_address(address: str) -> Tuple[int, Any]:
+    """Parses the address of a server.
+
+    Args:
+        address (str): Path of a Unix socket or `host:port` of a TCP socket.
+
+    Returns:
+        Tuple[int, Any]: Socket family and address.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+class Client:
+    """Connection to a `dundie serve` daemon.
+
+    The credentials are read from DUNDIE_EMAIL and DUNDIE_PASSWORD on every
+    call and checked by the server.
+
+    Attributes:
+        address (str): Path of a Unix socket or `host:port` of a TCP socket.
+    """
+
+    def __init__(self, address: str) -> None:
+        self.address = address
+        self._socket: Optional[socket.socket] = None
+        self._file = None
+
+    def call(self, op: str, **kwargs: Any) -> Any:
+        """Runs a `dundie.core` operation on the server.
+
+        Args:
+            op (str): Name of the operation.
+            **kwargs (Any): Arguments of the operation.
+
+        Returns:
+            Any: Result of the operation, decoded from JSON.
+
+        Raises:
+            ConnectionError: If the server closed the connection.
+            Exception: The error raised by the operation on the server.
+        """
+        request = {
+            "op": op,
+            "args": kwargs,
+            "email": os.getenv("DUNDIE_EMAIL"),
+            "password": os.getenv("DUNDIE_PASSWORD"),
+        }
+        file = self._connect()
+        file.write(json.dumps(request, default=_to_json).encode() + b"\n")
+        file.flush()
+
+        line = file.readline()
+        if not line:
+            self.close()
+            raise ConnectionError("The server closed the connection.")
+
+        response = json.loads(line)
+        if response["ok"]:
+            return response["result"]
+
+        error = getattr(builtins, response["error"], None)
+        if isinstance(error, type) and issubclass(error, Exception):
+            raise error(response["message"])
+        raise RemoteError(f"{response['error']}: {response['message']}")
+
+    def close(self) -> None:
+        """Closes the connection."""
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+        self._socket = self._file = None
+
+    def _connect(self):
+        if self._socket is None:
+            family, address = parse_address(self.address)
+            self._socket = socket.socket(family, socket.SOCK_STREAM)
+            self._socket.connect(address)
+            self._file = self._socket.makefile("rwb")
+        return self._file
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class RemoteCore:
+    """Exposes the operations of a server with the `dundie.core` interface.
+
+    Attributes:
+        client (Client): Connection to the server.
+    """
+
+    def __init__(self, client: Client) -> None:
+        self.client = client
+
+    def __getattr__(self, name: str):
+        def operation(*args: Any, **kwargs: Any) -> Any:
+            if args:
+                raise TypeError("Remote operations take keyword arguments.")
+            return self.client.call(name, **kwargs)
+
+        operation.__name__ = name
+        return operation
+
+
+def connect(address: Optional[str] = None) -> Optional[RemoteCore]:
+    """Returns a remote core when a server address is configured.
+
+    Args:
+        address (str, optional): Server address. Defaults to DUNDIE_SERVER.
+
+    Returns:
+        Optional[RemoteCore]: Remote core, or None to use `dundie.core`.
+    """
+    address = address or os.getenv("DUNDIE_SERVER")
+    return RemoteCore(Client(address)) if address else None
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
@@ -4,21 +4,84 @@ This module implements the core functionality for managing employee data and poi
 transactions in the Dundie Rewards System. The operations include loading employee data
 from CSV files, retrieving employee records, adding or removing points, transferring points
 between employees, and retrieving transaction movements. All operations require proper
-authentication.
+authentication and run inside a single unit of work shared with the authentication step,
+so each command uses one session and one transaction.
 """
 
-from csv import reader
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from csv import DictReader
+from datetime import date, datetime, timedelta
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
-from sqlmodel import select
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, func, select, union_all
 
-from dundie.database import get_session
-from dundie.models import Person
-from dundie.settings import DATEFMT
+from dundie.database import (
+    is_busy,
+    on_commit,
+    outside_unit_of_work,
+    unit_of_work,
+    write_transaction,
+)
+from dundie.models import (
+    Balance,
+    DeptSummary,
+    ExchangeRate,
+    Movement,
+    MovementArchive,
+    Person,
+)
+from dundie.settings import (
+    DATEFMT,
+    IDEMPOTENCY_TTL,
+    LOAD_BATCH_SIZE,
+    RATES_MAX_AGE,
+    RATES_SNAPSHOT,
+)
 from dundie.utils.auth import requires_auth
-from dundie.utils.db import add_movement, add_person
-from dundie.utils.exchange import get_rates
+from dundie.utils.db import (
+    add_movement,
+    add_person,
+    converted_value,
+    current_month,
+    date_bucket,
+    get_fingerprints,
+    get_idempotent_outcome,
+    get_loaded_fields,
+    get_people,
+    historical_value,
+    get_person,
+    granted_movements,
+    LOADED_FIELDS,
+    person_fingerprint,
+    rebuild_dept_summary,
+    remember_person,
+    save_idempotent_outcome,
+    save_rate_history,
+    save_rates,
+    set_fingerprint,
+    stale_currencies,
+)
+from dundie.utils.exchange import get_rates, save_snapshot
+from dundie.utils.ledger import (
+    CARRY_FORWARD_ACTOR,
+    Mismatch,
+    compact_movements,
+    find_mismatches,
+    repair_balances,
+)
 from dundie.utils.log import get_logger
+from dundie.utils.pagination import Page, encode_cursor, keyset
+from dundie.utils.parser import LoadResult, parse_file
+from dundie.utils.passwords import PasswordWriter
+from dundie.utils.rows import (
+    HistoryRow,
+    LoadDiffRow,
+    MovementRow,
+    PersonRow,
+)
 from dundie.utils.auth import AuthenticationError
 
 log = get_logger()
@@ -28,8 +91,15 @@ ResultDict = List[Dict[str, Any]]
 # TODO: Modify prints to logging
 
 
+@write_transaction
 @requires_auth
-def load(filepath: str, from_person: Person) -> ResultDict:
+def load(
+    filepath: str,
+    from_person: Person,
+    passwords_file: Optional[str] = None,
+    per_run: bool = False,
+    delta: bool = False,
+) -> LoadResult:
     """Load employee data from a CSV file into the database.
 
     This function reads a CSV file from the given filepath, validates and parses its content,
@@ -38,13 +108,27 @@ def load(filepath: str, from_person: Person) -> ResultDict:
     a new Person instance is created and added to the database, along with a record indicating
     whether the entry was newly created.
 
+    The plain passwords of new employees are buffered and written to the passwords file
+    with a single open and fsync once the unit of work is committed.
+
+    A fingerprint of the name, dept, role and currency of every loaded row is stored. In delta
+    mode, the stored fingerprints are fetched in bulk for each batch of rows and the rows whose
+    fingerprint did not change are skipped without touching the database.
+
     Args:
         filepath (str): The path to the CSV file containing employee data.
         from_person (Person): The authenticated user performing this operation. Must be a superuser.
+        passwords_file (Optional[str]): Path of the file receiving the generated passwords.
+            Defaults to `settings.PASSWORDS_FILE`.
+        per_run (bool): If True, write the generated passwords to a new timestamped file
+            instead of appending to the shared one.
+        delta (bool): If True, only write the rows that are new or changed since the last load.
 
     Returns:
-        ResultDict: A list of dictionaries representing the loaded employee records, each including
-            a 'created' key to indicate creation status.
+        LoadResult: The 'rows', a list of dictionaries representing the loaded employee records,
+            each including a 'created' key to indicate creation status, and the 'errors', the line
+            number and message of every invalid line that was skipped. In delta mode, a 'status'
+            key reports whether the row is 'new', 'changed' or 'unchanged'.
 
     Raises:
         AuthenticationError: If the authenticated user is not authorized to perform this action.
@@ -54,28 +138,34 @@ def load(filepath: str, from_person: Person) -> ResultDict:
     try:
         if from_person is None or from_person.superuser:
             try:
-                csv_data = reader(open(filepath))
+                batches = parse_file(filepath)
             except FileNotFoundError as e:
                 log.error(str(e))
                 raise e
 
             people = []
-            headers = ["name", "dept", "role", "email", "currency"]
+            errors = []
 
-            with get_session() as session:
-                for line in csv_data:
-                    person_data = dict(
-                        zip(headers, [item.strip() for item in line])
-                    )
-                    instance = Person(**person_data)
-                    person, created = add_person(session, instance)
-                    return_data = person.dict(exclude={"id"})
-                    return_data["created"] = created
-                    people.append(return_data)
+            if per_run:
+                pw_writer = PasswordWriter.for_run()
+            else:
+                pw_writer = PasswordWriter(passwords_file)
 
-                session.commit()
+            with unit_of_work() as session:
+                for parsed in batches:
+                    for line, message in parsed.errors:
+                        log.error(f"{filepath}:{line}: {message}")
+                    errors.extend(parsed.errors)
+
+                    for start in range(0, len(parsed.rows), LOAD_BATCH_SIZE):
+                        rows = parsed.rows[start : start + LOAD_BATCH_SIZE]
+                        people.extend(
+                            _load_rows(session, rows, pw_writer, delta)
+                        )
 
-            return people
+                on_commit(session, pw_writer.commit)
+
+            return LoadResult(rows=people, errors=errors)
         else:
             raise AuthenticationError("You can not perform this action!")
     except Exception as e:
@@ -83,8 +173,125 @@ def load(filepath: str, from_person: Person) -> ResultDict:
         raise e
 
 
+def _load_rows(
+    session: Session,
+    rows: List[Dict[str, str]],
+    pw_writer: PasswordWriter,
+    delta: bool,
+) -> ResultDict:
+    """Write a batch of parsed CSV rows, skipping unchanged ones in delta mode."""
+    people = []
+    fields = ["email", "name", "dept", "role", "currency"]
+    fingerprints = get_fingerprints(session, [row["email"] for row in rows])
+
+    for person_data in rows:
+        email = person_data["email"]
+        digest = person_fingerprint(person_data)
+        fingerprint = fingerprints.get(email)
+
+        if delta and fingerprint and fingerprint.digest == digest:
+            return_data = {key: person_data[key] for key in fields}
+            return_data["created"] = False
+            return_data["status"] = "unchanged"
+            people.append(return_data)
+            continue
+
+        instance = Person(**person_data)
+        person, created = add_person(session, instance, pw_writer=pw_writer)
+        set_fingerprint(session, fingerprints, email, digest)
+
+        return_data = person.dict(exclude={"id"})
+        return_data["created"] = created
+        if delta:
+            return_data["status"] = "new" if created else "changed"
+        people.append(return_data)
+
+    return people
+
+
+@requires_auth
+def load_diff(filepath: str, from_person: Person) -> Iterator[LoadDiffRow]:
+    """Compare a CSV file of employees with the database without loading it.
+
+    The file is parsed like in `load` and, for each batch of `LOAD_BATCH_SIZE` rows, the name,
+    dept, role and currency of the employees already in the database are fetched in one query.
+    Nothing is written and no password is generated, so previewing a large export only costs the
+    parsing and one indexed lookup per batch. Rows are yielded as the file is read, and a row
+    repeating an e-mail is compared with the previous row of that e-mail, as `load` would apply it.
+
+    Args:
+        filepath (str): The path to the CSV file containing employee data.
+        from_person (Person): The authenticated user performing this operation. Must be a superuser.
+
+    Returns:
+        Iterator[LoadDiffRow]: One row per CSV line, in file order, with the 'status' the line
+            would have when loaded, 'new', 'changed' or 'unchanged', and the 'changes' of a changed
+            employee, e.g. 'dept: Sales -> Management'. Invalid lines, which `load` skips, have the
+            'invalid' status and their line number and error in 'changes'.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+        FileNotFoundError: If the specified CSV file is not found.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+        batches = parse_file(filepath)
+    except Exception as e:
+        print(str(e))
+        raise e
+
+    return _stream_load_diff(filepath, batches)
+
+
+def _stream_load_diff(filepath: str, batches) -> Iterator[LoadDiffRow]:
+    seen: Dict[str, tuple] = {}
+    with unit_of_work() as session:
+        for parsed in batches:
+            for line, message in parsed.errors:
+                log.error(f"{filepath}:{line}: {message}")
+                yield LoadDiffRow(
+                    "", "invalid", "", "", "", "", f"Line {line}: {message}"
+                )
+
+            for start in range(0, len(parsed.rows), LOAD_BATCH_SIZE):
+                rows = parsed.rows[start : start + LOAD_BATCH_SIZE]
+                stored = get_loaded_fields(
+                    session,
+                    [row["email"] for row in rows if row["email"] not in seen],
+                )
+                for row in rows:
+                    email = row["email"]
+                    fields = tuple(row[field] for field in LOADED_FIELDS)
+                    current = seen.get(email) or stored.get(email)
+                    seen[email] = fields
+
+                    changes = ""
+                    if current is None:
+                        status = "new"
+                    elif current == fields:
+                        status = "unchanged"
+                    else:
+                        status = "changed"
+                        changes = ", ".join(
+                            f"{field}: {old} -> {new}"
+                            for field, old, new in zip(
+                                LOADED_FIELDS, current, fields
+                            )
+                            if old != new
+                        )
+                    yield LoadDiffRow(email, status, *fields, changes)
+
+
 @requires_auth
-def read(from_person: Person, **query: Query) -> ResultDict:
+def read(
+    from_person: Person,
+    limit: Optional[int] = None,
+    order_by: str = "id",
+    cursor: Optional[str] = None,
+    refresh: bool = True,
+    **query: Query,
+) -> List[PersonRow]:
     """Retrieve employee records from the database based on provided filters.
 
     This function constructs a database query using optional filter parameters (such as department
@@ -92,22 +299,81 @@ def read(from_person: Person, **query: Query) -> ResultDict:
     viewing only their own record. Additionally, the function calculates a converted value for each
     employee based on current exchange rates.
 
+    Only the reported columns are selected and each record is kept as a `PersonRow` tuple, so no
+    ORM object or dictionary is built per employee.
+
     Args:
         from_person (Person): The authenticated user performing the query.
+        limit (int, optional): Maximum number of records to return.
+        order_by (str, optional): Ordering of the records, 'id' or 'dept' (department and email).
+        cursor (str, optional): Cursor returned by `read_page` for the previous page.
+        refresh (bool, optional): Fetch the stale exchange rates first. See `refresh_rates`.
         **query (Query): Optional keyword arguments to filter the query (e.g., 'dept' or 'email').
 
     Returns:
-        ResultDict: A list of dictionaries containing employee data along with calculated balance values.
+        List[PersonRow]: The employee records, as rows with their balance and converted value.
 
     Raises:
         RuntimeError: If a non-superuser attempts to filter by department or email.
+        InvalidCursorError: If the ordering or the cursor is invalid.
+        ValueError: If the limit is lower than 1.
         SystemExit: If an error occurs during the query execution.
     """
+    return _read_page(
+        from_person, limit, order_by, cursor, refresh, **query
+    ).rows
+
+
+@requires_auth
+def read_page(
+    from_person: Person,
+    limit: Optional[int] = None,
+    order_by: str = "id",
+    cursor: Optional[str] = None,
+    refresh: bool = True,
+    **query: Query,
+) -> Page:
+    """Retrieve one page of employee records using keyset pagination.
+
+    Records are sorted by `order_by` and the page starts right after the row encoded in `cursor`,
+    so every page costs one index range scan regardless of how deep it is. Filters and permissions
+    are the same as in `read`.
+
+    Args:
+        from_person (Person): The authenticated user performing the query.
+        limit (int, optional): Maximum number of records in the page.
+        order_by (str, optional): Ordering of the records, 'id' or 'dept' (department and email).
+        cursor (str, optional): Cursor returned with the previous page.
+        refresh (bool, optional): Fetch the stale exchange rates first. Commands reading many
+            pages call `refresh_rates` once and pass False.
+        **query (Query): Optional keyword arguments to filter the query (e.g., 'dept' or 'email').
+
+    Returns:
+        Page: The records and the cursor of the next page, None when there are no more records.
+
+    Raises:
+        RuntimeError: If a non-superuser attempts to filter by department or email.
+        InvalidCursorError: If the ordering or the cursor is invalid.
+        ValueError: If the limit is lower than 1.
+    """
+    return _read_page(from_person, limit, order_by, cursor, refresh, **query)
+
+
+def _read_page(
+    from_person: Person,
+    limit: Optional[int],
+    order_by: str,
+    cursor: Optional[str],
+    refresh: bool,
+    **query: Query,
+) -> Page:
     query = {k: v for k, v in query.items() if v is not None}
-    return_data = []
 
     query_statements = []
     try:
+        if limit is not None and limit < 1:
+            raise ValueError(f"Invalid limit: {limit}")
+
         if "dept" in query and from_person.superuser:
             query_statements.append(Person.dept == query["dept"])
         elif "dept" in query and not from_person.superuser:
@@ -120,31 +386,52 @@ def read(from_person: Person, **query: Query) -> ResultDict:
         elif not from_person.superuser:
             query_statements.append(Person.email == from_person.email)
 
-        sql = select(Person)
-        if query_statements:
-            sql = sql.where(*query_statements)
+        columns, after_cursor = keyset(order_by, cursor)
+        last_movement = (
+            select(func.max(Movement.date))
+            .where(Movement.person_id == Person.id)
+            .scalar_subquery()
+        )
+        sql = (
+            select(
+                Person.email,
+                Balance.value,
+                last_movement,
+                Person.name,
+                Person.dept,
+                Person.role,
+                Person.currency,
+                converted_value(Balance.value),
+                *columns,
+            )
+            .join(Balance, Balance.person_id == Person.id)
+            .outerjoin(ExchangeRate, ExchangeRate.currency == Person.currency)
+            .where(*query_statements, *after_cursor)
+            .order_by(*columns)
+        )
+        if limit is not None:
+            sql = sql.limit(limit + 1)
 
-        with get_session() as session:
-            currencies = session.exec(
-                select(Person.currency).distinct(Person.currency)
+        if refresh:
+            _refresh_rates(
+                select(Person.currency).where(*query_statements).distinct()
             )
-            rates = get_rates(currencies)
-            results = session.exec(sql)
-            for person in results:
-                total = rates[person.currency].values * person.balance[0].value
-                return_data.append(
-                    {
-                        "email": person.email,
-                        "balance": person.balance[0].value,
-                        "last movement": person.movement[-1].date.strftime(
-                            DATEFMT
-                        ),
-                        **person.dict(exclude={"id"}),
-                        **{"value": total},
-                    }
+        with unit_of_work() as session:
+            rows = []
+            next_cursor = key = None
+            for row in session.exec(sql):
+                if len(rows) == limit:
+                    next_cursor = encode_cursor(order_by, key)
+                    break
+                email, balance, date = row[:3]
+                rows.append(
+                    PersonRow(
+                        email, balance, date.strftime(DATEFMT), *row[3:8]
+                    )
                 )
+                key = tuple(row[8:])
 
-        return return_data
+        return Page(rows=rows, next_cursor=next_cursor)
 
     except Exception as e:
         print(str(e))
@@ -152,40 +439,121 @@ def read(from_person: Person, **query: Query) -> ResultDict:
 
 
 @requires_auth
-def add(value: int, from_person: Person, **query: Query) -> None:
+def refresh_rates(from_person: Person) -> List[str]:
+    """Fetch and store the stale exchange rates of the employees' currencies.
+
+    Reports refresh the rates they need before reading. Commands reading a report in many pages
+    call this once, before opening their unit of work, and read the pages with `refresh=False`,
+    so the rates are fetched once per command instead of once per page.
+
+    Args:
+        from_person (Person): The authenticated user performing the operation.
+
+    Returns:
+        List[str]: The currencies whose rate was fetched.
+    """
+    return _refresh_rates(select(Person.currency).distinct())
+
+
+def _refresh_rates(currencies, any_age: bool = False) -> List[str]:
+    """Fetch and store the stale rates of the currencies selected by `currencies`.
+
+    When rates are stale, the read transaction of the current unit of work is ended first, the
+    rates are fetched outside of any transaction and stored in a short write transaction of their
+    own, so a report never upgrades its read transaction to a write. If the database stays locked
+    by a writer, the report goes on with the rates already stored.
+    """
+    max_age = None if any_age else RATES_MAX_AGE
+    with unit_of_work() as session:
+        stale = stale_currencies(session, session.exec(currencies), max_age)
+    if not stale:
+        return stale
+
+    with outside_unit_of_work():
+        rates = get_rates(stale)
+        try:
+            _store_rates(rates)
+        except OperationalError as e:
+            if not is_busy(e):
+                raise
+            log.warning(f"Database is locked, using the stored rates: {e}")
+    return stale
+
+
+@write_transaction
+def _store_rates(rates: Dict[str, Any]) -> None:
+    with unit_of_work() as session:
+        save_rates(session, rates)
+
+
+def _window(
+    column, since: Optional[datetime], until: Optional[datetime]
+) -> list:
+    clauses = []
+    if since is not None:
+        clauses.append(column >= since)
+    if until is not None:
+        clauses.append(column < until)
+    return clauses
+
+
+@write_transaction
+@requires_auth
+def add(
+    value: int,
+    from_person: Person,
+    idempotency_key: Optional[str] = None,
+    **query: Query,
+) -> Dict[str, Any]:
     """Add points to selected employee records.
 
     This function adds a specified number of points to every employee record that matches the given
-    filters. A corresponding movement record is created for each transaction.
+    filters. A corresponding movement record is created for each transaction. The matching employees
+    are selected once and reused through the session identity cache.
 
     Args:
         value (int): The number of points to add.
         from_person (Person): The authenticated user initiating the addition.
+        idempotency_key (str, optional): Key of the request. Retrying a request with the same key
+            returns the outcome of the first one instead of adding the points again.
         **query (Query): Optional filters (e.g., 'dept' or 'email') to select target employees.
 
     Returns:
-        None
+        Dict[str, Any]: The value added and the number of people who received it.
 
     Raises:
         RuntimeError: If no matching records are found or if the authenticated user's balance is insufficient.
+        ValueError: If the idempotency key was used for another request.
         SystemExit: If an error occurs during the addition process.
     """
     try:
         if from_person.superuser:
             query = {k: v for k, v in query.items() if v is not None}
-            people = read(**query)
 
-            if not people:
-                raise RuntimeError("Not Found")
+            with unit_of_work() as session:
 
-            with get_session() as session:
-                for person in people:
-                    instance = session.exec(
-                        select(Person).where(Person.email == person["email"])
-                    ).first()
-                    add_movement(session, instance, value, from_person.email)
+                def apply() -> Dict[str, Any]:
+                    people = get_people(
+                        session,
+                        dept=query.get("dept"),
+                        email=query.get("email"),
+                    )
 
-                session.commit()
+                    if not people:
+                        raise RuntimeError("Not Found")
+
+                    for person in people:
+                        add_movement(session, person, value, from_person.email)
+                    return {"value": value, "people": len(people)}
+
+                return _apply_once(
+                    session,
+                    from_person,
+                    idempotency_key,
+                    "add",
+                    {"value": value, **query},
+                    apply,
+                )
         else:
             raise AuthenticationError("You can not perform this action!")
     except Exception as e:
@@ -193,8 +561,14 @@ def add(value: int, from_person: Person, **query: Query) -> None:
         raise e
 
 
+@write_transaction
 @requires_auth
-def transfer(value: int, to_person: str, from_person: Person) -> None:
+def transfer(
+    value: int,
+    to_person: str,
+    from_person: Person,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
     """Transfer points from the authenticated user's account to another employee.
 
     This function transfers a specified number of points from the authenticated user's account to
@@ -206,107 +580,752 @@ def transfer(value: int, to_person: str, from_person: Person) -> None:
         value (int): The number of points to transfer.
         to_person (str): The email address of the recipient employee.
         from_person (Person): The authenticated user initiating the transfer.
+        idempotency_key (str, optional): Key of the request. Retrying a transfer with the same key
+            returns the outcome of the first one instead of transferring the points again.
 
     Returns:
-        None
+        Dict[str, Any]: The value transferred and the email and name of the recipient.
 
     Raises:
-        ValueError: If the authenticated user does not have enough balance or if attempting to transfer
-            points to themselves.
+        ValueError: If the authenticated user does not have enough balance, if attempting to transfer
+            points to themselves or if the idempotency key was used for another request.
         RuntimeError: If the recipient's email is not found in the database.
         SystemExit: If an error occurs during the transfer process.
     """
     try:
-        if value > from_person.balance[0].value:
-            raise ValueError("You don't have enough balance!")
-
         if to_person == from_person.email:
             raise ValueError("You can't transfer points to yourself!")
 
-        with get_session() as session:
-            person = session.exec(
-                select(Person).where(Person.email == to_person)
-            ).first()
+        with unit_of_work() as session:
 
-        if person is None:
-            raise RuntimeError(f"Email '{to_person}' not found!")
+            def apply() -> Dict[str, Any]:
+                if value > from_person.balance[0].value:
+                    raise ValueError("You don't have enough balance!")
 
-        with get_session() as session:
-            add_instance = session.exec(
-                select(Person).where(Person.email == to_person)
-            ).first()
-            add_movement(session, add_instance, value, from_person.email)
+                add_instance = get_person(session, email=to_person)
 
-            to_person_name = add_instance.name
+                if add_instance is None:
+                    raise RuntimeError(f"Email '{to_person}' not found!")
 
-            remove_instance = session.exec(
-                select(Person).where(Person.email == from_person.email)
-            ).first()
-            add_movement(
-                session, remove_instance, -abs(value), from_person.email
-            )
+                add_movement(session, add_instance, value, from_person.email)
 
-            session.commit()
+                remove_instance = remember_person(session, from_person)
+                add_movement(
+                    session, remove_instance, -abs(value), from_person.email
+                )
+                return {
+                    "value": value,
+                    "to": to_person,
+                    "name": add_instance.name,
+                }
 
-        print(
-            f"Success! You have transfered {value} points from your balance "
-            f"to {to_person_name}."
-        )
+            outcome = _apply_once(
+                session,
+                from_person,
+                idempotency_key,
+                "transfer",
+                {"value": value, "to": to_person},
+                apply,
+            )
+
+        return outcome
 
     except Exception as e:
         print(str(e))
         raise e
 
 
+def _apply_once(
+    session: Session,
+    from_person: Person,
+    idempotency_key: Optional[str],
+    operation: str,
+    request: Dict[str, Any],
+    apply: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    if idempotency_key is None:
+        return apply()
+
+    outcome = get_idempotent_outcome(
+        session,
+        from_person.email,
+        idempotency_key,
+        operation,
+        request,
+        IDEMPOTENCY_TTL,
+    )
+    if outcome is not None:
+        log.info(f"Replayed {operation} with key '{idempotency_key}'")
+        return outcome
+
+    outcome = apply()
+    save_idempotent_outcome(
+        session,
+        from_person.email,
+        idempotency_key,
+        operation,
+        request,
+        outcome,
+        IDEMPOTENCY_TTL,
+    )
+    return outcome
+
+
 @requires_auth
-def movements(from_person: Person) -> ResultDict:
+def movements(
+    from_person: Person,
+    archived: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    actor: Optional[str] = None,
+    **query: Query,
+) -> List[MovementRow]:
     """Retrieve transaction movements from the database.
 
     This function fetches the transaction history for the authenticated user. Managers receive
     the complete history for all employees, while non-superusers only obtain their own transaction
-    records. For each transaction, a converted movement value is calculated using the current exchange
-    rates. The results are then sorted by date in descending order.
+    records. Each transaction is converted in SQL at the rate in effect on its date, looked up in the
+    rate history, so reports of past movements do not change when rates do. Rates are only fetched
+    for currencies that were never fetched. The results are sorted by date in descending order.
+
+    The filters become WHERE clauses answered by the `(actor, date)` and `(person_id, date)`
+    indexes, so only the matching movements are read and sorted.
 
     Args:
         from_person (Person): The authenticated user whose transaction history is to be retrieved.
+        archived (bool): If True, include the movements archived by the ledger compaction in place
+            of their carry-forward movements.
+        since (Optional[datetime]): Only return the movements dated from this date.
+        until (Optional[datetime]): Only return the movements dated before this date.
+        actor (Optional[str]): Only return the movements made by this actor, e.g. a manager's email.
+        **query (Query): Optional filters ('dept' or 'email') to select the employees.
 
     Returns:
-        ResultDict: A list of dictionaries representing the transaction movements. Each dictionary contains:
+        List[MovementRow]: The transaction movements, as rows with the keys:
             - 'Name': Employee's name.
             - 'Date': The date of the transaction.
             - 'Movement': The original movement value.
-            - 'Converted Movement': The movement value converted based on the current exchange rate.
+            - 'Converted Movement': The movement value converted at the rate of its date.
             - 'Actor': The identifier of the transaction initiator.
     """
-    return_data = []
-
-    query_statements = []
+    query_statements = [
+        getattr(Person, key) == value
+        for key, value in query.items()
+        if value is not None
+    ]
 
     if not from_person.superuser:
         query_statements.append(Person.email == from_person.email)
 
-    sql = select(Person)
-    if query_statements:
-        sql = sql.where(*query_statements)
+    def filters(table) -> list:
+        clauses = [*query_statements, *_window(table.date, since, until)]
+        if actor is not None:
+            clauses.append(table.actor == actor)
+        return clauses
+
+    history = [(Movement, filters(Movement))]
+    if archived:
+        history = [
+            (
+                Movement,
+                [*filters(Movement), Movement.actor != CARRY_FORWARD_ACTOR],
+            ),
+            (MovementArchive, filters(MovementArchive)),
+        ]
+
+    sql = union_all(
+        *[
+            select(
+                Person.name,
+                table.date,
+                table.value,
+                historical_value(table.value, table.date).label("converted"),
+                table.actor,
+            )
+            .join(Person, Person.id == table.person_id)
+            .outerjoin(ExchangeRate, ExchangeRate.currency == Person.currency)
+            .where(*statements)
+            for table, statements in history
+        ]
+    ).subquery()
+
+    _refresh_rates(
+        select(Person.currency).where(*query_statements).distinct(),
+        any_age=True,
+    )
+    with unit_of_work() as session:
+        results = session.exec(select(*sql.c).order_by(sql.c.date.desc()))
+        return [
+            MovementRow(name, date.strftime(DATEFMT), value, total, actor)
+            for name, date, value, total, actor in results
+        ]
+
+
+@requires_auth
+def history(
+    from_person: Person,
+    email: Optional[str] = None,
+    bucket: str = "day",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[HistoryRow]:
+    """Retrieve the balance of an employee over time.
+
+    The movements of the employee, including the ones archived by the ledger compaction instead
+    of their carry-forward, are grouped by `bucket` and the running balance is computed by the
+    database with `SUM() OVER (ORDER BY date)`. The movements are read through the
+    `(person_id, date)` index, so the whole series is one indexed query whose rows are yielded as
+    the database returns them.
+
+    Args:
+        from_person (Person): The authenticated user performing the query.
+        email (Optional[str]): Email of the employee. Defaults to the authenticated user. Only
+            superusers can query other employees.
+        bucket (str): Length of each point of the series: 'day', 'week' (from Monday) or 'month'.
+        since (Optional[datetime]): Only return the buckets from the one of this date.
+        until (Optional[datetime]): Only return the buckets before the one of this date.
+
+    Returns:
+        Iterator[HistoryRow]: One row per bucket with movements, oldest first, with the
+            'date' the bucket starts, the net 'change' of the bucket and the 'balance' at its end.
+
+    Raises:
+        AuthenticationError: If a non-superuser queries another employee.
+        RuntimeError: If the employee's email is not found.
+        ValueError: If the bucket is invalid.
+    """
+    try:
+        email = email or from_person.email
+        if email != from_person.email and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        with unit_of_work() as session:
+            person = get_person(session, email=email)
+            if person is None:
+                raise RuntimeError(f"Email '{email}' not found!")
+            person_id = person.id
+
+        ledger = union_all(
+            select(Movement.date, Movement.value).where(
+                Movement.person_id == person_id,
+                Movement.actor != CARRY_FORWARD_ACTOR,
+            ),
+            select(MovementArchive.date, MovementArchive.value).where(
+                MovementArchive.person_id == person_id
+            ),
+        ).subquery()
 
-    with get_session() as session:
-        currencies = session.exec(
-            select(Person.currency).distinct(Person.currency)
+        day = date_bucket(ledger.c.date, bucket).label("day")
+        changes = (
+            select(day, func.sum(ledger.c.value).label("change"))
+            .group_by(day)
+            .subquery()
         )
-        rates = get_rates(currencies)
-        results = session.exec(sql)
-        for person in results:
-            for movement in person.movement:
-                total = rates[person.currency].values * movement.value
+        series = select(
+            changes.c.day,
+            changes.c.change,
+            func.sum(changes.c.change)
+            .over(order_by=changes.c.day)
+            .label("balance"),
+        ).subquery()
+
+        sql = select(*series.c).order_by(series.c.day)
+        if since is not None:
+            sql = sql.where(series.c.day >= date_bucket(since, bucket))
+        if until is not None:
+            sql = sql.where(series.c.day < date_bucket(until, bucket))
+    except Exception as e:
+        print(str(e))
+        raise e
+
+    return _stream_history(sql)
+
+
+def _stream_history(sql) -> Iterator[HistoryRow]:
+    with unit_of_work() as session:
+        for day, change, balance in session.exec(sql):
+            yield HistoryRow(day, change, balance)
+
+
+@requires_auth
+def top(
+    from_person: Person,
+    n: int = 20,
+    dept: Optional[str] = None,
+    converted: bool = False,
+    days: Optional[int] = None,
+) -> ResultDict:
+    """Retrieve the employees with the most points.
+
+    The ranking is computed by the database: by default it orders the indexed `balance.value`
+    column and applies the limit there, so only the `n` winning rows are ever fetched. When
+    `days` is given, the points received over that window are summed from the indexed
+    `movement.date` column instead, together with the movements archived by the ledger compaction. When `converted` is set, the ranking uses the balance
+    converted to each employee's currency, joined from the stored `exchangerate` table.
+
+    Args:
+        from_person (Person): The authenticated user performing the query. Must be a superuser.
+        n (int): The number of employees to return.
+        dept (Optional[str]): Department name to restrict the ranking to.
+        converted (bool): If True, rank by the balance converted with current exchange rates.
+        days (Optional[int]): If given, rank by the points received in the last `days` days.
+
+    Returns:
+        ResultDict: A list of dictionaries ordered by rank, each containing 'rank', 'email',
+            'name', 'dept', 'currency', 'points' and, when converted, 'value'.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+        ValueError: If `n` is lower than 1.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        if n < 1:
+            raise ValueError(f"Invalid number of employees: {n}")
+
+        if converted:
+            _refresh_rates(select(Person.currency).distinct())
+
+        with unit_of_work() as session:
+            if days is not None:
+                since = datetime.now() - timedelta(days=days)
+                granted = granted_movements(since)
+                points = func.sum(granted.c.value).label("points")
+                sql = (
+                    select(
+                        Person.email,
+                        Person.name,
+                        Person.dept,
+                        Person.currency,
+                        points,
+                    )
+                    .join(granted, granted.c.person_id == Person.id)
+                    .group_by(Person.id)
+                    .order_by(points.desc())
+                )
+            else:
+                points = Balance.value.label("points")
+                sql = select(
+                    Person.email,
+                    Person.name,
+                    Person.dept,
+                    Person.currency,
+                    points,
+                ).join(Balance, Balance.person_id == Person.id)
+
+            if dept is not None:
+                sql = sql.where(Person.dept == dept)
+
+            if converted:
+                value = converted_value(points).label("value")
+                sql = (
+                    sql.add_columns(value)
+                    .outerjoin(
+                        ExchangeRate, ExchangeRate.currency == Person.currency
+                    )
+                    .order_by(None)
+                    .order_by(value.desc())
+                )
+            elif days is None:
+                sql = sql.order_by(points.desc())
+
+            return_data = []
+            results = session.exec(sql.limit(n))
+            for rank, row in enumerate(results, start=1):
+                data = {
+                    "rank": rank,
+                    "email": row.email,
+                    "name": row.name,
+                    "dept": row.dept,
+                    "currency": row.currency,
+                    "points": row.points,
+                }
+                if converted:
+                    data["value"] = row.value
+                return_data.append(data)
+
+        return return_data
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+@requires_auth
+def dept_stats(from_person: Person, rebuild: bool = False) -> ResultDict:
+    """Retrieve the per-department summary.
+
+    The figures are read from the materialised `deptsummary` table, which is kept up to date by
+    every write, so this costs one row per department regardless of the number of people and
+    movements. The summary can be recomputed from scratch for recovery, in a write transaction of
+    its own.
+
+    Args:
+        from_person (Person): The authenticated user performing the query. Must be a superuser.
+        rebuild (bool): If True, recompute the summary from people and movements first.
+
+    Returns:
+        ResultDict: A list of dictionaries ordered by department, each containing 'dept',
+            'headcount', 'balance', 'average' and 'granted' (points granted this month).
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        return_data = []
+        month = current_month()
+
+        if rebuild:
+            with outside_unit_of_work():
+                _rebuild_dept_summary()
+
+        with unit_of_work() as session:
+            results = session.exec(
+                select(DeptSummary).order_by(DeptSummary.dept)
+            )
+            for summary in results:
+                if not summary.headcount:
+                    continue
+
                 return_data.append(
                     {
-                        "Name": person.name,
-                        "Date": movement.date.strftime(DATEFMT),
-                        "Movement": movement.value,
-                        "Converted Movement": total,
-                        "Actor": movement.actor,
+                        "dept": summary.dept,
+                        "headcount": summary.headcount,
+                        "balance": summary.balance,
+                        "average": summary.balance / summary.headcount,
+                        "granted": (
+                            summary.granted if summary.month == month else 0
+                        ),
                     }
                 )
-    return_data = sorted(return_data, key=lambda x: x["Date"], reverse=True)
 
-    return return_data
+        return return_data
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+@requires_auth
+def summary(
+    from_person: Person,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    dept: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Retrieve company-wide totals grouped by currency.
+
+    Balances and movements are summed by the database with one `GROUP BY person.currency` query
+    each, and the stored exchange rate is applied once per currency group, so the cost in Python depends
+    on the number of currencies instead of the number of employees or movements. Movements
+    archived by the ledger compaction are summed from the archive instead of their carry-forward.
+
+    Args:
+        from_person (Person): The authenticated user performing the query. Must be a superuser.
+        since (Optional[datetime]): Only sum the movements dated from this date.
+        until (Optional[datetime]): Only sum the movements dated before this date.
+        dept (Optional[str]): Department name to restrict the totals to.
+
+    Returns:
+        Dict[str, Any]: 'currencies', a list with the 'currency', 'people', 'balance', 'rate',
+            'value', 'movements' and 'movements value' of each currency, and the company-wide
+            'value' and 'movements value'.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        people = [Person.dept == dept] if dept is not None else []
+
+        _refresh_rates(select(Person.currency).where(*people).distinct())
+        with unit_of_work() as session:
+            balances = session.exec(
+                select(
+                    Person.currency,
+                    func.count(Person.id),
+                    func.sum(Balance.value),
+                    func.coalesce(ExchangeRate.rate, 0),
+                )
+                .join(Balance, Balance.person_id == Person.id)
+                .outerjoin(
+                    ExchangeRate, ExchangeRate.currency == Person.currency
+                )
+                .where(*people)
+                .group_by(Person.currency, ExchangeRate.rate)
+                .order_by(Person.currency)
+            ).all()
+            moved = session.exec(
+                select(Person.currency, func.sum(Movement.value))
+                .join(Movement, Movement.person_id == Person.id)
+                .where(
+                    *people,
+                    *_window(Movement.date, since, until),
+                    Movement.actor != CARRY_FORWARD_ACTOR,
+                )
+                .group_by(Person.currency)
+            ).all()
+            archived = session.exec(
+                select(Person.currency, func.sum(MovementArchive.value))
+                .join(MovementArchive, MovementArchive.person_id == Person.id)
+                .where(*people, *_window(MovementArchive.date, since, until))
+                .group_by(Person.currency)
+            ).all()
+
+        movements = {}
+        for currency, value in [*moved, *archived]:
+            movements[currency] = movements.get(currency, 0) + value
+
+        currencies = []
+        for currency, headcount, balance, rate in balances:
+            currencies.append(
+                {
+                    "currency": currency,
+                    "people": headcount,
+                    "balance": balance,
+                    "rate": rate,
+                    "value": rate * balance,
+                    "movements": movements.get(currency, 0),
+                    "movements value": rate * movements.get(currency, 0),
+                }
+            )
+
+        return {
+            "currencies": currencies,
+            "value": sum(row["value"] for row in currencies),
+            "movements value": sum(
+                row["movements value"] for row in currencies
+            ),
+        }
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+@write_transaction
+@requires_auth
+def compact(
+    before: datetime, from_person: Person, chunk_size: int = 1000
+) -> Dict[str, int]:
+    """Compact the ledger by archiving movements older than a date.
+
+    People are processed in chunks of consecutive IDs, each one committed in its own transaction.
+    For every person, the movements dated before `before` are moved to the `movementarchive` table
+    and replaced by a single carry-forward movement, so balances stay unchanged and the movement
+    table stays bounded. An interrupted compaction can be resumed by running it again.
+
+    Args:
+        before (datetime): Movements older than this date are archived.
+        from_person (Person): The authenticated user performing the operation. Must be a superuser.
+        chunk_size (int): The number of person IDs processed per transaction.
+
+    Returns:
+        Dict[str, int]: The number of 'people' compacted and 'movements' archived.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        people = archived = 0
+
+        with unit_of_work() as session:
+            last_id = session.exec(select(func.max(Person.id))).one() or 0
+
+            for first_id in range(1, last_id + 1, chunk_size):
+                compacted, moved = compact_movements(
+                    session, before, first_id, first_id + chunk_size - 1
+                )
+                session.commit()
+
+                people += compacted
+                archived += moved
+
+        return {"people": people, "movements": archived}
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+@requires_auth
+def verify_ledger(
+    from_person: Person,
+    repair: bool = False,
+    chunk_size: int = 10000,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """Check that every balance matches the sum of its movements.
+
+    People are processed in chunks of consecutive IDs. Each chunk is checked with one query that
+    sums the movements with `GROUP BY person_id` and compares them with the balances, and chunks
+    can be checked by several threads, each with its own connection. With `repair`, the chunk is
+    checked and its wrong balances rewritten from the movements in one write transaction, and the
+    department summaries are rebuilt afterwards.
+
+    Args:
+        from_person (Person): The authenticated user performing the operation. Must be a superuser.
+        repair (bool): If True, rewrite the balances that do not match.
+        chunk_size (int): The number of person IDs checked per query.
+        workers (int): The number of chunks checked at the same time.
+
+    Returns:
+        Dict[str, Any]: The number of 'people' checked, the 'mismatches' found, each with the
+            'person_id', 'email', 'balance' and 'movements', and the number of balances 'repaired'.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        with unit_of_work() as session:
+            people, last_id = session.exec(
+                select(func.count(Person.id), func.max(Person.id))
+            ).one()
+            # End the read transaction, the chunks use their own.
+            session.commit()
+
+        check = _repair_chunk if repair else _verify_chunk
+        ranges = range(1, (last_id or 0) + 1, chunk_size)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(
+                lambda first_id: check(first_id, first_id + chunk_size - 1),
+                ranges,
+            )
+            mismatches = [mismatch for chunk in chunks for mismatch in chunk]
+
+            if repair and mismatches:
+                executor.submit(_rebuild_dept_summary).result()
+
+        return {
+            "people": people,
+            "mismatches": [mismatch._asdict() for mismatch in mismatches],
+            "repaired": len(mismatches) if repair else 0,
+        }
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+def _verify_chunk(first_id: int, last_id: int) -> List[Mismatch]:
+    with unit_of_work() as session:
+        return find_mismatches(session, first_id, last_id)
+
+
+@write_transaction
+def _repair_chunk(first_id: int, last_id: int) -> List[Mismatch]:
+    with unit_of_work() as session:
+        mismatches = find_mismatches(session, first_id, last_id)
+        repair_balances(session, mismatches)
+        return mismatches
+
+
+@write_transaction
+def _rebuild_dept_summary() -> None:
+    with unit_of_work() as session:
+        rebuild_dept_summary(session)
+
+
+@requires_auth
+def sync_rates(
+    from_person: Person,
+    currencies: Optional[List[str]] = None,
+    path: str = RATES_SNAPSHOT,
+) -> Dict[str, Decimal]:
+    """Download the current exchange rates to a local snapshot file.
+
+    With `DUNDIE_RATES_PROVIDER=snapshot`, every report then reads the rates from this file instead
+    of calling the exchange API.
+
+    Args:
+        from_person (Person): The authenticated user performing the operation. Must be a superuser.
+        currencies (List[str], optional): Currencies to download. Defaults to the currencies of
+            every employee.
+        path (str): The snapshot file to write.
+
+    Returns:
+        Dict[str, Decimal]: The saved rate of each currency.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+        RuntimeError: If a rate could not be downloaded. The snapshot is left unchanged.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        if currencies is None:
+            with unit_of_work() as session:
+                currencies = session.exec(
+                    select(Person.currency).distinct()
+                ).all()
+
+        rates = save_snapshot(currencies, path)
+        return {currency: rate.values for currency, rate in rates.items()}
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+@write_transaction
+@requires_auth
+def import_rates(filepath: str, from_person: Person) -> int:
+    """Import historical exchange rates from a CSV file.
+
+    The file has `currency`, `date` (YYYY-MM-DD) and `rate` columns. Each row is the rate of USD vs
+    the currency in effect from that date until the next row of the same currency, and replaces
+    any rate already stored for the same currency and date.
+
+    Args:
+        filepath (str): The path to the CSV file.
+        from_person (Person): The authenticated user performing the operation. Must be a superuser.
+
+    Returns:
+        int: The number of rates imported.
+
+    Raises:
+        AuthenticationError: If the authenticated user is not authorized to perform this action.
+        ValueError: If a row has an invalid date or rate.
+    """
+    try:
+        if from_person is not None and not from_person.superuser:
+            raise AuthenticationError("You can not perform this action!")
+
+        imported = 0
+        with open(filepath, newline="") as file, unit_of_work() as session:
+            rows = DictReader(file)
+            while batch := list(islice(rows, LOAD_BATCH_SIZE)):
+                save_rate_history(session, [_rate_entry(row) for row in batch])
+                imported += len(batch)
+
+        return imported
+
+    except Exception as e:
+        print(str(e))
+        raise e
+
+
+def _rate_entry(row: Dict[str, str]) -> tuple[str, date, Decimal]:
+    try:
+        rate = Decimal(row["rate"].strip())
+    except InvalidOperation:
+        raise ValueError(f"Invalid rate: {row['rate']}")
+    return (
+        row["currency"].strip(),
+        date.fromisoformat(row["date"].strip()),
+        rate,
+    )
@@ -1,23 +1,331 @@
 """Database connection and session management."""
 
+import random
+import sqlite3
+import threading
+import time
 import warnings
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, Optional, TypeVar
 
-from sqlalchemy.exc import SAWarning
+from sqlalchemy import Engine, event
+from sqlalchemy.exc import OperationalError, SAWarning
 from sqlmodel import Session, create_engine
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
 from dundie import models
-from dundie.settings import SQL_CON_STRING
+from dundie.settings import (
+    DB_BUSY_BACKOFF,
+    DB_BUSY_RETRIES,
+    DB_BUSY_TIMEOUT,
+    SQL_CON_STRING,
+)
+from dundie.utils.log import get_logger
 
 SelectOfScalar.inherit_cache = True
 Select.inherit_cache = True
 
 warnings.filterwarnings("ignore", category=SAWarning)
 
-engine = create_engine(SQL_CON_STRING, echo=False)
-models.SQLModel.metadata.create_all(engine)
+log = get_logger()
 
+T = TypeVar("T")
 
-def get_session() -> Session:
-    """Returns a new session."""
-    return Session(engine)
+IMMEDIATE = "dundie_immediate"
+BUSY_CODES = (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+
+
+def make_engine(
+    url: str = SQL_CON_STRING, create_tables: bool = True
+) -> Engine:
+    """Create an engine whose transactions are started by SQLAlchemy.
+
+    The sqlite3 driver delays BEGIN until the first write and commits on
+    the RELEASE of an outer SAVEPOINT, so `Session.begin_nested` would not
+    nest. The driver transaction handling is disabled and BEGIN is emitted
+    when SQLAlchemy starts a transaction: BEGIN IMMEDIATE for the units of
+    work that write, so they take the write lock up front instead of
+    failing to upgrade a read lock. Locked databases are waited for up to
+    `DB_BUSY_TIMEOUT` seconds.
+
+    Args:
+        url (str, optional): Database URL. Defaults to `SQL_CON_STRING`.
+        create_tables (bool, optional): Create the missing tables. Defaults
+            to True.
+
+    Returns:
+        Engine: The engine.
+    """
+    engine = create_engine(url, echo=False)
+
+    @event.listens_for(engine, "connect")
+    def _disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        dbapi_connection.execute(
+            f"PRAGMA busy_timeout = {int(DB_BUSY_TIMEOUT * 1000)}"
+        )
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        if connection.get_execution_options().get(IMMEDIATE):
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        else:
+            connection.exec_driver_sql("BEGIN")
+
+    if create_tables:
+        models.SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def clone_database(source: str, target: str) -> None:
+    """Copy a SQLite database file with the online backup API.
+
+    Used to start every test from a template database instead of creating
+    the tables again.
+
+    Args:
+        source (str): Path of the database to copy.
+        target (str): Path of the copy, replaced if it exists.
+    """
+    with closing(sqlite3.connect(source)) as src:
+        with closing(sqlite3.connect(target)) as dst:
+            src.backup(dst)
+
+
+engine = make_engine()
+
+ON_COMMIT = "on_commit"
+
+_current_session: ContextVar[Optional[Session]] = ContextVar(
+    "dundie_session", default=None
+)
+
+
+def get_session(immediate: bool = False) -> Session:
+    """Returns a new session.
+
+    Args:
+        immediate (bool, optional): Begin every transaction of the session
+            with BEGIN IMMEDIATE, including the ones started after a commit.
+    """
+    if not immediate:
+        return Session(engine)
+
+    session = Session(engine.execution_options(**{IMMEDIATE: True}))
+    session.info[IMMEDIATE] = True
+    return session
+
+
+@contextmanager
+def unit_of_work(immediate: bool = False) -> Iterator[Session]:
+    """Share one session and transaction for the length of a command.
+
+    The outermost call opens the session, commits it when the block exits
+    cleanly and rolls it back on error. Nested calls join the outer session,
+    so multi-step operations are atomic and objects are loaded once.
+
+    Args:
+        immediate (bool, optional): Take the write lock when each
+            transaction of the outermost call begins. Ignored by nested calls.
+
+    Yields:
+        Session: The session of the current unit of work.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
+
+    with (
+        get_session(immediate=True) if immediate else get_session()
+    ) as session:
+        token = _current_session.set(session)
+        try:
+            if immediate:
+                session.connection()
+            yield session
+            session.commit()
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            _current_session.reset(token)
+
+        for callback in session.info.pop(ON_COMMIT, []):
+            callback()
+
+
+@contextmanager
+def outside_unit_of_work() -> Iterator[None]:
+    """Run the units of work of a block in their own sessions.
+
+    A deferred unit of work writing after it read has to upgrade its read
+    lock, which fails while another connection holds the write lock. Reports
+    that need to write, e.g. to store the rates they use, end their read
+    transaction instead and write in a `write_transaction` of its own, then
+    read again in a new transaction. Inside an IMMEDIATE unit of work, which
+    already holds the write lock, the block joins it.
+
+    Only use it in units of work that did not write yet.
+    """
+    session = _current_session.get()
+    if session is None or session.info.get(IMMEDIATE):
+        yield
+        return
+
+    session.commit()
+    token = _current_session.set(None)
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+def on_commit(session: Session, callback: Callable[[], None]) -> None:
+    """Run a callback once the unit of work of the session is committed.
+
+    Args:
+        session (Session): Session of the current unit of work.
+        callback (Callable[[], None]): Function called after the commit.
+    """
+    session.info.setdefault(ON_COMMIT, []).append(callback)
+
+
+class ContentionStats:
+    """Counters of the write transactions that found the database locked.
+
+    Attributes:
+        transactions (int): Write transactions committed.
+        retries (int): Attempts that found the database locked and were
+            retried.
+        failures (int): Transactions that gave up after `DB_BUSY_RETRIES`.
+        waited (float): Seconds slept between attempts.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        """Sets every counter to zero."""
+        with self._lock:
+            self.transactions = 0
+            self.retries = 0
+            self.failures = 0
+            self.waited = 0.0
+
+    def record(self, **deltas: float) -> None:
+        """Adds to the counters.
+
+        Args:
+            **deltas (float): Amount added to each named counter.
+        """
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns a snapshot of the counters."""
+        with self._lock:
+            return {
+                "transactions": self.transactions,
+                "retries": self.retries,
+                "failures": self.failures,
+                "waited": self.waited,
+            }
+
+
+contention = ContentionStats()
+
+
+def contention_stats() -> Dict[str, float]:
+    """Returns the contention counters of this process.
+
+    Returns:
+        Dict[str, float]: Committed write transactions, retries, failures
+            and seconds waited between retries.
+    """
+    return contention.as_dict()
+
+
+def is_busy(error: OperationalError) -> bool:
+    """Tells whether an error was raised because the database is locked.
+
+    Args:
+        error (OperationalError): Error raised by the driver.
+
+    Returns:
+        bool: True for SQLITE_BUSY and SQLITE_LOCKED errors.
+    """
+    code = getattr(error.orig, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in BUSY_CODES
+    return "database is locked" in str(error.orig)
+
+
+def write_transaction(func):
+    """Decorator running a write operation in its own IMMEDIATE unit of
+    work, retried with jittered exponential backoff while the database is
+    locked.
+
+    Calls made inside another unit of work join it and are not retried:
+    the outermost unit of work owns the transaction.
+
+    Args:
+        func (function): Function to decorate.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_session.get() is not None:
+            return func(*args, **kwargs)
+
+        def attempt():
+            with unit_of_work(immediate=True):
+                return func(*args, **kwargs)
+
+        return retry_while_busy(attempt, func.__name__)
+
+    return wrapper
+
+
+def retry_while_busy(transaction: Callable[[], T], name: str) -> T:
+    """Run a write transaction again, with jittered exponential backoff,
+    while the database is locked.
+
+    Args:
+        transaction (Callable[[], T]): Function opening, running and
+            committing the whole transaction, so every attempt starts over.
+        name (str): Name of the transaction in the log.
+
+    Returns:
+        T: The result of the attempt that committed.
+
+    Raises:
+        OperationalError: If the database is still locked after
+            `DB_BUSY_RETRIES` retries, or on any other database error.
+    """
+    attempt = 0
+    while True:
+        try:
+            result = transaction()
+        except OperationalError as e:
+            if not is_busy(e):
+                raise
+            if attempt >= DB_BUSY_RETRIES:
+                contention.record(failures=1)
+                raise
+
+            delay = random.uniform(0, DB_BUSY_BACKOFF * 2**attempt)
+            attempt += 1
+            contention.record(retries=1, waited=delay)
+            log.warning(
+                f"Database is locked, retrying {name} "
+                f"in {delay:.3f}s ({attempt}/{DB_BUSY_RETRIES})"
+            )
+            time.sleep(delay)
+        else:
+            contention.record(transactions=1)
+            return result
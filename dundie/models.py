@@ -1,10 +1,10 @@
 """Models module."""
 
-from datetime import datetime
+from datetime import date, datetime
 from typing import List, Optional
 
 from pydantic import condecimal, field_validator
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Index, Relationship, SQLModel
 from dundie.utils.email import check_valid_email
 from dundie.utils.user import generate_simple_password
 
@@ -25,6 +25,7 @@ class Person(SQLModel, table=True):
         currency: str - Person's currency.
         balance: List[Balance] - Person's balance.
         movement: List[Movement] - Person's movements.
+        archived_movement: List[MovementArchive] - Person's archived movements.
         user: User - Person's user.
 
     Methods:
@@ -35,15 +36,23 @@ class Person(SQLModel, table=True):
         InvalidEmailError - Raised when the email is invalid.
     """
 
+    __table_args__ = (Index("ix_person_dept_email", "dept", "email"),)
+
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     email: str = Field(nullable=False, index=True)
     name: str = Field(nullable=False)
     dept: str = Field(nullable=False, index=True)
     role: str = Field(nullable=False)
-    currency: str = Field(default="USD")
+    currency: str = Field(default="USD", index=True)
 
     balance: List["Balance"] = Relationship(back_populates="person")
-    movement: List["Movement"] = Relationship(back_populates="person")
+    movement: List["Movement"] = Relationship(
+        back_populates="person",
+        sa_relationship_kwargs={"order_by": "Movement.date"},
+    )
+    archived_movement: List["MovementArchive"] = Relationship(
+        back_populates="person"
+    )
     user: "User" = Relationship(back_populates="person")
 
     @property
@@ -80,7 +89,7 @@ class Balance(SQLModel, table=True):
     person_id: int = Field(
         foreign_key="person.id", sa_column_kwargs={"unique": True}
     )
-    value: condecimal(decimal_places=3) = Field(default=0)
+    value: condecimal(decimal_places=3) = Field(default=0, index=True)
 
     person: Person = Relationship(back_populates="balance")
 
@@ -106,11 +115,16 @@ class Movement(SQLModel, table=True):
         None
     """
 
+    __table_args__ = (
+        Index("ix_movement_actor_date", "actor", "date"),
+        Index("ix_movement_person_id_date", "person_id", "date"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True, index=True)
     person_id: int = Field(foreign_key="person.id")
     actor: str = Field(nullable=False, index=True)
     value: condecimal(decimal_places=3) = Field(default=0)
-    date: datetime = Field(default_factory=lambda: datetime.now())
+    date: datetime = Field(default_factory=lambda: datetime.now(), index=True)
 
     person: Person = Relationship(back_populates="movement")
 
@@ -118,6 +132,42 @@ class Movement(SQLModel, table=True):
         json_encoders = {Person: lambda p: p.pk}
 
 
+class MovementArchive(SQLModel, table=True):
+    """Archived movement model.
+
+    Movements moved out of the `movement` table by the ledger compaction.
+    They keep their original ID and are replaced in `movement` by a single
+    carry-forward movement per person.
+
+    Attributes:
+        id: int - Original movement's ID.
+        person_id: int - Person's ID.
+        actor: str - Movement's actor.
+        value: condecimal - Movement's value.
+        date: datetime - Movement's date.
+        archived_at: datetime - When the movement was archived.
+        person: Person - Person's archived movement.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    id: int = Field(primary_key=True)
+    person_id: int = Field(foreign_key="person.id", index=True)
+    actor: str = Field(nullable=False)
+    value: condecimal(decimal_places=3) = Field(default=0)
+    date: datetime = Field(nullable=False, index=True)
+    archived_at: datetime = Field(default_factory=lambda: datetime.now())
+
+    person: Person = Relationship(back_populates="archived_movement")
+
+    class Config:
+        json_encoders = {Person: lambda p: p.pk}
+
+
 class User(SQLModel, table=True):
     """User model.
 
@@ -144,3 +194,128 @@ class User(SQLModel, table=True):
 
     class Config:
         json_encoders = {Person: lambda p: p.pk}
+
+
+class DeptSummary(SQLModel, table=True):
+    """Department summary model.
+
+    Materialised per-department figures, kept up to date in the same
+    transaction as the writes that change them.
+
+    Attributes:
+        dept: str - Department name.
+        headcount: int - Number of people in the department.
+        balance: condecimal - Sum of the balances of the department.
+        granted: condecimal - Points granted to the department in `month`.
+        month: str - Month (YYYY-MM) the granted points refer to.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    dept: str = Field(primary_key=True)
+    headcount: int = Field(default=0)
+    balance: condecimal(decimal_places=3) = Field(default=0)
+    granted: condecimal(decimal_places=3) = Field(default=0)
+    month: str = Field(default="")
+
+
+class PersonFingerprint(SQLModel, table=True):
+    """Person fingerprint model.
+
+    Digest of the loaded fields of a person, used by delta loads to skip
+    CSV rows that did not change since the last load.
+
+    Attributes:
+        email: str - Person's email.
+        digest: str - Digest of name, dept, role and currency.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    email: str = Field(primary_key=True)
+    digest: str = Field(nullable=False)
+
+
+class ExchangeRate(SQLModel, table=True):
+    """Exchange rate model.
+
+    Last known rate of USD vs each currency, refreshed by the reports and
+    joined in SQL to compute converted values.
+
+    Attributes:
+        currency: str - Currency code.
+        rate: condecimal - Rate of USD vs the currency.
+        fetched_at: datetime - When the rate was fetched.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    currency: str = Field(primary_key=True)
+    rate: condecimal(decimal_places=6) = Field(default=0)
+    fetched_at: datetime = Field(default_factory=lambda: datetime.now())
+
+
+class ExchangeRateHistory(SQLModel, table=True):
+    """Exchange rate history model.
+
+    Rate of USD vs a currency in effect from `day` until the next entry of
+    the same currency, used to convert movements at the rate of their date.
+
+    Attributes:
+        currency: str - Currency code.
+        day: date - First day the rate is in effect.
+        rate: condecimal - Rate of USD vs the currency.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    currency: str = Field(primary_key=True)
+    day: date = Field(primary_key=True)
+    rate: condecimal(decimal_places=6) = Field(default=0)
+
+
+class IdempotencyKey(SQLModel, table=True):
+    """Idempotency key model.
+
+    Outcome of a write sent with an idempotency key, returned again when
+    the same request is retried instead of applying it twice.
+
+    Attributes:
+        actor: str - Email of the person who sent the request.
+        key: str - Idempotency key chosen by the client.
+        operation: str - Name of the operation.
+        request: str - JSON arguments of the request.
+        outcome: str - JSON outcome of the request.
+        created_at: datetime - When the request was applied.
+
+    Methods:
+        None
+
+    Raises:
+        None
+    """
+
+    actor: str = Field(primary_key=True)
+    key: str = Field(primary_key=True)
+    operation: str = Field(nullable=False)
+    request: str = Field(nullable=False)
+    outcome: str = Field(nullable=False)
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(), index=True
+    )
@@ -0,0 +1,270 @@
+"""Long-lived server exposing the `dundie.core` operations.
+
+The server keeps the database engine, the exchange rates and the verified
+credentials in memory, so the clients of `dundie.client` do not pay the
+start up, authentication and rate fetching costs on every command. The
+protocol is described in `dundie.client`.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import socket
+import socketserver
+import stat
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from sqlmodel import Session, select
+
+from dundie import core
+from dundie.client import parse_address
+from dundie.database import contention_stats, unit_of_work
+from dundie.models import Person
+from dundie.settings import SERVER_AUTH_TTL, SERVER_RATES_TTL, SERVER_SOCKET
+from dundie.utils.auth import (
+    AuthenticationError,
+    authenticate,
+    authenticated_as,
+)
+from dundie.utils.batch import WriteQueue
+from dundie.utils.exchange import configure_rates_cache
+from dundie.utils.log import get_logger
+from dundie.utils.output import to_json
+from dundie.utils.rows import jsonable
+
+log = get_logger()
+
+OPERATIONS: Dict[str, Callable[..., Any]] = {
+    "load": core.load,
+    "load_diff": core.load_diff,
+    "read": core.read,
+    "read_page": core.read_page,
+    "refresh_rates": core.refresh_rates,
+    "add": core.add,
+    "transfer": core.transfer,
+    "movements": core.movements,
+    "history": core.history,
+    "top": core.top,
+    "dept_stats": core.dept_stats,
+    "summary": core.summary,
+    "compact": core.compact,
+    "verify_ledger": core.verify_ledger,
+    "sync_rates": core.sync_rates,
+    "import_rates": core.import_rates,
+    "contention": contention_stats,
+}
+
+BATCHED_OPERATIONS = frozenset({"add", "transfer"})
+
+ARGUMENTS: Dict[str, Dict[str, Callable[[Any], Any]]] = {
+    "compact": {"before": datetime.fromisoformat},
+    "movements": {
+        "since": datetime.fromisoformat,
+        "until": datetime.fromisoformat,
+    },
+    "history": {
+        "since": datetime.fromisoformat,
+        "until": datetime.fromisoformat,
+    },
+    "summary": {
+        "since": datetime.fromisoformat,
+        "until": datetime.fromisoformat,
+    },
+}
+
+
+class Server:
+    """Runs the requests of the clients.
+
+    Requests run one at a time, each in its own unit of work, because
+    SQLite only has one writer. The `BATCHED_OPERATIONS` of concurrent
+    clients are committed together by a `WriteQueue`. Credentials are
+    verified with Argon2 once and then remembered for `auth_ttl` seconds.
+
+    Attributes:
+        auth_ttl (float): Seconds verified credentials are remembered.
+        writes (WriteQueue): Queue of the batched operations.
+    """
+
+    def __init__(self, auth_ttl: float = SERVER_AUTH_TTL) -> None:
+        self.auth_ttl = auth_ttl
+        self._key = secrets.token_bytes(32)
+        self._logins: Dict[Tuple[str, bytes], float] = {}
+        self._lock = threading.Lock()
+        self.writes = WriteQueue(lock=self._lock)
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Runs one request.
+
+        Args:
+            request (Dict[str, Any]): Decoded request of a client.
+
+        Returns:
+            Dict[str, Any]: Response with the result or the error raised.
+        """
+        try:
+            result = self._dispatch(request)
+            if isinstance(result, Iterator):
+                result = list(result)
+            result = jsonable(result)
+        except Exception as e:
+            log.error(f"Request {request.get('op')!r} failed: {e}")
+            return {"ok": False, "error": type(e).__name__, "message": str(e)}
+        return {"ok": True, "result": result}
+
+    def _dispatch(self, request: Dict[str, Any]) -> Any:
+        op = request.get("op")
+        if op == "ping":
+            return "pong"
+        if op not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {op}")
+
+        kwargs = dict(request.get("args") or {})
+        for name, convert in ARGUMENTS.get(op, {}).items():
+            if kwargs.get(name) is not None:
+                kwargs[name] = convert(kwargs[name])
+
+        with self._lock:
+            with unit_of_work() as session:
+                empty = not session.exec(select(Person.id)).first()
+                if not empty:
+                    email = self._login(
+                        session, request.get("email"), request.get("password")
+                    )
+
+            if empty:
+                return OPERATIONS[op](**kwargs)
+            if op not in BATCHED_OPERATIONS:
+                with authenticated_as(email):
+                    return OPERATIONS[op](**kwargs)
+
+        return self.writes.submit(OPERATIONS[op], kwargs, email).result()
+
+    def close(self) -> None:
+        """Applies the queued writes and stops the write queue."""
+        self.writes.close()
+
+    def _login(
+        self, session: Session, email: Optional[str], password: Optional[str]
+    ) -> str:
+        if not all([email, password]):
+            raise AuthenticationError(
+                "Variables DUNDIE_EMAIL and DUNDIE_PASSWORD not definied."
+            )
+
+        digest = hmac.new(self._key, password.encode(), hashlib.sha256)
+        key = (email, digest.digest())
+        if self._logins.get(key, 0) > time.monotonic():
+            return email
+
+        authenticate(session, email, password)
+        self._logins[key] = time.monotonic() + self.auth_ttl
+        return email
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                response = {
+                    "ok": False,
+                    "error": "ValueError",
+                    "message": "Invalid request.",
+                }
+            else:
+                response = self.server.dundie.handle(request)
+
+            data = json.dumps(response, default=to_json).encode()
+            self.wfile.write(data + b"\n")
+            self.wfile.flush()
+
+
+class _DundieServer:
+    daemon_threads = True
+    dundie: Optional[Server] = None
+
+    def server_close(self) -> None:
+        super().server_close()
+        if self.dundie is not None:
+            self.dundie.close()
+
+
+class _UnixServer(_DundieServer, socketserver.ThreadingUnixStreamServer):
+    def server_bind(self) -> None:
+        _remove_stale_socket(self.server_address)
+        super().server_bind()
+        os.chmod(self.server_address, 0o600)
+
+    def server_close(self) -> None:
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+class _TCPServer(_DundieServer, socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+
+
+def create_server(
+    address: str = SERVER_SOCKET,
+    rates_ttl: float = SERVER_RATES_TTL,
+) -> socketserver.BaseServer:
+    """Creates a server listening on a Unix socket or a local TCP port.
+
+    Args:
+        address (str, optional): Path of a Unix socket or `host:port`.
+        rates_ttl (float, optional): Seconds the exchange rates are cached.
+
+    Returns:
+        socketserver.BaseServer: Server ready for `serve_forever`.
+
+    Raises:
+        RuntimeError: If another server is listening on the socket.
+    """
+    family, bind_address = parse_address(address)
+    server_class = _UnixServer if family == socket.AF_UNIX else _TCPServer
+
+    server = server_class(bind_address, _Handler)
+    server.dundie = Server()
+    configure_rates_cache(rates_ttl)
+    return server
+
+
+def serve(
+    address: str = SERVER_SOCKET,
+    rates_ttl: float = SERVER_RATES_TTL,
+) -> None:
+    """Serves the `dundie.core` operations until interrupted.
+
+    Args:
+        address (str, optional): Path of a Unix socket or `host:port`.
+        rates_ttl (float, optional): Seconds the exchange rates are cached.
+    """
+    with create_server(address, rates_ttl) as server:
+        log.info(f"Serving on {address}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+
+def _remove_stale_socket(path: str) -> None:
+    if not os.path.exists(path):
+        return
+    if not stat.S_ISSOCK(os.stat(path).st_mode):
+        raise RuntimeError(f"{path} exists and is not a socket.")
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.unlink(path)
+            return
+    raise RuntimeError(f"A server is already listening on {path}.")
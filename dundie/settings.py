@@ -1,10 +1,45 @@
 """Settings for the Dundie project."""
 
 import os
+import tempfile
 
 ROOT_PATH: str = os.path.dirname(__file__)
 DATABASE_PATH: str = os.path.join(ROOT_PATH, "..", "assets", "database.db")
 SQL_CON_STRING = f"sqlite:///{DATABASE_PATH}"
+DB_BUSY_TIMEOUT: float = float(os.getenv("DUNDIE_DB_BUSY_TIMEOUT", 5))
+DB_BUSY_RETRIES: int = int(os.getenv("DUNDIE_DB_BUSY_RETRIES", 5))
+DB_BUSY_BACKOFF: float = 0.05
 
 DATEFMT: str = "%d/%m/%Y %H:%M:%S"
+BUCKETS: tuple = ("day", "week", "month")
 API_BASE_URL = "https://economia.awesomeapi.com.br/json/last/USD-{currency}"
+RATES_PROVIDER: str = os.getenv("DUNDIE_RATES_PROVIDER", "http")
+RATES_STATIC: str = os.getenv("DUNDIE_RATES_STATIC", "")
+RATES_MAX_AGE: int = int(os.getenv("DUNDIE_RATES_MAX_AGE", 3600))
+RATES_SNAPSHOT: str = os.getenv(
+    "DUNDIE_RATES_SNAPSHOT",
+    os.path.join(ROOT_PATH, "..", "assets", "rates.json"),
+)
+
+PASSWORD_PROFILE: str = os.getenv("DUNDIE_PASSWORD_PROFILE", "default")
+ARGON2_TIME_COST: int = int(os.getenv("DUNDIE_ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST: int = int(os.getenv("DUNDIE_ARGON2_MEMORY_COST", 65536))
+ARGON2_PARALLELISM: int = int(os.getenv("DUNDIE_ARGON2_PARALLELISM", 4))
+PASSWORDS_FILE: str = "passwords_txt.txt"
+PASSWORDS_RUN_FILE: str = "passwords_{timestamp:%Y%m%d%H%M%S}_{suffix}.txt"
+
+LOAD_BATCH_SIZE: int = 500
+LOAD_CHUNK_SIZE: int = 8 * 1024 * 1024
+LOAD_WORKERS: int = int(os.getenv("DUNDIE_LOAD_WORKERS", os.cpu_count() or 1))
+
+TABLE_MAX_ROWS: int = 1000
+READ_PAGE_SIZE: int = 1000
+
+IDEMPOTENCY_TTL: int = int(os.getenv("DUNDIE_IDEMPOTENCY_TTL", 24 * 60 * 60))
+
+SERVER_SOCKET: str = os.path.join(tempfile.gettempdir(), "dundie.sock")
+SERVER_AUTH_TTL: int = 15 * 60
+SERVER_RATES_TTL: int = 5 * 60
+
+WRITE_BATCH_SIZE: int = 200
+WRITE_BATCH_WAIT: float = 0.005
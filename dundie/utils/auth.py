@@ -1,14 +1,27 @@
 """Module to define authentication for the CLI commands."""
 
 import os
+from contextlib import contextmanager
+from contextvars import ContextVar
 from functools import wraps
+from typing import Iterator, Optional
 
 from sqlalchemy.orm import selectinload
-from sqlmodel import select
+from sqlmodel import Session, select
 
-from dundie.database import get_session
-from dundie.models import Person
-from dundie.utils.user import verify_password
+from dundie.database import on_commit, unit_of_work, write_transaction
+from dundie.models import Person, User
+from dundie.utils.db import remember_person
+from dundie.utils.log import get_logger
+from dundie.utils.user import get_password_hash, needs_rehash, verify_password
+
+log = get_logger()
+
+AUTH_PERSON = "auth_person"
+
+_authenticated_email: ContextVar[Optional[str]] = ContextVar(
+    "dundie_authenticated_email", default=None
+)
 
 
 class AuthenticationError(Exception):
@@ -17,46 +30,122 @@ class AuthenticationError(Exception):
     pass
 
 
+@contextmanager
+def authenticated_as(email: str) -> Iterator[None]:
+    """Run the decorated functions as an already authenticated person.
+
+    Used by the server, which checks the credentials of a client once and
+    then skips the password verification of every request.
+
+    Args:
+        email (str): Email of the authenticated person.
+    """
+    token = _authenticated_email.set(email)
+    try:
+        yield
+    finally:
+        _authenticated_email.reset(token)
+
+
+def authenticate(
+    session: Session, email: str, password: Optional[str] = None
+) -> Person:
+    """Get a person and check their password.
+
+    Passwords hashed with other parameters than the current ones are hashed
+    again once verified, after the unit of work of the session is committed,
+    in a short write transaction of their own. A failed rehash is logged and
+    retried at the next login.
+
+    Args:
+        session (Session): Database session.
+        email (str): Email of the person.
+        password (str, optional): Plain password. The check is skipped when
+            None, for people already authenticated.
+
+    Returns:
+        Person: The authenticated person.
+
+    Raises:
+        AuthenticationError: If the person doesn't exist or the password
+            doesn't match.
+    """
+    person = session.info.get(AUTH_PERSON)
+    if person is not None and person.email == email:
+        return person
+
+    person = session.exec(
+        select(Person)
+        .options(
+            selectinload(Person.balance),
+            selectinload(Person.user),
+            selectinload(Person.movement),
+        )
+        .where(Person.email == email)
+    ).first()
+
+    if not person:
+        raise AuthenticationError("User doesn't exist.")
+
+    if password is not None:
+        if not verify_password(password, person.user.password):
+            raise AuthenticationError("Authentication Error.")
+
+        if needs_rehash(person.user.password):
+            user_id = person.user.id
+            on_commit(session, lambda: _rehash_password(user_id, password))
+
+    session.info[AUTH_PERSON] = remember_person(session, person)
+    return person
+
+
+def _rehash_password(user_id: int, password: str) -> None:
+    try:
+        _save_password(user_id, get_password_hash(password))
+    except Exception as e:
+        log.warning(f"Could not rehash the password of user {user_id}: {e}")
+
+
+@write_transaction
+def _save_password(user_id: int, password_hash: str) -> None:
+    with unit_of_work() as session:
+        user = session.get(User, user_id)
+        user.password = password_hash
+        session.add(user)
+
+
 def requires_auth(func):
     """Decorator to require authentication.
 
+    The decorated function runs inside the current unit of work, so nested
+    calls share the session and the already authenticated person.
+
     Args:
         func (function): Function to decorate.
     """
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        with get_session() as session:
-            existing_user = session.exec(select(Person)).first()
-
-        if not existing_user:
-            return func(*args, from_person=None, **kwargs)
-
-        email = os.getenv("DUNDIE_EMAIL")
-        password = os.getenv("DUNDIE_PASSWORD")
-
-        if not all([email, password]):
-            raise AuthenticationError(
-                "Variables DUNDIE_EMAIL and DUNDIE_PASSWORD not definied."
-            )
-
-        with get_session() as session:
-            person = session.exec(
-                select(Person)
-                .options(
-                    selectinload(Person.balance),
-                    selectinload(Person.user),
-                    selectinload(Person.movement),
-                )
-                .where(Person.email == email)
-            ).first()
+        with unit_of_work() as session:
+            existing_user = session.exec(select(Person.id)).first()
 
-            if not person:
-                raise AuthenticationError("User doesn't exist.")
+            if not existing_user:
+                return func(*args, from_person=None, **kwargs)
 
-            if not verify_password(password, person.user.password):
-                raise AuthenticationError("Authentication Error.")
+            email = _authenticated_email.get()
+            if email is not None:
+                person = authenticate(session, email)
+                return func(*args, from_person=person, **kwargs)
+
+            email = os.getenv("DUNDIE_EMAIL")
+            password = os.getenv("DUNDIE_PASSWORD")
+
+            if not all([email, password]):
+                raise AuthenticationError(
+                    "Variables DUNDIE_EMAIL and DUNDIE_PASSWORD not definied."
+                )
 
-        return func(*args, from_person=person, **kwargs)
+            person = authenticate(session, email, password)
+            return func(*args, from_person=person, **kwargs)
 
     return wrapper
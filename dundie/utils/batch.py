@@ -0,0 +1,179 @@
+"""Group commit of the `dundie.core` write operations.
+
+Every write running in its own transaction costs one SQLite commit, and so
+one fsync. `WriteQueue` collects the writes of concurrent callers for a
+short time and applies them in a single transaction, each one in its own
+SAVEPOINT, so a failing write is rolled back alone and the others are
+committed together. A batch that finds the database locked is retried with
+backoff, like a `write_transaction`.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import nullcontext
+from typing import Any, Callable, List, NamedTuple, Optional
+
+from dundie.database import retry_while_busy, unit_of_work
+from dundie.settings import WRITE_BATCH_SIZE, WRITE_BATCH_WAIT
+from dundie.utils.auth import authenticated_as
+from dundie.utils.log import get_logger
+
+log = get_logger()
+
+
+class Write(NamedTuple):
+    """A write waiting in the queue.
+
+    Attributes:
+        func: Callable[..., Any] - Operation of `dundie.core`.
+        kwargs: dict - Arguments of the operation.
+        email: Optional[str] - Person the operation runs as. The
+            credentials of the environment are used when None.
+        future: Future - Resolved with the result or the error.
+    """
+
+    func: Callable[..., Any]
+    kwargs: dict
+    email: Optional[str]
+    future: Future
+
+
+class WriteQueue:
+    """Applies the writes of concurrent callers in shared transactions.
+
+    A batch is applied when `max_batch` writes are waiting or `max_wait`
+    seconds after its first write arrived, whichever comes first.
+
+    Attributes:
+        max_batch (int): Most writes applied in one transaction.
+        max_wait (float): Seconds a write waits for others to join it.
+        lock (threading.Lock, optional): Lock held while a batch is
+            applied, shared with the other users of the database.
+    """
+
+    def __init__(
+        self,
+        max_batch: int = WRITE_BATCH_SIZE,
+        max_wait: float = WRITE_BATCH_WAIT,
+        lock: Optional[threading.Lock] = None,
+    ) -> None:
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.lock = lock or threading.Lock()
+        self._queue: "queue.Queue[Optional[Write]]" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        func: Callable[..., Any],
+        kwargs: Optional[dict] = None,
+        email: Optional[str] = None,
+    ) -> Future:
+        """Queues a write.
+
+        Args:
+            func (Callable[..., Any]): Operation of `dundie.core`, e.g.
+                `core.add` or `core.transfer`.
+            email (str, optional): Email of the authenticated person the
+                operation runs as.
+            kwargs (dict, optional): Arguments of the operation.
+
+        Returns:
+            Future: Resolved with the result of the operation once its
+                transaction is committed, or with the error it raised.
+
+        Raises:
+            RuntimeError: If the queue is closed.
+        """
+        if self._closed:
+            raise RuntimeError("The write queue is closed.")
+
+        future: Future = Future()
+        self._queue.put(Write(func, kwargs or {}, email, future))
+        return future
+
+    def close(self) -> None:
+        """Applies the queued writes and stops the queue."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self) -> "WriteQueue":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _run(self) -> None:
+        while True:
+            write = self._queue.get()
+            if write is None:
+                return
+
+            batch = [write]
+            stop = self._collect(batch)
+            self._apply(batch)
+            if stop:
+                return
+
+    def _collect(self, batch: List[Write]) -> bool:
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                write = self._queue.get(timeout=max(timeout, 0))
+            except queue.Empty:
+                return False
+            if write is None:
+                return True
+            batch.append(write)
+        return False
+
+    def _apply(self, batch: List[Write]) -> None:
+        def transaction() -> list:
+            outcomes = []
+            with self.lock, unit_of_work(immediate=True) as session:
+                for write in batch:
+                    try:
+                        with session.begin_nested():
+                            outcomes.append((write, _call(write), None))
+                    except Exception as e:
+                        outcomes.append((write, None, e))
+            return outcomes
+
+        try:
+            outcomes = retry_while_busy(transaction, "batch")
+        except Exception as e:
+            log.error(f"Batch of {len(batch)} writes failed: {e}")
+            for write in batch:
+                self._apply_alone(write)
+            return
+
+        for write, result, error in outcomes:
+            if error is None:
+                write.future.set_result(result)
+            else:
+                write.future.set_exception(error)
+
+    def _apply_alone(self, write: Write) -> None:
+        def transaction() -> Any:
+            with self.lock, unit_of_work(immediate=True):
+                return _call(write)
+
+        try:
+            result = retry_while_busy(transaction, write.func.__name__)
+        except Exception as e:
+            write.future.set_exception(e)
+        else:
+            write.future.set_result(result)
+
+
+def _call(write: Write) -> Any:
+    context = authenticated_as(write.email) if write.email else nullcontext()
+    with context:
+        return write.func(**write.kwargs)
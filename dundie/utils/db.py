@@ -2,19 +2,43 @@
 
 from __future__ import annotations
 
-from typing import Optional
+import hashlib
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Iterable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, delete, func, select, union_all
+
+from dundie.models import (
+    Balance,
+    DeptSummary,
+    ExchangeRate,
+    ExchangeRateHistory,
+    IdempotencyKey,
+    Movement,
+    MovementArchive,
+    Person,
+    PersonFingerprint,
+    User,
+)
+from dundie.utils.exchange import USDRate
+from dundie.utils.ledger import CARRY_FORWARD_ACTOR
+from dundie.utils.passwords import PasswordWriter, create_pw_txt
+from dundie.utils.user import get_password_hash
 
-from sqlmodel import Session, select
+PERSON_CACHE = "person_cache"
 
-from dundie.models import Balance, Movement, Person, User
-from dundie.utils.passwords import create_pw_txt
-from dundie.utils.user import get_password_hash
+LOADED_FIELDS = ("name", "dept", "role", "currency")
 
 
 def add_person(
     session: Session,
     instance: Person,
     password: str | None = None,
+    pw_writer: PasswordWriter | None = None,
 ) -> tuple[Person, bool]:
     """Add person to database.
 
@@ -22,32 +46,44 @@ def add_person(
     - If exists, update, ele create.
     - Set initial balance (managers = 100, others = 500).
     - Generate a password if user is new and send email.
+    - Keep the department summary in step with new people and dept moves.
 
     Args:
         session (Session): Database session.
         instance (Person): Person instance.
+        password (str, optional): Plain password, generated if not given.
+        pw_writer (PasswordWriter, optional): Buffered sink for the plain
+        password. Defaults to appending straight to the passwords file.
 
     Returns:
         tuple[Person, bool]: Person instance and created flag.
     """
-    existing = session.exec(
-        select(Person).where(Person.email == instance.email)
-    ).first()
+    existing = get_person(session, email=instance.email)
 
     created = existing is None
 
     if created:
         session.add(instance)
+        remember_person(session, instance)
+
+        update_dept_summary(session, instance.dept, headcount=1)
 
         set_initial_balance(session, instance)
 
         password = set_initial_password(session, instance, password)
 
-        create_pw_txt(instance.email, password)
+        if pw_writer is not None:
+            pw_writer.write(instance.email, password)
+        else:
+            create_pw_txt(instance.email, password)
 
         return instance, created
 
     elif isinstance(existing, Person):
+        if existing.dept != instance.dept:
+            move_dept_summary(session, existing, instance.dept)
+
+        existing.name = instance.name
         existing.dept = instance.dept
         existing.role = instance.role
         existing.currency = instance.currency
@@ -55,6 +91,128 @@ def add_person(
         return instance, created
 
 
+def get_person(
+    session: Session,
+    email: str | None = None,
+    person_id: int | None = None,
+) -> Person | None:
+    """Get a person by email or id through the session identity cache.
+
+    Each person is selected at most once per session: later lookups by
+    either key return the cached instance without touching the database.
+
+    Args:
+        session (Session): Database session.
+        email (str, optional): Person's email.
+        person_id (int, optional): Person's ID.
+
+    Returns:
+        Person | None: Person instance or None if not found.
+    """
+    cache = session.info.setdefault(PERSON_CACHE, {})
+    key = ("email", email) if email is not None else ("id", person_id)
+
+    person = cache.get(key)
+    if person is None:
+        if email is not None:
+            sql = select(Person).where(Person.email == email)
+        else:
+            sql = select(Person).where(Person.id == person_id)
+
+        person = session.exec(sql).first()
+        if person is not None:
+            remember_person(session, person)
+
+    return person
+
+
+def get_people(
+    session: Session,
+    dept: str | None = None,
+    email: str | None = None,
+) -> list[Person]:
+    """Get the people matching the filters and register them in the cache.
+
+    Args:
+        session (Session): Database session.
+        dept (str, optional): Department to filter by.
+        email (str, optional): Email to filter by.
+
+    Returns:
+        list[Person]: Matching person instances.
+    """
+    if email is not None and dept is None:
+        person = get_person(session, email=email)
+        return [person] if person is not None else []
+
+    sql = select(Person)
+    if dept is not None:
+        sql = sql.where(Person.dept == dept)
+    if email is not None:
+        sql = sql.where(Person.email == email)
+
+    return [remember_person(session, person) for person in session.exec(sql)]
+
+
+def remember_person(session: Session, person: Person) -> Person:
+    """Register a person in the session identity cache.
+
+    Instances loaded by another session are attached without being
+    reloaded from the database.
+
+    Args:
+        session (Session): Database session.
+        person (Person): Person instance.
+
+    Returns:
+        Person: Person instance attached to the session.
+    """
+    if person not in session:
+        person = session.merge(person, load=False)
+
+    cache = session.info.setdefault(PERSON_CACHE, {})
+    cache[("email", person.email)] = person
+    if person.id is not None:
+        cache[("id", person.id)] = person
+
+    return person
+
+
+def forget_person(session: Session, person: Person) -> None:
+    """Remove a person from the session identity cache.
+
+    Args:
+        session (Session): Database session.
+        person (Person): Person instance.
+    """
+    cache = session.info.get(PERSON_CACHE, {})
+    cache.pop(("email", person.email), None)
+    cache.pop(("id", person.id), None)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _forget_people_on_rollback(session, previous_transaction) -> None:
+    session.info.pop(PERSON_CACHE, None)
+
+
+@event.listens_for(Session, "after_flush")
+def _forget_deleted_people(session, flush_context) -> None:
+    for instance in session.deleted:
+        if isinstance(instance, Person):
+            forget_person(session, instance)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _forget_people_on_bulk_write(orm_execute_state) -> None:
+    mapper = orm_execute_state.bind_mapper
+    if (
+        (orm_execute_state.is_update or orm_execute_state.is_delete)
+        and mapper is not None
+        and mapper.class_ is Person
+    ):
+        orm_execute_state.session.info.pop(PERSON_CACHE, None)
+
+
 def set_initial_password(
     session: Session, instance: Person, password: str | None = None
 ) -> str:
@@ -108,6 +266,10 @@ def add_movement(
     movement = Movement(person=person, value=value, actor=actor)
     session.add(movement)
 
+    update_dept_summary(
+        session, person.dept, balance=value, granted=max(value, 0)
+    )
+
     movements = session.exec(select(Movement).where(Movement.person == person))
 
     total = sum([mov.value for mov in movements])
@@ -121,3 +283,443 @@ def add_movement(
         session.add(existing_balance)
     else:
         session.add(Balance(person=person, value=total))
+
+
+def current_month() -> str:
+    """Returns the month the department summaries are accounting for."""
+    return datetime.now().strftime("%Y-%m")
+
+
+def update_dept_summary(
+    session: Session,
+    dept: str,
+    headcount: int = 0,
+    balance: int | Decimal = 0,
+    granted: int | Decimal = 0,
+) -> None:
+    """Apply a delta to the summary of a department.
+
+    The granted points are reset when the first write of a new month
+    reaches the summary.
+
+    Args:
+        session (Session): Database session.
+        dept (str): Department name.
+        headcount (int, optional): People joining (or leaving) the dept.
+        balance (int | Decimal, optional): Change of the dept balance.
+        granted (int | Decimal, optional): Points granted to the dept.
+    """
+    summary = session.get(DeptSummary, dept)
+    if summary is None:
+        summary = DeptSummary(dept=dept)
+
+    month = current_month()
+    if summary.month != month:
+        summary.month = month
+        summary.granted = 0
+
+    summary.headcount += headcount
+    summary.balance += balance
+    summary.granted += granted
+    session.add(summary)
+
+
+def move_dept_summary(session: Session, person: Person, dept: str) -> None:
+    """Move a person and their balance to the summary of another department.
+
+    Args:
+        session (Session): Database session.
+        person (Person): Person instance, still holding the old dept.
+        dept (str): New department name.
+    """
+    balance = person.balance[0].value if person.balance else 0
+    update_dept_summary(session, person.dept, headcount=-1, balance=-balance)
+    update_dept_summary(session, dept, headcount=1, balance=balance)
+
+
+def granted_movements(since: datetime):
+    """Subquery of the points granted from a date, with `person_id` and
+    `value` columns.
+
+    Movements archived by the ledger compaction are read from the archive
+    instead of their carry-forward movements, so compacting the ledger does
+    not change the points granted over a period.
+
+    Args:
+        since (datetime): Only include the movements from this date.
+
+    Returns:
+        The subquery of the positive movements.
+    """
+    return union_all(
+        select(Movement.person_id, Movement.value).where(
+            Movement.date >= since,
+            Movement.value > 0,
+            Movement.actor != CARRY_FORWARD_ACTOR,
+        ),
+        select(MovementArchive.person_id, MovementArchive.value).where(
+            MovementArchive.date >= since,
+            MovementArchive.value > 0,
+        ),
+    ).subquery()
+
+
+def rebuild_dept_summary(session: Session) -> None:
+    """Recompute every department summary from people and movements.
+
+    Args:
+        session (Session): Database session.
+    """
+    session.exec(delete(DeptSummary))
+
+    month = current_month()
+    month_start = datetime.strptime(month, "%Y-%m")
+    summaries = {}
+
+    people = session.exec(
+        select(
+            Person.dept,
+            func.count(Person.id),
+            func.coalesce(func.sum(Balance.value), 0),
+        )
+        .outerjoin(Balance, Balance.person_id == Person.id)
+        .group_by(Person.dept)
+    )
+    for dept, headcount, balance in people:
+        summaries[dept] = DeptSummary(
+            dept=dept, headcount=headcount, balance=balance, month=month
+        )
+
+    movements = granted_movements(month_start)
+    granted = session.exec(
+        select(Person.dept, func.sum(movements.c.value))
+        .join(movements, movements.c.person_id == Person.id)
+        .group_by(Person.dept)
+    )
+    for dept, value in granted:
+        summaries[dept].granted = value
+
+    session.add_all(summaries.values())
+
+
+def person_fingerprint(data: dict[str, str]) -> str:
+    """Digest of the fields of a person that are loaded from CSV.
+
+    Args:
+        data (dict[str, str]): Person's name, dept, role and currency.
+
+    Returns:
+        str: Hex digest of the fields.
+    """
+    fields = tuple(data[field] for field in LOADED_FIELDS)
+    return hashlib.blake2b(
+        "\x1f".join(fields).encode(), digest_size=16
+    ).hexdigest()
+
+
+def get_fingerprints(
+    session: Session, emails: list[str]
+) -> dict[str, PersonFingerprint]:
+    """Fetch the stored fingerprints of many people in one query.
+
+    Args:
+        session (Session): Database session.
+        emails (list[str]): Emails to look up.
+
+    Returns:
+        dict[str, PersonFingerprint]: Fingerprints by email.
+    """
+    fingerprints = session.exec(
+        select(PersonFingerprint).where(PersonFingerprint.email.in_(emails))
+    )
+    return {fingerprint.email: fingerprint for fingerprint in fingerprints}
+
+
+def get_loaded_fields(
+    session: Session, emails: list[str]
+) -> dict[str, tuple[str, ...]]:
+    """Fetch the `LOADED_FIELDS` of many people in one query.
+
+    Only the columns are selected, no `Person` instance is built.
+
+    Args:
+        session (Session): Database session.
+        emails (list[str]): Emails to look up.
+
+    Returns:
+        dict[str, tuple[str, ...]]: Name, dept, role and currency by email.
+    """
+    columns = [getattr(Person, field) for field in LOADED_FIELDS]
+    people = session.exec(
+        select(Person.email, *columns).where(Person.email.in_(emails))
+    )
+    return {email: tuple(fields) for email, *fields in people}
+
+
+def set_fingerprint(
+    session: Session,
+    fingerprints: dict[str, PersonFingerprint],
+    email: str,
+    digest: str,
+) -> None:
+    """Store the fingerprint of a person.
+
+    Args:
+        session (Session): Database session.
+        fingerprints (dict[str, PersonFingerprint]): Fingerprints already
+        fetched with `get_fingerprints`, updated in place.
+        email (str): Person's email.
+        digest (str): Person's fingerprint.
+    """
+    fingerprint = fingerprints.get(email)
+    if fingerprint is None:
+        fingerprint = PersonFingerprint(email=email, digest=digest)
+        fingerprints[email] = fingerprint
+    else:
+        fingerprint.digest = digest
+
+    session.add(fingerprint)
+
+
+def stale_currencies(
+    session: Session, currencies: Iterable[str], max_age: Optional[float]
+) -> list[str]:
+    """Get the currencies without a rate stored in the last `max_age` seconds.
+
+    Args:
+        session (Session): Database session.
+        currencies (Iterable[str]): Currencies needed by a report.
+        max_age (float, optional): Seconds a stored rate is considered up to
+            date. None accepts any stored rate.
+
+    Returns:
+        list[str]: Currencies whose rate must be fetched, sorted.
+    """
+    currencies = set(currencies)
+    sql = select(ExchangeRate.currency).where(
+        ExchangeRate.currency.in_(currencies)
+    )
+    if max_age is not None:
+        sql = sql.where(
+            ExchangeRate.fetched_at
+            >= datetime.now() - timedelta(seconds=max_age)
+        )
+    return sorted(currencies - set(session.exec(sql).all()))
+
+
+def converted_value(column):
+    """SQL expression converting points with the stored exchange rate.
+
+    The query must outer join `ExchangeRate` on the person's currency.
+    Currencies without a stored rate convert to 0.
+
+    Args:
+        column: Column or expression holding points.
+
+    Returns:
+        The converted value expression.
+    """
+    return column * func.coalesce(ExchangeRate.rate, 0)
+
+
+def historical_value(column, day):
+    """SQL expression converting points with the rate in effect on a day.
+
+    The rate is looked up with an index range scan on the primary key of
+    `exchangeratehistory`: the latest entry of the currency on or before
+    `day`. Like `converted_value`, the query must outer join `ExchangeRate`,
+    whose current rate is used when there is no earlier history.
+
+    Args:
+        column: Column or expression holding points.
+        day: Column or expression holding the date of the points.
+
+    Returns:
+        The converted value expression.
+    """
+    rate = (
+        select(ExchangeRateHistory.rate)
+        .where(
+            ExchangeRateHistory.currency == Person.currency,
+            ExchangeRateHistory.day <= func.date(day),
+        )
+        .order_by(ExchangeRateHistory.day.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    return column * func.coalesce(rate, ExchangeRate.rate, 0)
+
+
+def date_bucket(column, bucket: str):
+    """SQL expression of the first day of the bucket of a date.
+
+    Weeks start on Monday.
+
+    Args:
+        column: Column or expression holding a date or datetime.
+        bucket (str): One of `dundie.settings.BUCKETS`.
+
+    Returns:
+        The `YYYY-MM-DD` text expression.
+
+    Raises:
+        ValueError: If the bucket is unknown.
+    """
+    if bucket == "day":
+        return func.date(column)
+    if bucket == "week":
+        return func.date(column, "weekday 0", "-6 days")
+    if bucket == "month":
+        return func.strftime("%Y-%m-01", column)
+    raise ValueError(f"Invalid bucket: {bucket}")
+
+
+def save_rates(session: Session, rates: dict[str, USDRate]) -> None:
+    """Store fetched rates in the `exchangerate` table and as today's entry
+    of the rate history, unless today already has one.
+
+    Unavailable rates (of 0) are skipped, so reports keep using the last
+    known rate of the currency.
+
+    Args:
+        session (Session): Database session.
+        rates (dict[str, USDRate]): Rates by currency, from `get_rates`.
+    """
+    now = datetime.now()
+    for currency, rate in rates.items():
+        if not rate.values:
+            continue
+
+        stored = session.get(ExchangeRate, currency)
+        if stored is None:
+            stored = ExchangeRate(currency=currency)
+        stored.rate = rate.values
+        stored.fetched_at = now
+        session.add(stored)
+
+    save_rate_history(
+        session,
+        [
+            (currency, now.date(), rate.values)
+            for currency, rate in rates.items()
+            if rate.values
+        ],
+        replace=False,
+    )
+
+    session.flush()
+
+
+def save_rate_history(
+    session: Session,
+    rates: list[tuple[str, date, Decimal]],
+    replace: bool = True,
+) -> None:
+    """Insert entries of the rate history in one statement.
+
+    Args:
+        session (Session): Database session.
+        rates (list[tuple[str, date, Decimal]]): Currency, first day in
+            effect and rate of each entry.
+        replace (bool, optional): Replace the entries already stored for
+            the same currency and day. Otherwise they are kept.
+    """
+    if not rates:
+        return
+
+    sql = insert(ExchangeRateHistory).values(
+        [
+            {"currency": currency, "day": day, "rate": rate}
+            for currency, day, rate in rates
+        ]
+    )
+    if replace:
+        sql = sql.on_conflict_do_update(
+            index_elements=["currency", "day"],
+            set_={"rate": sql.excluded.rate},
+        )
+    else:
+        sql = sql.on_conflict_do_nothing()
+    session.exec(sql)
+
+
+def get_idempotent_outcome(
+    session: Session,
+    actor: str,
+    key: str,
+    operation: str,
+    request: dict[str, Any],
+    ttl: float,
+) -> dict[str, Any] | None:
+    """Get the outcome stored for an idempotency key with one primary key
+    lookup.
+
+    Args:
+        session (Session): Database session.
+        actor (str): Email of the person sending the request.
+        key (str): Idempotency key of the request.
+        operation (str): Name of the operation.
+        request (dict[str, Any]): Arguments of the request.
+        ttl (float): Seconds an outcome is kept.
+
+    Returns:
+        dict[str, Any] | None: Outcome of the first request with the key,
+            or None if the key is new or expired.
+
+    Raises:
+        ValueError: If the key was used for another request.
+    """
+    stored = session.get(IdempotencyKey, (actor, key))
+    if stored is None or stored.created_at < _expiry(ttl):
+        return None
+
+    if (stored.operation, stored.request) != (operation, _dumps(request)):
+        raise ValueError(
+            f"Idempotency key '{key}' was already used for another request!"
+        )
+    return json.loads(stored.outcome)
+
+
+def save_idempotent_outcome(
+    session: Session,
+    actor: str,
+    key: str,
+    operation: str,
+    request: dict[str, Any],
+    outcome: dict[str, Any],
+    ttl: float,
+) -> None:
+    """Store the outcome of a request and purge the expired keys.
+
+    Args:
+        session (Session): Database session, the same that applied the
+            request, so the key is only stored if the request is committed.
+        actor (str): Email of the person sending the request.
+        key (str): Idempotency key of the request.
+        operation (str): Name of the operation.
+        request (dict[str, Any]): Arguments of the request.
+        outcome (dict[str, Any]): Outcome of the request.
+        ttl (float): Seconds an outcome is kept.
+    """
+    session.exec(
+        delete(IdempotencyKey).where(IdempotencyKey.created_at < _expiry(ttl))
+    )
+
+    values = {
+        "operation": operation,
+        "request": _dumps(request),
+        "outcome": _dumps(outcome),
+        "created_at": datetime.now(),
+    }
+    sql = insert(IdempotencyKey).values(actor=actor, key=key, **values)
+    session.exec(
+        sql.on_conflict_do_update(index_elements=["actor", "key"], set_=values)
+    )
+
+
+def _expiry(ttl: float) -> datetime:
+    return datetime.now() - timedelta(seconds=ttl)
+
+
+def _dumps(data: dict[str, Any]) -> str:
+    return json.dumps(data, sort_keys=True, default=str)
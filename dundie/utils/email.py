@@ -7,6 +7,7 @@ from dundie.utils.log import get_logger
 log = get_logger()
 
 regex = r"\b[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}\b"
+EMAIL_REGEX = re.compile(regex)
 
 
 def check_valid_email(address: str) -> bool:
@@ -18,4 +19,4 @@ def check_valid_email(address: str) -> bool:
     Returns:
         bool: True or False if the emails is a valid one.
     """
-    return bool(re.fullmatch(regex, address))
+    return bool(EMAIL_REGEX.fullmatch(address))
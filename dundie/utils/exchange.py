@@ -1,12 +1,36 @@
-"""Module for getting exchange rates."""
+"""Module for getting exchange rates.
 
+Rates come from a `RateProvider` selected with `RATES_PROVIDER`:
+
+- `http`: the exchange API, one request per currency.
+- `snapshot`: a local JSON or CSV file, e.g. written by `dundie rates sync`.
+- `static`: fixed rates from `RATES_STATIC`, e.g. `BRL=5.5,EUR=6`, so tests
+  and benchmarks run offline.
+
+`StaticRateProvider` keeps the rates in memory and can also be installed with
+`set_rate_provider`.
+"""
+
+import csv
+import json
+import os
+import time
+from abc import ABC, abstractmethod
 from decimal import Decimal
-from typing import Dict, List
+from typing import Dict, Iterable, Optional, Tuple, Union
 
 import httpx
 from pydantic import BaseModel, Field
 
-from dundie.settings import API_BASE_URL
+from dundie.settings import (
+    API_BASE_URL,
+    RATES_PROVIDER,
+    RATES_SNAPSHOT,
+    RATES_STATIC,
+)
+from dundie.utils.log import get_logger
+
+log = get_logger()
 
 
 class USDRate(BaseModel):
@@ -18,25 +42,238 @@ class USDRate(BaseModel):
     values: Decimal = Field(alias="high")
 
 
-def get_rates(currencies: List[str]) -> Dict[str, USDRate]:
+class RateProvider(ABC):
+    """Source of USD exchange rates."""
+
+    @abstractmethod
+    def get_rate(self, currency: str) -> Optional[USDRate]:
+        """Gets the rate of USD vs a currency.
+
+        Args:
+            currency (str): Currency code.
+
+        Returns:
+            Optional[USDRate]: The rate, or None if it is not available.
+        """
+
+
+class HTTPRateProvider(RateProvider):
+    """Rates fetched from the exchange API at `API_BASE_URL`."""
+
+    def get_rate(self, currency: str) -> Optional[USDRate]:
+        response = httpx.get(API_BASE_URL.format(currency=currency))
+        if response.status_code != 200:
+            return None
+        return USDRate(**response.json()[f"USD{currency}"])
+
+
+class SnapshotRateProvider(RateProvider):
+    """Rates read from a local JSON or CSV file.
+
+    JSON files map currency codes to the objects of the exchange API, the
+    format written by `save_snapshot`. CSV files have `currency` and `rate`
+    columns and an optional `name` column. The file is read again when it
+    changes.
+
+    Attributes:
+        path (str): Path of the snapshot file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._rates: Dict[str, USDRate] = {}
+
+    def get_rate(self, currency: str) -> Optional[USDRate]:
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            self._rates = _read_snapshot(self.path)
+            self._mtime = mtime
+        return self._rates.get(currency)
+
+
+class StaticRateProvider(RateProvider):
+    """Rates kept in memory.
+
+    Attributes:
+        rates (Dict[str, USDRate]): Rates by currency code.
+    """
+
+    def __init__(
+        self, rates: Dict[str, Union[USDRate, Decimal, float, str]]
+    ) -> None:
+        self.rates = {
+            currency: rate
+            if isinstance(rate, USDRate)
+            else USDRate(codein=currency, name=f"USD/{currency}", high=rate)
+            for currency, rate in rates.items()
+        }
+
+    def get_rate(self, currency: str) -> Optional[USDRate]:
+        return self.rates.get(currency)
+
+
+_provider: Optional[RateProvider] = None
+_rates_ttl: float = 0
+_rates_cache: Dict[str, Tuple[float, USDRate]] = {}
+
+
+def get_rate_provider() -> RateProvider:
+    """Returns the provider installed with `set_rate_provider`, or the one
+    selected by `RATES_PROVIDER`.
+
+    Returns:
+        RateProvider: The current rate provider.
+
+    Raises:
+        ValueError: If `RATES_PROVIDER` is unknown.
+    """
+    global _provider
+    if _provider is None:
+        if RATES_PROVIDER == "http":
+            _provider = HTTPRateProvider()
+        elif RATES_PROVIDER == "snapshot":
+            _provider = SnapshotRateProvider(RATES_SNAPSHOT)
+        elif RATES_PROVIDER == "static":
+            _provider = StaticRateProvider(_parse_static_rates(RATES_STATIC))
+        else:
+            raise ValueError(f"Unknown rates provider: {RATES_PROVIDER}")
+    return _provider
+
+
+def set_rate_provider(provider: Optional[RateProvider]) -> None:
+    """Installs the provider used by `get_rates`.
+
+    Args:
+        provider (RateProvider, optional): Provider to use, or None to go
+            back to the one selected by `RATES_PROVIDER`.
+    """
+    global _provider
+    _provider = provider
+    _rates_cache.clear()
+
+
+def configure_rates_cache(ttl: float) -> None:
+    """Keeps fetched rates in memory for `ttl` seconds.
+
+    Short-lived commands fetch the rates every time, the default. The server
+    enables the cache so requests do not wait for the exchange API.
+
+    Args:
+        ttl (float): Seconds a rate is reused. 0 disables the cache.
+    """
+    global _rates_ttl
+    _rates_ttl = ttl
+    _rates_cache.clear()
+
+
+def get_rates(
+    currencies: Iterable[str], provider: Optional[RateProvider] = None
+) -> Dict[str, USDRate]:
     """Gets current rate for USD vs Currency.
 
+    Rates the provider can not give are logged and returned as an "Error"
+    rate of 0.
+
     Args:
-        currencies (List[str]): List of currencies to get rate for.
+        currencies (Iterable[str]): Currencies to get rate for.
+        provider (RateProvider, optional): Provider to use. Defaults to
+            `get_rate_provider()`.
 
     Returns:
         Dict[str, USDRate]: Dictionary of currency and rate.
     """
+    provider = provider or get_rate_provider()
     return_data = {}
+    now = time.monotonic()
     for currency in currencies:
-        if currency == "USD":
+        cached = _rates_cache.get(currency)
+        if cached is not None and cached[0] > now:
+            return_data[currency] = cached[1]
+        elif currency == "USD":
             return_data[currency] = USDRate(high=1)
         else:
-            response = httpx.get(API_BASE_URL.format(currency=currency))
-            if response.status_code == 200:
-                data = response.json()[f"USD{currency}"]
-                return_data[currency] = USDRate(**data)
-            else:
+            rate = provider.get_rate(currency)
+            if rate is None:
+                log.warning(f"No exchange rate for {currency}")
                 return_data[currency] = USDRate(name="Error", high=0)
+                continue
+
+            return_data[currency] = rate
+            if _rates_ttl:
+                _rates_cache[currency] = (now + _rates_ttl, rate)
 
     return return_data
+
+
+def save_snapshot(
+    currencies: Iterable[str],
+    path: str = RATES_SNAPSHOT,
+    provider: Optional[RateProvider] = None,
+) -> Dict[str, USDRate]:
+    """Fetches rates and saves them to a JSON snapshot file.
+
+    The file is replaced atomically and only if every rate was fetched.
+
+    Args:
+        currencies (Iterable[str]): Currencies to save. USD is skipped.
+        path (str, optional): Snapshot file. Defaults to `RATES_SNAPSHOT`.
+        provider (RateProvider, optional): Source of the rates. Defaults to
+            `HTTPRateProvider`.
+
+    Returns:
+        Dict[str, USDRate]: The saved rates.
+
+    Raises:
+        RuntimeError: If a rate could not be fetched.
+    """
+    provider = provider or HTTPRateProvider()
+    rates = {}
+    missing = []
+    for currency in sorted(set(currencies) - {"USD"}):
+        rate = provider.get_rate(currency)
+        if rate is None:
+            missing.append(currency)
+        else:
+            rates[currency] = rate
+
+    if missing:
+        raise RuntimeError(f"Could not fetch rates for {', '.join(missing)}")
+
+    data = {
+        currency: rate.model_dump(mode="json", by_alias=True)
+        for currency, rate in rates.items()
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as snapshot:
+        json.dump(data, snapshot, indent=4)
+    os.replace(tmp_path, path)
+
+    return rates
+
+
+def _parse_static_rates(text: str) -> Dict[str, str]:
+    rates = {}
+    for item in filter(None, (item.strip() for item in text.split(","))):
+        currency, separator, rate = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid static rate: {item}")
+        rates[currency.strip().upper()] = rate.strip()
+    return rates
+
+
+def _read_snapshot(path: str) -> Dict[str, USDRate]:
+    with open(path, newline="") as snapshot:
+        if path.endswith(".csv"):
+            return {
+                row["currency"]: USDRate(
+                    codein=row["currency"],
+                    name=row.get("name") or f"USD/{row['currency']}",
+                    high=row["rate"],
+                )
+                for row in csv.DictReader(snapshot)
+            }
+        return {
+            currency: USDRate(**rate)
+            for currency, rate in json.load(snapshot).items()
+        }
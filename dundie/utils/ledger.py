@@ -0,0 +1,209 @@
+"""Ledger maintenance utilities."""
+
+from __future__ import annotations
+
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from sqlmodel import (
+    Session,
+    case,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    update,
+)
+
+from dundie.models import Balance, Movement, MovementArchive, Person
+
+CARRY_FORWARD_ACTOR = "carry-forward"
+
+
+def compact_movements(
+    session: Session,
+    before: datetime,
+    first_id: int,
+    last_id: int,
+) -> tuple[int, int]:
+    """Archive old movements of a range of people.
+
+    - Movements dated before `before` are copied to `movementarchive`.
+    - They are deleted from `movement` and replaced by one carry-forward
+      movement per person holding their sum, so balances do not change.
+    - People whose old history is already a single carry-forward are
+      skipped, which makes re-running an interrupted compaction safe.
+
+    Args:
+        session (Session): Database session.
+        before (datetime): Movements older than this date are compacted.
+        first_id (int): First person ID of the range.
+        last_id (int): Last person ID of the range (inclusive).
+
+    Returns:
+        tuple[int, int]: Number of people compacted and movements archived.
+    """
+    is_carry = case((Movement.actor == CARRY_FORWARD_ACTOR, 1), else_=0)
+    old_movements = (
+        Movement.person_id.between(first_id, last_id),
+        Movement.date < before,
+    )
+
+    totals = session.exec(
+        select(
+            Movement.person_id,
+            func.sum(Movement.value),
+            func.max(Movement.date),
+            func.count(Movement.id),
+            func.sum(is_carry),
+        )
+        .where(*old_movements)
+        .group_by(Movement.person_id)
+    ).all()
+
+    totals = [
+        (person_id, value, date, count - carried)
+        for person_id, value, date, count, carried in totals
+        if count > 1 or not carried
+    ]
+    if not totals:
+        return 0, 0
+
+    person_ids = [person_id for person_id, *_ in totals]
+    compacted = (*old_movements, Movement.person_id.in_(person_ids))
+
+    session.exec(
+        insert(MovementArchive).from_select(
+            ["id", "person_id", "actor", "value", "date", "archived_at"],
+            select(
+                Movement.id,
+                Movement.person_id,
+                Movement.actor,
+                Movement.value,
+                Movement.date,
+                literal(datetime.now()),
+            ).where(*compacted, Movement.actor != CARRY_FORWARD_ACTOR),
+        )
+    )
+    session.exec(
+        delete(Movement)
+        .where(*compacted)
+        .execution_options(synchronize_session=False)
+    )
+    session.add_all(
+        Movement(
+            person_id=person_id,
+            value=value,
+            date=date,
+            actor=CARRY_FORWARD_ACTOR,
+        )
+        for person_id, value, date, _ in totals
+    )
+    session.flush()
+
+    return len(totals), sum(archived for *_, archived in totals)
+
+
+class Mismatch(NamedTuple):
+    """Balance that does not match the movements of its person.
+
+    Attributes:
+        person_id: int - Person's ID.
+        email: str - Person's email.
+        balance: Optional[Decimal] - Stored balance, None if missing.
+        movements: Decimal - Sum of the person's movements.
+    """
+
+    person_id: int
+    email: str
+    balance: Optional[Decimal]
+    movements: Decimal
+
+
+def find_mismatches(
+    session: Session, first_id: int, last_id: int
+) -> list[Mismatch]:
+    """Compare the balances of a range of people with their movements.
+
+    The movements are summed with one `GROUP BY person_id` over the range,
+    joined to the balances and compared in the same query.
+
+    Args:
+        session (Session): Database session.
+        first_id (int): First person ID of the range.
+        last_id (int): Last person ID of the range (inclusive).
+
+    Returns:
+        list[Mismatch]: People whose balance is missing or differs from
+            the sum of their movements.
+    """
+    totals = (
+        select(Movement.person_id, func.sum(Movement.value).label("total"))
+        .where(Movement.person_id.between(first_id, last_id))
+        .group_by(Movement.person_id)
+        .subquery()
+    )
+    total = func.coalesce(totals.c.total, 0)
+
+    rows = session.exec(
+        select(Person.id, Person.email, Balance.value, total)
+        .outerjoin(Balance, Balance.person_id == Person.id)
+        .outerjoin(totals, totals.c.person_id == Person.id)
+        .where(
+            Person.id.between(first_id, last_id),
+            or_(
+                Balance.id.is_(None),
+                func.round(Balance.value, 3) != func.round(total, 3),
+            ),
+        )
+        .order_by(Person.id)
+    )
+    return [Mismatch(*row) for row in rows]
+
+
+def repair_balances(session: Session, mismatches: list[Mismatch]) -> int:
+    """Rewrite the balances of people with the sum of their movements.
+
+    Balances are recomputed in SQL when written, so movements added since
+    the mismatches were found are counted.
+
+    Args:
+        session (Session): Database session.
+        mismatches (list[Mismatch]): Mismatches from `find_mismatches`.
+
+    Returns:
+        int: Number of balances rewritten.
+    """
+    if not mismatches:
+        return 0
+
+    total = (
+        select(func.coalesce(func.sum(Movement.value), 0))
+        .where(Movement.person_id == Balance.person_id)
+        .scalar_subquery()
+    )
+    person_ids = [mismatch.person_id for mismatch in mismatches]
+    session.exec(
+        update(Balance)
+        .where(Balance.person_id.in_(person_ids))
+        .values(value=total)
+        .execution_options(synchronize_session=False)
+    )
+
+    missing = [m.person_id for m in mismatches if m.balance is None]
+    if missing:
+        session.exec(
+            insert(Balance).from_select(
+                ["person_id", "value"],
+                select(Person.id, func.coalesce(func.sum(Movement.value), 0))
+                .outerjoin(Movement, Movement.person_id == Person.id)
+                .where(Person.id.in_(missing))
+                .group_by(Person.id),
+            )
+        )
+    session.flush()
+
+    return len(mismatches)
@@ -0,0 +1,137 @@
+"""Output utilities for the reporting commands."""
+
+from __future__ import annotations
+
+import json
+import sys
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+from typing import Any, Dict, Iterable, Optional, Sequence, TextIO, Union
+
+from rich.console import Console
+from rich.table import Table
+
+from dundie.settings import TABLE_MAX_ROWS
+from dundie.utils.rows import ReportRow, jsonable
+
+FORMATS = ("table", "plain", "tsv", "jsonl")
+
+Row = Union[Dict[str, Any], ReportRow]
+
+
+def print_rows(
+    rows: Iterable[Row],
+    fmt: str = "table",
+    title: str = "",
+    decimals: Sequence[str] = (),
+    file: Optional[TextIO] = None,
+) -> int:
+    """Prints rows in one of the `FORMATS`.
+
+    - `table` renders a rich table of at most `TABLE_MAX_ROWS` rows and
+      reports how many rows were left out.
+    - `plain`, `tsv` and `jsonl` write each row as soon as it is produced,
+      without colours or measuring the other rows.
+
+    Args:
+        rows (Iterable[Row]): Rows to print, all with the same keys.
+        fmt (str, optional): Output format. Defaults to "table".
+        title (str, optional): Title of the table.
+        decimals (Sequence[str], optional): Keys printed with two decimals
+            in the text formats.
+        file (TextIO, optional): Output stream. Defaults to stdout.
+
+    Returns:
+        int: Number of rows consumed.
+    """
+    file = file or sys.stdout
+    rows = iter(rows)
+
+    if fmt == "jsonl":
+        count = 0
+        for row in rows:
+            file.write(json.dumps(jsonable(row), default=to_json) + "\n")
+            count += 1
+        return count
+
+    first = next(rows, None)
+    if first is None:
+        if fmt in ("table", "plain"):
+            print("No results found.", file=file)
+        return 0
+
+    if fmt == "table":
+        return _print_table(first, rows, title, decimals, file)
+
+    separator = "\t" if fmt == "tsv" else " | "
+    header = first.keys() if fmt == "tsv" else map(str.title, first.keys())
+    file.write(separator.join(header) + "\n")
+
+    count = 0
+    for row in _chain(first, rows):
+        values = _text_values(row, decimals)
+        if fmt == "tsv":
+            values = [_escape_tsv(value) for value in values]
+        file.write(separator.join(values) + "\n")
+        count += 1
+    return count
+
+
+def _print_table(
+    first: Row,
+    rows: Iterable[Row],
+    title: str,
+    decimals: Sequence[str],
+    file: TextIO,
+) -> int:
+    table = Table(title=title)
+    for key in first.keys():
+        table.add_column(key.title(), style="cyan")
+
+    shown = list(islice(_chain(first, rows), TABLE_MAX_ROWS))
+    for row in shown:
+        table.add_row(*_text_values(row, decimals))
+
+    Console(file=file).print(table)
+
+    hidden = sum(1 for _ in rows)
+    if hidden:
+        print(
+            f"{hidden} more rows not shown. Use --format=plain, tsv or "
+            "jsonl to see every row.",
+            file=file,
+        )
+    return len(shown) + hidden
+
+
+def _chain(first: Row, rows: Iterable[Row]) -> Iterable[Row]:
+    yield first
+    yield from rows
+
+
+def _text_values(row: Row, decimals: Sequence[str]) -> list[str]:
+    return [
+        f"{value:.2f}" if key in decimals else str(value)
+        for key, value in row.items()
+    ]
+
+
+def _escape_tsv(value: str) -> str:
+    return value.replace("\t", " ").replace("\n", " ")
+
+
+def to_json(value: Any) -> Any:
+    """Converts the values `json` can not serialize.
+
+    Args:
+        value (Any): Decimal, date or any other value.
+
+    Returns:
+        Any: A float, an ISO 8601 string or the value as a string.
+    """
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
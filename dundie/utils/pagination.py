@@ -0,0 +1,99 @@
+"""Keyset pagination utilities."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import tuple_
+
+from dundie.models import Person
+from dundie.utils.rows import ReportRow
+
+ORDERINGS = {
+    "dept": (Person.dept, Person.email),
+    "id": (Person.id,),
+}
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+class Page(NamedTuple):
+    """One page of results.
+
+    Attributes:
+        rows: List[ReportRow] - Rows of the page.
+        next_cursor: Optional[str] - Cursor of the next page, None on the last.
+    """
+
+    rows: List[ReportRow]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(order_by: str, key: tuple) -> str:
+    """Encodes the sort key of the last row of a page as an opaque cursor.
+
+    Args:
+        order_by (str): Name of the ordering, one of `ORDERINGS`.
+        key (tuple): Values of the ordering columns of the last row.
+
+    Returns:
+        str: URL-safe cursor.
+    """
+    payload = json.dumps({"order_by": order_by, "key": list(key)})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor: str, order_by: str) -> tuple:
+    """Decodes a cursor created by `encode_cursor`.
+
+    Args:
+        cursor (str): Cursor returned with the previous page.
+        order_by (str): Ordering of the requested page.
+
+    Returns:
+        tuple: Values of the ordering columns after which the page starts.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was created for
+            another ordering.
+    """
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        key = tuple(payload["key"])
+        valid = payload["order_by"] == order_by
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if not valid or len(key) != len(ORDERINGS[order_by]):
+        raise InvalidCursorError("Invalid cursor")
+    return key
+
+
+def keyset(order_by: str, cursor: Optional[str]) -> tuple[tuple, list]:
+    """Builds the ORDER BY columns and WHERE clauses of a keyset page.
+
+    Args:
+        order_by (str): Name of the ordering, one of `ORDERINGS`.
+        cursor (str, optional): Cursor returned with the previous page.
+
+    Returns:
+        tuple: Ordering columns and the filters selecting rows after the
+            cursor (empty for the first page).
+
+    Raises:
+        InvalidCursorError: If the ordering is unknown or the cursor invalid.
+    """
+    if order_by not in ORDERINGS:
+        raise InvalidCursorError(f"Invalid ordering: {order_by}")
+
+    columns = ORDERINGS[order_by]
+    if cursor is None:
+        return columns, []
+
+    key = decode_cursor(cursor, order_by)
+    return columns, [tuple_(*columns) > tuple_(*key)]
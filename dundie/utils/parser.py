@@ -0,0 +1,211 @@
+"""CSV parsing utilities."""
+
+from __future__ import annotations
+
+import io
+import mmap
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from csv import reader
+from typing import Iterator, NamedTuple
+
+from dundie.settings import LOAD_CHUNK_SIZE, LOAD_WORKERS
+from dundie.utils.email import EMAIL_REGEX
+
+HEADERS = ["name", "dept", "role", "email", "currency"]
+
+Row = dict[str, str]
+LineError = tuple[int, str]
+
+
+class ParsedBatch(NamedTuple):
+    """Rows and errors parsed from one chunk of a CSV file.
+
+    Attributes:
+        rows: list[Row] - Valid rows, keyed by `HEADERS`.
+        errors: list[LineError] - Line number and message of invalid rows.
+    """
+
+    rows: list[Row]
+    errors: list[LineError]
+
+
+class LoadResult(NamedTuple):
+    """Outcome of loading a CSV file of people.
+
+    Attributes:
+        rows: list[dict] - Loaded people, in file order.
+        errors: list[LineError] - Line number and message of the lines that
+            were skipped because they are invalid.
+    """
+
+    rows: list[dict]
+    errors: list[LineError]
+
+
+def chunk_ranges(filepath: str, chunk_size: int) -> list[tuple[int, int]]:
+    """Split a file into byte ranges ending on line boundaries.
+
+    A newline inside a quoted field, i.e. after an odd number of quotes in
+    the range, is not a boundary.
+
+    Args:
+        filepath (str): Path to the file.
+        chunk_size (int): Approximate size of each range in bytes.
+
+    Returns:
+        list[tuple[int, int]]: Start (inclusive) and end (exclusive) offsets.
+    """
+    with open(filepath, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if not size:
+            return []
+
+        ranges = []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    end = _record_end(data, start, end - 1)
+                ranges.append((start, end))
+                start = end
+
+    return ranges
+
+
+def _record_end(data: mmap.mmap, start: int, position: int) -> int:
+    quotes = data[start:position].count(b'"')
+    while True:
+        newline = data.find(b"\n", position)
+        if newline == -1:
+            return len(data)
+        quotes += data[position:newline].count(b'"')
+        if quotes % 2 == 0:
+            return newline + 1
+        position = newline + 1
+
+
+def parse_chunk(
+    filepath: str, start: int, end: int
+) -> tuple[list[Row], list[LineError], int]:
+    """Parse and validate the CSV rows of a byte range of a file.
+
+    Line numbers are relative to the start of the range. Quoted fields may
+    span lines, and only `\\n`, `\\r\\n` and `\\r` end a line.
+
+    Args:
+        filepath (str): Path to the CSV file.
+        start (int): Offset of the first byte of the range.
+        end (int): Offset after the last byte of the range.
+
+    Returns:
+        tuple: Valid rows, errors and the number of lines in the range.
+    """
+    with open(filepath, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode()
+
+    rows = []
+    errors = []
+    csv_data = reader(io.StringIO(text, newline=""))
+
+    for line in csv_data:
+        if not line:
+            continue
+
+        fields = [item.strip() for item in line]
+        if len(fields) not in (4, 5):
+            errors.append(
+                (
+                    csv_data.line_num,
+                    f"Expected 4 or 5 columns, got {len(fields)}",
+                )
+            )
+            continue
+
+        row = dict(zip(HEADERS, fields))
+        row.setdefault("currency", "USD")
+
+        if not all(row.values()):
+            errors.append((csv_data.line_num, "Empty field"))
+        elif not EMAIL_REGEX.fullmatch(row["email"]):
+            errors.append(
+                (csv_data.line_num, f"Invalid email: {row['email']}")
+            )
+        else:
+            rows.append(row)
+
+    return rows, errors, csv_data.line_num
+
+
+def parse_file(
+    filepath: str,
+    workers: int = LOAD_WORKERS,
+    chunk_size: int = LOAD_CHUNK_SIZE,
+) -> Iterator[ParsedBatch]:
+    """Parse and validate a CSV file of people.
+
+    - The file is split into byte ranges on line boundaries.
+    - Ranges are parsed in a process pool when there is more than one,
+      with a bounded number of ranges in flight. The workers are spawned,
+      not forked, so the pool is safe in the threads of `dundie serve`.
+    - Batches are yielded in file order as soon as they are ready, with
+      errors reported by absolute line number.
+
+    Args:
+        filepath (str): Path to the CSV file.
+        workers (int, optional): Number of worker processes.
+        chunk_size (int, optional): Approximate size of each range in bytes.
+
+    Returns:
+        Iterator[ParsedBatch]: Parsed batches, one per range.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    ranges = chunk_ranges(filepath, chunk_size)
+    return _parse_ranges(filepath, ranges, workers)
+
+
+def _parse_ranges(
+    filepath: str, ranges: list[tuple[int, int]], workers: int
+) -> Iterator[ParsedBatch]:
+    offset = 0
+
+    if workers <= 1 or len(ranges) <= 1:
+        results = (parse_chunk(filepath, *byte_range) for byte_range in ranges)
+        for rows, errors, lines in results:
+            yield _number(rows, errors, offset)
+            offset += lines
+        return
+
+    pending = deque()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(ranges)), mp_context=context
+    ) as pool:
+        for byte_range in ranges:
+            pending.append(pool.submit(parse_chunk, filepath, *byte_range))
+            if len(pending) < workers * 2:
+                continue
+
+            rows, errors, lines = pending.popleft().result()
+            yield _number(rows, errors, offset)
+            offset += lines
+
+        while pending:
+            rows, errors, lines = pending.popleft().result()
+            yield _number(rows, errors, offset)
+            offset += lines
+
+
+def _number(
+    rows: list[Row], errors: list[LineError], offset: int
+) -> ParsedBatch:
+    return ParsedBatch(
+        rows=rows,
+        errors=[(offset + line, message) for line, message in errors],
+    )
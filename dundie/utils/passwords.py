@@ -1,5 +1,65 @@
 import os
 from datetime import datetime
+from typing import List, Optional
+from uuid import uuid4
+
+from dundie.settings import PASSWORDS_FILE, PASSWORDS_RUN_FILE
+
+
+class PasswordWriter:
+    """Buffered sink for the plain passwords generated during a load.
+
+    Lines are kept in memory and written with a single open, flush and
+    fsync when `commit` is called, so a bulk load does not pay one
+    open/close cycle per employee. Nothing is written if the load is
+    never committed.
+
+    Attributes:
+        path (str): Absolute path of the passwords file.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = os.path.abspath(path or PASSWORDS_FILE)
+        self._lines: List[str] = []
+
+    @classmethod
+    def for_run(cls) -> "PasswordWriter":
+        """Returns a writer targeting a new file named after the current run.
+
+        The name has a random suffix, so loads started in the same second
+        do not append to each other's file.
+
+        Returns:
+            PasswordWriter: Writer for a timestamped passwords file.
+        """
+        return cls(
+            PASSWORDS_RUN_FILE.format(
+                timestamp=datetime.now(), suffix=uuid4().hex[:8]
+            )
+        )
+
+    def write(self, email: str, plain_password: str) -> None:
+        """Buffers the credentials of one employee.
+
+        Args:
+            email (str): Employee email address.
+            plain_password (str): Plain password generated for the employee.
+        """
+        self._lines.append(
+            f"{datetime.now()} | Email: {email} | Password: {plain_password}\n"
+        )
+
+    def commit(self) -> None:
+        """Writes every buffered line to disk and fsyncs the file once."""
+        if not self._lines:
+            return
+
+        with open(self.path, mode="a") as txt_file:
+            txt_file.writelines(self._lines)
+            txt_file.flush()
+            os.fsync(txt_file.fileno())
+
+        self._lines.clear()
 
 
 def create_pw_txt(email: str, plain_password: str) -> None:
@@ -14,15 +74,6 @@ def create_pw_txt(email: str, plain_password: str) -> None:
     Returns:
         None
     """
-    txt_path = os.path.abspath("./passwords_txt.txt")
-
-    if os.path.exists(txt_path):
-        with open(txt_path, mode="a") as txt_file:
-            txt_file.write(
-                f"{datetime.now()} | Email: {email} | Password: {plain_password}\n"
-            )
-    else:
-        with open(txt_path, mode="w") as txt_file:
-            txt_file.write(
-                f"{datetime.now()} | Email: {email} | Password: {plain_password}\n"
-            )
+    writer = PasswordWriter()
+    writer.write(email, plain_password)
+    writer.commit()
@@ -0,0 +1,126 @@
+"""Rows of the reports.
+
+The reports select only the columns they show and keep each result as a
+`ReportRow`, a tuple with empty `__slots__`, instead of loading ORM objects
+and building a dict per row. Rows can be read by report key like a dict,
+`row["last movement"]`, so they can be passed to `print_rows`, and are
+converted to dicts with `as_dict` or `jsonable` where they leave the
+process as JSON.
+"""
+
+from __future__ import annotations
+
+from typing import Any, ClassVar, Dict, Iterator, Tuple, Union
+
+
+class ReportRow(tuple):
+    """Immutable row of a report.
+
+    Subclasses set `KEYS`, the report keys of the values in order.
+
+    Attributes:
+        KEYS: Tuple[str, ...] - Report keys of the values.
+    """
+
+    __slots__ = ()
+
+    KEYS: ClassVar[Tuple[str, ...]] = ()
+    _positions: ClassVar[Dict[str, int]] = {}
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._positions = {key: index for index, key in enumerate(cls.KEYS)}
+
+    def __new__(cls, *values: Any) -> "ReportRow":
+        if len(values) != len(cls.KEYS):
+            raise TypeError(
+                f"{cls.__name__} takes {len(cls.KEYS)} values, "
+                f"got {len(values)}"
+            )
+        return tuple.__new__(cls, values)
+
+    def __getitem__(self, key: Union[str, int, slice]) -> Any:
+        if isinstance(key, str):
+            try:
+                key = self._positions[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self) -> str:
+        values = ", ".join(f"{k!r}: {v!r}" for k, v in self.items())
+        return f"{type(self).__name__}({{{values}}})"
+
+    def keys(self) -> Tuple[str, ...]:
+        """Returns the report keys, like `dict.keys`."""
+        return self.KEYS
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        """Returns pairs of report key and value, like `dict.items`."""
+        return zip(self.KEYS, self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Returns the row as a dict keyed by the report keys."""
+        return dict(zip(self.KEYS, self))
+
+
+class PersonRow(ReportRow):
+    """Row of `dundie.core.read`."""
+
+    __slots__ = ()
+
+    KEYS = (
+        "email",
+        "balance",
+        "last movement",
+        "name",
+        "dept",
+        "role",
+        "currency",
+        "value",
+    )
+
+
+class MovementRow(ReportRow):
+    """Row of `dundie.core.movements`."""
+
+    __slots__ = ()
+
+    KEYS = ("Name", "Date", "Movement", "Converted Movement", "Actor")
+
+
+class HistoryRow(ReportRow):
+    """Row of `dundie.core.history`."""
+
+    __slots__ = ()
+
+    KEYS = ("date", "change", "balance")
+
+
+class LoadDiffRow(ReportRow):
+    """Row of `dundie.core.load_diff`."""
+
+    __slots__ = ()
+
+    KEYS = ("email", "status", "name", "dept", "role", "currency", "changes")
+
+
+def jsonable(value: Any) -> Any:
+    """Converts the report rows inside a result to dicts.
+
+    `json` would encode a `ReportRow` as a list, so results are converted
+    before they are serialized. Other tuples, e.g. a `Page`, stay lists.
+
+    Args:
+        value (Any): Result of a `dundie.core` operation.
+
+    Returns:
+        Any: The result with dicts in place of the report rows.
+    """
+    if isinstance(value, ReportRow):
+        return value.as_dict()
+    if isinstance(value, (list, tuple)):
+        return [jsonable(item) for item in value]
+    if isinstance(value, dict):
+        return {key: jsonable(item) for key, item in value.items()}
+    return value
@@ -4,8 +4,58 @@ from random import sample
 from string import ascii_letters, digits
 
 from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
 
-pwd_context = PasswordHash.recommended()
+from dundie.settings import (
+    ARGON2_MEMORY_COST,
+    ARGON2_PARALLELISM,
+    ARGON2_TIME_COST,
+    PASSWORD_PROFILE,
+)
+
+PASSWORD_PROFILES = {
+    # Argon2 parameters of the settings, pwdlib's recommended by default.
+    "default": {
+        "time_cost": ARGON2_TIME_COST,
+        "memory_cost": ARGON2_MEMORY_COST,
+        "parallelism": ARGON2_PARALLELISM,
+    },
+    # Cheapest Argon2 parameters, for tests and benchmarks only.
+    "fast": {"time_cost": 1, "memory_cost": 8, "parallelism": 1},
+}
+
+
+def make_password_hash(profile: str = PASSWORD_PROFILE) -> PasswordHash:
+    """Create the password hasher of a profile.
+
+    Hashes created with any profile can be verified with every other one,
+    since the Argon2 parameters are stored in the hash.
+
+    Args:
+        profile (str): One of `PASSWORD_PROFILES`.
+
+    Returns:
+        PasswordHash: The password hasher.
+
+    Raises:
+        ValueError: If the profile is unknown.
+    """
+    if profile not in PASSWORD_PROFILES:
+        raise ValueError(f"Unknown password profile: {profile}")
+    return PasswordHash((Argon2Hasher(**PASSWORD_PROFILES[profile]),))
+
+
+def set_password_profile(profile: str) -> None:
+    """Hash new passwords with another profile.
+
+    Args:
+        profile (str): One of `PASSWORD_PROFILES`.
+    """
+    global pwd_context
+    pwd_context = make_password_hash(profile)
+
+
+pwd_context = make_password_hash()
 
 
 def generate_simple_password(size=8) -> str:
@@ -28,3 +78,19 @@ def get_password_hash(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Tells whether a hash was created with other parameters than the
+    current profile, or another algorithm.
+
+    Args:
+        hashed_password (str): Stored hash.
+
+    Returns:
+        bool: True if the password should be hashed again.
+    """
+    hasher = pwd_context.current_hasher
+    return not hasher.identify(hashed_password) or hasher.check_needs_rehash(
+        hashed_password
+    )
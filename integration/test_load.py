@@ -33,3 +33,49 @@ def test_load_negative_call_load_command_with_wrong_params(wrong_command):
 
     assert out.exit_code != 0
     assert f"No such command '{wrong_command}'." in out.output
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_load_dry_run_call_load_command():
+    """Test cli load command with --dry-run."""
+    csv_path = os.path.join(
+        os.path.dirname(__file__), "..", "tests", "assets", "people.csv"
+    )
+    out = cmd.invoke(load, [csv_path, "--dry-run", "--format=tsv"])
+
+    assert out.exit_code == 0
+    assert out.output.splitlines()[0].split("\t") == [
+        "email",
+        "status",
+        "name",
+        "dept",
+        "role",
+        "currency",
+        "changes",
+    ]
+    assert len(out.output.splitlines()) == 4
+
+    out = cmd.invoke(load, [csv_path, "--dry-run"])
+    assert "3 new, 0 changed, 0 unchanged." in out.output
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_load_prints_the_invalid_lines(tmpdir):
+    """Test cli load command with an invalid line."""
+    people_file = tmpdir.join("people.csv")
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD\n"
+        "Dwight Schrute, Sales, Manager, schrute@invalid, USD\n"
+    )
+
+    out = cmd.invoke(load, [str(people_file), "--dry-run", "--format=tsv"])
+    assert "\tinvalid\t" in out.output
+    assert "Line 2: Invalid email: schrute@invalid" in out.output
+
+    out = cmd.invoke(load, [str(people_file), "--dry-run"])
+    assert "1 new, 0 changed, 0 unchanged, 1 invalid." in out.output
+
+    out = cmd.invoke(load, [str(people_file)])
+    assert "Line 2: Invalid email: schrute@invalid" in out.output
@@ -0,0 +1,104 @@
+import json
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from dundie.cli import load, show
+from dundie.utils.exchange import StaticRateProvider, set_rate_provider
+
+cmd = CliRunner()
+
+PEOPLE_FILE = os.path.join(
+    os.path.dirname(__file__), "..", "tests", "assets", "people.csv"
+)
+
+
+@pytest.fixture(autouse=True)
+def auth(monkeypatch):
+    monkeypatch.setenv("DUNDIE_EMAIL", "schrute@dundiermifflin.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "123456")
+    monkeypatch.setattr("dundie.utils.auth.verify_password", lambda x, y: True)
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_show_tsv_format():
+    """Test cli show command with tab separated output."""
+    cmd.invoke(load, PEOPLE_FILE)
+
+    out = cmd.invoke(show, ["--format", "tsv", "--dept", "Sales"])
+
+    assert out.exit_code == 0
+    lines = out.output.splitlines()
+    assert lines[0].split("\t")[0] == "email"
+    assert [line.split("\t")[0] for line in lines[1:]] == [
+        "jim@dundiermifflin.com",
+        "schrute@dundiermifflin.com",
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_show_jsonl_format_pages_through_every_row(monkeypatch):
+    """Test cli show command streaming json lines over several pages."""
+    monkeypatch.setattr("dundie.cli.READ_PAGE_SIZE", 1)
+    cmd.invoke(load, PEOPLE_FILE)
+
+    out = cmd.invoke(show, ["--format", "jsonl"])
+
+    assert out.exit_code == 0
+    assert [json.loads(line)["email"] for line in out.output.splitlines()] == [
+        "jim@dundiermifflin.com",
+        "schrute@dundiermifflin.com",
+        "glewis@dundiermifflin.com",
+    ]
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_show_saves_json_output(tmpdir):
+    """Test cli show command saving the results to a json file."""
+    cmd.invoke(load, PEOPLE_FILE)
+    output = tmpdir.join("people.json")
+
+    out = cmd.invoke(show, ["--output", str(output), "--dept", "Sales"])
+
+    assert out.exit_code == 0
+    people = json.loads(output.read())
+    assert [person["email"] for person in people] == [
+        "jim@dundiermifflin.com",
+        "schrute@dundiermifflin.com",
+    ]
+    assert people[0]["balance"] == 500
+
+
+@pytest.mark.integration
+@pytest.mark.medium
+def test_show_fetches_rates_once_for_every_page(tmpdir, monkeypatch):
+    """Test cli show command fetching the rates once, not once per page."""
+    calls = []
+
+    class CountingProvider(StaticRateProvider):
+        def get_rate(self, currency):
+            calls.append(currency)
+            return super().get_rate(currency)
+
+    people_file = tmpdir.join("people.csv")
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, BRL\n"
+        "Dwight Schrute, Sales, Manager, schrute@dundiermifflin.com, EUR\n"
+        "Gabe Lewis, Directory, Manager, glewis@dundiermifflin.com, BRL\n"
+    )
+    cmd.invoke(load, str(people_file))
+    monkeypatch.setattr("dundie.cli.READ_PAGE_SIZE", 1)
+    monkeypatch.setattr("dundie.core.RATES_MAX_AGE", 0)
+    set_rate_provider(CountingProvider({"BRL": 5, "EUR": 6}))
+    try:
+        out = cmd.invoke(show, ["--format", "jsonl"])
+    finally:
+        set_rate_provider(None)
+
+    assert out.exit_code == 0
+    assert len(out.output.splitlines()) == 3
+    assert sorted(calls) == ["BRL", "EUR"]
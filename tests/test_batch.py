@@ -0,0 +1,168 @@
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from dundie import database
+from dundie.core import add, load, transfer
+from dundie.database import contention, get_session, make_engine
+from dundie.models import Movement, Person
+from dundie.server import Server
+from dundie.utils.batch import WriteQueue
+from dundie.utils.db import add_person
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture
+def commits():
+    """Counts the commits of transactions that wrote to the database."""
+    count = []
+    writes = []
+
+    def record_write(conn, cursor, statement, *args):
+        if statement.startswith(("INSERT", "UPDATE", "DELETE")):
+            writes.append(statement)
+
+    def record_commit(connection):
+        if writes:
+            count.append(len(writes))
+            writes.clear()
+
+    event.listen(database.engine, "before_cursor_execute", record_write)
+    event.listen(database.engine, "commit", record_commit)
+    yield count
+    event.remove(database.engine, "before_cursor_execute", record_write)
+    event.remove(database.engine, "commit", record_commit)
+
+
+def balance_of(email):
+    with get_session() as session:
+        person = session.exec(select(Person).where(Person.email == email))
+        return person.one().balance[0].value
+
+
+@pytest.mark.unit
+def test_writes_are_committed_together(commits):
+    load(PEOPLE_FILE)
+    commits.clear()
+
+    with WriteQueue(max_batch=10, max_wait=5) as writes:
+        futures = [
+            writes.submit(add, dict(value=i, email="jim@dundiermifflin.com"))
+            for i in range(10)
+        ]
+        results = [future.result(timeout=5) for future in futures]
+
+    assert results == [{"value": i, "people": 1} for i in range(10)]
+    assert len(commits) == 1
+    assert balance_of("jim@dundiermifflin.com") == 500 + sum(range(10))
+
+
+@pytest.mark.unit
+def test_failed_write_does_not_affect_the_batch():
+    load(PEOPLE_FILE)
+
+    with WriteQueue(max_batch=3, max_wait=5) as writes:
+        first = writes.submit(
+            transfer, dict(value=10, to_person="jim@dundiermifflin.com")
+        )
+        failed = writes.submit(
+            transfer, dict(value=10, to_person="nobody@dm.com")
+        )
+        last = writes.submit(
+            transfer, dict(value=20, to_person="jim@dundiermifflin.com")
+        )
+
+        assert first.result(timeout=5)["value"] == 10
+        with pytest.raises(RuntimeError, match="not found"):
+            failed.result(timeout=5)
+        assert last.result(timeout=5)["value"] == 20
+
+    assert balance_of("scott@dm.com") == 70
+    assert balance_of("jim@dundiermifflin.com") == 530
+    with get_session() as session:
+        assert len(session.exec(select(Movement)).all()) == 4 + 4
+
+
+@pytest.mark.unit
+def test_busy_batch_is_retried(monkeypatch):
+    load(PEOPLE_FILE)
+    monkeypatch.setattr("dundie.database.DB_BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_RETRIES", 10)
+    engine = make_engine(str(database.engine.url), create_tables=False)
+    monkeypatch.setattr("dundie.database.engine", engine)
+    contention.reset()
+
+    blocker = sqlite3.connect(
+        engine.url.database, isolation_level=None, check_same_thread=False
+    )
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, blocker.rollback)
+    release.start()
+    try:
+        with WriteQueue(max_batch=3, max_wait=5) as writes:
+            futures = [
+                writes.submit(
+                    add, dict(value=1, email="jim@dundiermifflin.com")
+                )
+                for _ in range(3)
+            ]
+            results = [future.result(timeout=10) for future in futures]
+    finally:
+        release.join()
+        blocker.close()
+        engine.dispose()
+
+    assert results == [{"value": 1, "people": 1}] * 3
+    assert contention.as_dict()["retries"] >= 1
+    assert balance_of("jim@dundiermifflin.com") == 503
+
+
+@pytest.mark.unit
+def test_server_batches_concurrent_writes(commits):
+    load(PEOPLE_FILE)
+    server = Server()
+    server.writes.max_wait = 0.2
+    credentials = {"email": "scott@dm.com", "password": "1234"}
+    assert server.handle({"op": "ping", **credentials})["ok"]
+    assert server.handle({"op": "read", **credentials})["ok"]
+    commits.clear()
+
+    responses = []
+
+    def post():
+        args = {"value": 1, "email": "jim@dundiermifflin.com"}
+        request = {"op": "add", "args": args, **credentials}
+        responses.append(server.handle(request))
+
+    threads = [threading.Thread(target=post) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    server.close()
+
+    assert all(response["ok"] for response in responses)
+    assert balance_of("jim@dundiermifflin.com") == 520
+    assert len(commits) < 20
@@ -0,0 +1,127 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import event, update
+from sqlmodel import select
+
+from dundie.core import add, load, transfer
+from dundie.database import get_session
+from dundie.models import Person
+from dundie.utils.db import add_person, get_people, get_person
+from dundie.utils.db import PERSON_CACHE
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture
+def person_loads():
+    loads = Counter()
+
+    def count_load(target, context):
+        # merge(load=False) dispatches the event without a query context
+        if context is not None:
+            loads[target.email] += 1
+
+    event.listen(Person, "load", count_load)
+    yield loads
+    event.remove(Person, "load", count_load)
+
+
+@pytest.mark.unit
+def test_get_person_selects_once_per_session():
+    load(PEOPLE_FILE)
+
+    with get_session() as session:
+        person = get_person(session, email="jim@dundiermifflin.com")
+        statements = []
+        event.listen(
+            session.get_bind(),
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+
+        assert get_person(session, email="jim@dundiermifflin.com") is person
+        assert get_person(session, person_id=person.id) is person
+        assert statements == []
+
+
+@pytest.mark.unit
+def test_transfer_loads_each_person_once(person_loads):
+    load(PEOPLE_FILE)
+    person_loads.clear()
+
+    transfer(50, "jim@dundiermifflin.com")
+
+    assert person_loads["jim@dundiermifflin.com"] == 1
+    assert person_loads["scott@dm.com"] == 1
+    assert max(person_loads.values()) == 1
+
+
+@pytest.mark.unit
+def test_add_loads_each_person_once(person_loads):
+    load(PEOPLE_FILE)
+    person_loads.clear()
+
+    add(100, dept="Sales")
+
+    assert person_loads["jim@dundiermifflin.com"] == 1
+    assert person_loads["schrute@dundiermifflin.com"] == 1
+    assert max(person_loads.values()) == 1
+
+
+@pytest.mark.unit
+def test_cache_is_invalidated_on_rollback():
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Joe Doe",
+            "email": "joe@doe.com",
+        }
+        add_person(session, Person(**data))
+        assert get_person(session, email="joe@doe.com") is not None
+
+        session.rollback()
+
+        assert PERSON_CACHE not in session.info
+        assert get_person(session, email="joe@doe.com") is None
+
+
+@pytest.mark.unit
+def test_cache_is_invalidated_on_bulk_update():
+    load(PEOPLE_FILE)
+
+    with get_session() as session:
+        people = get_people(session, dept="Sales")
+        assert len(people) == 2
+
+        session.exec(
+            update(Person)
+            .where(Person.dept == "Sales")
+            .values(dept="Marketing")
+        )
+
+        assert PERSON_CACHE not in session.info
+        person = get_person(session, email="jim@dundiermifflin.com")
+        assert person.dept == "Marketing"
+        assert (
+            session.exec(select(Person).where(Person.dept == "Sales")).all()
+            == []
+        )
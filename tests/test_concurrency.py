@@ -0,0 +1,216 @@
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+from sqlalchemy.exc import OperationalError
+from sqlmodel import func, select
+
+from dundie import database
+from dundie.core import add, load, read
+from dundie.database import (
+    contention,
+    contention_stats,
+    get_session,
+    make_engine,
+    write_transaction,
+)
+from dundie.models import ExchangeRate, Movement, Person
+from dundie.utils.auth import authenticated_as
+from dundie.utils.db import add_person
+
+from .constants import PEOPLE_FILE
+
+WRITERS = 4
+WRITES = 25
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+def busy_error():
+    return OperationalError(
+        "BEGIN IMMEDIATE", {}, sqlite3.OperationalError("database is locked")
+    )
+
+
+def writer(writes):
+    database.engine.dispose(close=False)
+    contention.reset()
+    with authenticated_as("scott@dm.com"):
+        for _ in range(writes):
+            add(1, email="jim@dundiermifflin.com")
+    return contention_stats()
+
+
+@pytest.mark.unit
+def test_write_transaction_retries_while_busy(monkeypatch):
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.001)
+    contention.reset()
+    attempts = []
+
+    @write_transaction
+    def write():
+        attempts.append(True)
+        if len(attempts) < 3:
+            raise busy_error()
+        return "done"
+
+    assert write() == "done"
+    stats = contention_stats()
+    assert stats["transactions"] == 1
+    assert stats["retries"] == 2
+    assert stats["failures"] == 0
+
+
+@pytest.mark.unit
+def test_write_transaction_gives_up(monkeypatch):
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.001)
+    monkeypatch.setattr("dundie.database.DB_BUSY_RETRIES", 2)
+    contention.reset()
+
+    @write_transaction
+    def write():
+        raise busy_error()
+
+    with pytest.raises(OperationalError):
+        write()
+    assert contention_stats()["retries"] == 2
+    assert contention_stats()["failures"] == 1
+
+
+@pytest.mark.unit
+def test_write_transaction_retries_when_begin_is_busy(monkeypatch):
+    load(PEOPLE_FILE)
+    monkeypatch.setattr("dundie.database.DB_BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_RETRIES", 10)
+    engine = make_engine(str(database.engine.url), create_tables=False)
+    monkeypatch.setattr("dundie.database.engine", engine)
+    contention.reset()
+
+    blocker = sqlite3.connect(
+        engine.url.database, isolation_level=None, check_same_thread=False
+    )
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, blocker.rollback)
+    release.start()
+    try:
+        add(10, email="jim@dundiermifflin.com")
+    finally:
+        release.join()
+        blocker.close()
+        engine.dispose()
+
+    assert contention_stats()["retries"] >= 1
+    assert database._current_session.get() is None
+    with get_session() as session:
+        jim = session.exec(
+            select(Person).where(Person.email == "jim@dundiermifflin.com")
+        ).one()
+        assert jim.balance[0].value == 510
+
+
+@pytest.mark.unit
+def test_reports_do_not_wait_for_writers(monkeypatch):
+    load(PEOPLE_FILE)
+    read()  # stores the rates
+    monkeypatch.setattr("dundie.database.DB_BUSY_TIMEOUT", 0.1)
+    engine = make_engine(str(database.engine.url), create_tables=False)
+    monkeypatch.setattr("dundie.database.engine", engine)
+
+    blocker = sqlite3.connect(engine.url.database, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        assert len(read()) == 4
+    finally:
+        blocker.rollback()
+        blocker.close()
+        engine.dispose()
+
+
+@pytest.mark.unit
+def test_reports_store_stale_rates_in_their_own_transaction(monkeypatch):
+    load(PEOPLE_FILE)
+    monkeypatch.setattr("dundie.database.DB_BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_RETRIES", 10)
+    engine = make_engine(str(database.engine.url), create_tables=False)
+    monkeypatch.setattr("dundie.database.engine", engine)
+    contention.reset()
+
+    blocker = sqlite3.connect(
+        engine.url.database, isolation_level=None, check_same_thread=False
+    )
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, blocker.rollback)
+    release.start()
+    try:
+        assert len(read()) == 4
+    finally:
+        release.join()
+        blocker.close()
+        engine.dispose()
+
+    assert contention_stats()["retries"] >= 1
+    with get_session() as session:
+        assert session.exec(select(ExchangeRate.currency)).all() == ["USD"]
+
+
+@pytest.mark.unit
+def test_reports_use_the_stored_rates_while_locked(monkeypatch):
+    load(PEOPLE_FILE)
+    read()  # stores the rates
+    monkeypatch.setattr("dundie.core.RATES_MAX_AGE", 0)
+    monkeypatch.setattr("dundie.database.DB_BUSY_TIMEOUT", 0.1)
+    monkeypatch.setattr("dundie.database.DB_BUSY_BACKOFF", 0.01)
+    monkeypatch.setattr("dundie.database.DB_BUSY_RETRIES", 1)
+    engine = make_engine(str(database.engine.url), create_tables=False)
+    monkeypatch.setattr("dundie.database.engine", engine)
+
+    blocker = sqlite3.connect(engine.url.database, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        assert [row["value"] for row in read()][1:] == [500, 100, 100]
+    finally:
+        blocker.rollback()
+        blocker.close()
+        engine.dispose()
+
+
+@pytest.mark.unit
+def test_concurrent_writers_do_not_lose_writes():
+    load(PEOPLE_FILE)
+
+    context = multiprocessing.get_context("fork")
+    with context.Pool(WRITERS) as pool:
+        results = pool.map(writer, [WRITES] * WRITERS)
+
+    with get_session() as session:
+        jim = session.exec(
+            select(Person).where(Person.email == "jim@dundiermifflin.com")
+        ).one()
+        movements = session.exec(
+            select(func.count(Movement.id)).where(Movement.person_id == jim.id)
+        ).one()
+
+        assert jim.balance[0].value == 500 + WRITERS * WRITES
+        assert movements == 1 + WRITERS * WRITES
+
+    for stats in results:
+        assert stats["transactions"] == WRITES
+        assert stats["failures"] == 0
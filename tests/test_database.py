@@ -1,7 +1,16 @@
 import pytest
-from sqlmodel import select
+from sqlalchemy import event
+from sqlmodel import Session, select
 
-from dundie.database import get_session
+import dundie.database
+from dundie.core import add, transfer
+from dundie.database import (
+    clone_database,
+    get_session,
+    make_engine,
+    on_commit,
+    unit_of_work,
+)
 from dundie.models import InvalidEmailError, Person
 from dundie.utils.db import add_movement, add_person
 
@@ -29,6 +38,29 @@ def test_ensure_database_is_test():
     assert "test.db" in session.get_bind().engine.url.database
 
 
+@pytest.mark.unit
+def test_clone_database(tmpdir):
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Joe Doe",
+            "email": "joe@doe.com",
+        }
+        add_person(session, Person(**data))
+        session.commit()
+        source = session.get_bind().engine.url.database
+
+    target = str(tmpdir.join("clone.db"))
+    clone_database(source, target)
+
+    engine = make_engine(f"sqlite:///{target}", create_tables=False)
+    with Session(engine) as session:
+        emails = session.exec(select(Person.email)).all()
+    engine.dispose()
+    assert "joe@doe.com" in emails
+
+
 @pytest.mark.unit
 def test_commit_to_database():
     session = get_session()
@@ -143,3 +175,120 @@ def test_update_existing_user():
     assert person_db.dept == "Marketing"
     assert person_db.role == "Manager"
     assert person_db.currency == "EUR"
+
+
+@pytest.mark.unit
+def test_nested_unit_of_work_shares_session():
+    with unit_of_work() as outer:
+        with unit_of_work() as inner:
+            assert inner is outer
+
+    with unit_of_work() as session:
+        assert session is not outer
+
+
+@pytest.mark.unit
+def test_unit_of_work_commits_at_the_outermost_level():
+    committed = []
+    data = {
+        "role": "Salesman",
+        "dept": "Sales",
+        "name": "Joe Doe",
+        "email": "joe@doe.com",
+    }
+
+    with unit_of_work() as session:
+        with unit_of_work() as inner:
+            add_person(inner, Person(**data))
+            on_commit(inner, lambda: committed.append(True))
+
+        assert committed == []
+        with get_session() as other:
+            assert (
+                other.exec(
+                    select(Person).where(Person.email == "joe@doe.com")
+                ).first()
+                is None
+            )
+
+    assert committed == [True]
+    with get_session() as session:
+        assert session.exec(
+            select(Person).where(Person.email == "joe@doe.com")
+        ).first()
+
+
+@pytest.mark.unit
+def test_unit_of_work_rolls_back_on_error():
+    committed = []
+    data = {
+        "role": "Salesman",
+        "dept": "Sales",
+        "name": "Joe Doe",
+        "email": "joe@doe.com",
+    }
+
+    with pytest.raises(RuntimeError):
+        with unit_of_work() as session:
+            add_person(session, Person(**data))
+            on_commit(session, lambda: committed.append(True))
+            raise RuntimeError("boom")
+
+    assert committed == []
+    with get_session() as session:
+        assert (
+            session.exec(
+                select(Person).where(Person.email == "joe@doe.com")
+            ).first()
+            is None
+        )
+
+
+@pytest.mark.unit
+def test_transfer_is_atomic(monkeypatch):
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Joe Doe",
+            "email": "joe@doe.com",
+        }
+        add_person(session, Person(**data))
+        session.commit()
+
+    calls = []
+
+    def failing_add_movement(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            raise RuntimeError("crash between movements")
+        return add_movement(*args, **kwargs)
+
+    monkeypatch.setattr("dundie.core.add_movement", failing_add_movement)
+
+    with pytest.raises(RuntimeError):
+        transfer(10, "joe@doe.com")
+
+    with get_session() as session:
+        joe = session.exec(
+            select(Person).where(Person.email == "joe@doe.com")
+        ).first()
+        assert joe.balance[0].value == 500
+        assert len(joe.movement) == 1
+
+
+@pytest.mark.unit
+def test_command_checks_out_one_connection():
+    checkouts = []
+    engine = dundie.database.engine
+
+    def listener(*args):
+        checkouts.append(args)
+
+    event.listen(engine, "checkout", listener)
+    try:
+        add(10, dept="Management")
+    finally:
+        event.remove(engine, "checkout", listener)
+
+    assert len(checkouts) == 1
@@ -0,0 +1,140 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from dundie.core import add, compact, dept_stats, load, transfer
+from dundie import database
+from dundie.database import IMMEDIATE, get_session
+from dundie.models import DeptSummary, Person
+from dundie.utils.auth import AuthenticationError
+from dundie.utils.db import add_person
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+def by_dept(result):
+    return {row["dept"]: row for row in result}
+
+
+@pytest.mark.unit
+def test_dept_stats_after_load_and_add():
+    load(PEOPLE_FILE)
+    add(100, dept="Sales")
+    transfer(50, "jim@dundiermifflin.com")
+
+    result = by_dept(dept_stats())
+
+    assert result["Sales"]["headcount"] == 2
+    assert result["Sales"]["balance"] == 850
+    assert result["Sales"]["average"] == 425
+    assert result["Sales"]["granted"] == 850
+    assert result["Management"]["balance"] == 50
+    assert result["Management"]["granted"] == 100
+    assert result["Directory"]["headcount"] == 1
+
+
+@pytest.mark.unit
+def test_dept_stats_follows_dept_changes():
+    load(PEOPLE_FILE)
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Directory",
+            "name": "Jim Halpert",
+            "email": "jim@dundiermifflin.com",
+        }
+        add_person(session, Person(**data))
+        session.commit()
+
+    result = by_dept(dept_stats())
+
+    assert result["Sales"]["headcount"] == 1
+    assert result["Sales"]["balance"] == 100
+    assert result["Directory"]["headcount"] == 2
+    assert result["Directory"]["balance"] == 600
+
+
+@pytest.mark.unit
+def test_dept_stats_rebuild_matches_incremental():
+    load(PEOPLE_FILE)
+    add(100, dept="Sales")
+    incremental = dept_stats()
+
+    with get_session() as session:
+        for summary in session.exec(select(DeptSummary)):
+            summary.balance = 0
+            session.add(summary)
+        session.commit()
+
+    assert dept_stats() != incremental
+    assert dept_stats(rebuild=True) == incremental
+
+
+@pytest.mark.unit
+def test_dept_stats_rebuild_takes_the_write_lock():
+    load(PEOPLE_FILE)
+    deletes = []
+
+    def record(connection, cursor, statement, *args):
+        if statement.startswith("DELETE FROM deptsummary"):
+            options = connection.get_execution_options()
+            deletes.append(bool(options.get(IMMEDIATE)))
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        dept_stats(rebuild=True)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+    assert deletes == [True]
+
+
+@pytest.mark.unit
+def test_dept_stats_rebuild_keeps_archived_movements():
+    load(PEOPLE_FILE)
+    add(100, dept="Sales")
+    incremental = dept_stats()
+
+    compact(datetime.now() + timedelta(seconds=1))
+
+    assert dept_stats(rebuild=True) == incremental
+
+
+@pytest.mark.unit
+def test_not_authorized_dept_stats_command(monkeypatch):
+    with get_session() as session:
+        data = {
+            "name": "Jim Doe",
+            "dept": "Sales",
+            "role": "Salesman",
+            "email": "jim@doe.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        monkeypatch.setenv("DUNDIE_EMAIL", person.email)
+        monkeypatch.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        dept_stats()
+
+    assert "You can not perform this action!" in str(exc_info.value)
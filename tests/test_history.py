@@ -0,0 +1,117 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import select
+
+from dundie.core import add, compact, history
+from dundie.database import get_session
+from dundie.models import Movement, Person
+from dundie.utils.auth import AuthenticationError, authenticated_as
+from dundie.utils.db import add_person
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Jim Halpert",
+            "email": "jim@dm.com",
+        }
+        add_person(session, Person(**data))
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture
+def jim_movements():
+    add(10, email="jim@dm.com")
+    add(-30, email="jim@dm.com")
+    add(20, email="jim@dm.com")
+
+    dates = [
+        datetime(2024, 1, 1, 9),
+        datetime(2024, 1, 1, 18),
+        datetime(2024, 1, 3),
+        datetime(2024, 2, 15),
+    ]
+    with get_session() as session:
+        jim = session.exec(select(Person).where(Person.email == "jim@dm.com"))
+        movements = session.exec(
+            select(Movement)
+            .where(Movement.person_id == jim.one().id)
+            .order_by(Movement.id)
+        )
+        for movement, day in zip(movements, dates):
+            movement.date = day
+            session.add(movement)
+        session.commit()
+
+
+def series(**kwargs):
+    return [
+        (row["date"], row["change"], row["balance"])
+        for row in history(email="jim@dm.com", **kwargs)
+    ]
+
+
+@pytest.mark.unit
+def test_history_by_day(jim_movements):
+    assert series() == [
+        ("2024-01-01", 510, 510),
+        ("2024-01-03", -30, 480),
+        ("2024-02-15", 20, 500),
+    ]
+
+
+@pytest.mark.unit
+def test_history_by_week_and_month(jim_movements):
+    assert series(bucket="week") == [
+        ("2024-01-01", 480, 480),
+        ("2024-02-12", 20, 500),
+    ]
+    assert series(bucket="month") == [
+        ("2024-01-01", 480, 480),
+        ("2024-02-01", 20, 500),
+    ]
+
+
+@pytest.mark.unit
+def test_history_window_keeps_running_balance(jim_movements):
+    assert series(since=datetime(2024, 1, 2), until=datetime(2024, 2, 1)) == [
+        ("2024-01-03", -30, 480),
+    ]
+
+
+@pytest.mark.unit
+def test_history_includes_archived_movements(jim_movements):
+    before = series()
+    compact(datetime(2024, 2, 1))
+
+    assert series() == before
+
+
+@pytest.mark.unit
+def test_history_of_another_person_requires_superuser(jim_movements):
+    with authenticated_as("jim@dm.com"):
+        assert [row["balance"] for row in history()] == [510, 480, 500]
+
+        with pytest.raises(AuthenticationError):
+            history(email="scott@dm.com")
+
+
+@pytest.mark.unit
+def test_history_invalid_bucket():
+    with pytest.raises(ValueError):
+        history(email="jim@dm.com", bucket="year")
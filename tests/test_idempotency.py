@@ -0,0 +1,112 @@
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from dundie.core import add, load, transfer
+from dundie.database import get_session
+from dundie.models import IdempotencyKey, Movement, Person
+from dundie.utils.db import add_person
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+def movements_of(email):
+    with get_session() as session:
+        return session.exec(
+            select(Movement.value)
+            .join(Person, Person.id == Movement.person_id)
+            .where(Person.email == email)
+        ).all()
+
+
+@pytest.mark.unit
+def test_add_retry_returns_first_outcome():
+    load(PEOPLE_FILE)
+
+    first = add(10, dept="Sales", idempotency_key="job-1")
+    retry = add(10, dept="Sales", idempotency_key="job-1")
+
+    assert first == retry == {"value": 10, "people": 2}
+    assert movements_of("jim@dundiermifflin.com") == [500, 10]
+
+
+@pytest.mark.unit
+def test_transfer_retry_does_not_post_twice(monkeypatch):
+    load(PEOPLE_FILE)
+    transfer(50, "jim@dundiermifflin.com", idempotency_key="job-1")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("the transfer was applied again")
+
+    monkeypatch.setattr("dundie.core.add_movement", fail)
+    outcome = transfer(50, "jim@dundiermifflin.com", idempotency_key="job-1")
+
+    assert outcome == {
+        "value": 50,
+        "to": "jim@dundiermifflin.com",
+        "name": "Jim Halpert",
+    }
+    assert movements_of("scott@dm.com") == [100, -50]
+    assert movements_of("jim@dundiermifflin.com") == [500, 50]
+
+
+@pytest.mark.unit
+def test_retry_looks_up_the_key_once():
+    load(PEOPLE_FILE)
+    add(10, email="jim@dundiermifflin.com", idempotency_key="job-1")
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with get_session() as session:
+        engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        add(10, email="jim@dundiermifflin.com", idempotency_key="job-1")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    assert sum("idempotencykey" in sql for sql in statements) == 1
+    assert not any(sql.startswith(("INSERT", "UPDATE")) for sql in statements)
+
+
+@pytest.mark.unit
+def test_key_reused_for_another_request():
+    load(PEOPLE_FILE)
+    add(10, dept="Sales", idempotency_key="job-1")
+
+    with pytest.raises(ValueError, match="another request"):
+        add(20, dept="Sales", idempotency_key="job-1")
+
+
+@pytest.mark.unit
+def test_expired_keys_are_purged(monkeypatch):
+    load(PEOPLE_FILE)
+    add(10, email="jim@dundiermifflin.com", idempotency_key="job-1")
+
+    monkeypatch.setattr("dundie.core.IDEMPOTENCY_TTL", 0)
+    add(10, email="jim@dundiermifflin.com", idempotency_key="job-2")
+
+    assert movements_of("jim@dundiermifflin.com") == [500, 10, 10]
+    with get_session() as session:
+        keys = session.exec(select(IdempotencyKey.key)).all()
+    assert keys == ["job-2"]
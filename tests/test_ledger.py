@@ -0,0 +1,187 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from dundie.core import (
+    add,
+    compact,
+    dept_stats,
+    load,
+    movements,
+    read,
+    verify_ledger,
+)
+from dundie import database
+from dundie.database import IMMEDIATE, get_session
+from dundie.models import Balance, Movement, MovementArchive, Person
+from dundie.utils.auth import AuthenticationError
+from dundie.utils.db import add_person
+from dundie.utils.ledger import CARRY_FORWARD_ACTOR
+
+from .constants import PEOPLE_FILE
+
+LAST_YEAR = datetime.now() - timedelta(days=365)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+def age_movements(days):
+    with get_session() as session:
+        for movement in session.exec(select(Movement)):
+            movement.date = movement.date - timedelta(days=days)
+            session.add(movement)
+        session.commit()
+
+
+@pytest.mark.unit
+def test_compact_keeps_balances_and_archives_history():
+    load(PEOPLE_FILE)
+    add(100, dept="Sales")
+    add(-30, email="jim@dundiermifflin.com")
+    age_movements(400)
+    add(10, email="jim@dundiermifflin.com")
+    balances = {person["email"]: person["balance"] for person in read()}
+    history = len(movements())
+
+    result = compact(LAST_YEAR, chunk_size=2)
+
+    assert result == {"people": 4, "movements": 7}
+    assert {person["email"]: person["balance"] for person in read()} == (
+        balances
+    )
+    with get_session() as session:
+        jim = session.exec(
+            select(Person).where(Person.email == "jim@dundiermifflin.com")
+        ).first()
+        assert [movement.value for movement in jim.movement] == [570, 10]
+        assert jim.movement[0].actor == CARRY_FORWARD_ACTOR
+        assert len(session.exec(select(MovementArchive)).all()) == 7
+
+    assert len(movements()) == 5
+    assert len(movements(archived=True)) == history
+
+
+@pytest.mark.unit
+def test_compact_takes_the_write_lock_for_every_chunk():
+    load(PEOPLE_FILE)
+    age_movements(400)
+    begins = []
+
+    def record(connection):
+        begins.append(bool(connection.get_execution_options().get(IMMEDIATE)))
+
+    event.listen(database.engine, "begin", record)
+    try:
+        compact(LAST_YEAR, chunk_size=1)
+    finally:
+        event.remove(database.engine, "begin", record)
+
+    assert len(begins) == 4
+    assert all(begins)
+
+
+@pytest.mark.unit
+def test_compact_can_be_resumed():
+    load(PEOPLE_FILE)
+    age_movements(400)
+
+    assert compact(LAST_YEAR) == {"people": 4, "movements": 4}
+    assert compact(LAST_YEAR) == {"people": 0, "movements": 0}
+
+    add(10, email="jim@dundiermifflin.com")
+    age_movements(400)
+
+    assert compact(LAST_YEAR) == {"people": 1, "movements": 1}
+    with get_session() as session:
+        assert len(session.exec(select(MovementArchive)).all()) == 5
+
+
+@pytest.mark.unit
+def test_not_authorized_compact_command(monkeypatch):
+    with get_session() as session:
+        data = {
+            "name": "Jim Doe",
+            "dept": "Sales",
+            "role": "Salesman",
+            "email": "jim@doe.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        monkeypatch.setenv("DUNDIE_EMAIL", person.email)
+        monkeypatch.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        compact(LAST_YEAR)
+
+    assert "You can not perform this action!" in str(exc_info.value)
+
+
+def corrupt_balances():
+    with get_session() as session:
+        jim, dwight = [
+            session.exec(select(Person).where(Person.email == email)).one()
+            for email in (
+                "jim@dundiermifflin.com",
+                "schrute@dundiermifflin.com",
+            )
+        ]
+        jim.balance[0].value = 1000
+        session.delete(dwight.balance[0])
+        session.commit()
+        return jim.id, dwight.id
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("workers", [1, 3])
+def test_verify_ledger_reports_mismatches(workers):
+    load(PEOPLE_FILE)
+    add(10, dept="Sales")
+    assert verify_ledger()["mismatches"] == []
+
+    jim_id, dwight_id = corrupt_balances()
+    result = verify_ledger(chunk_size=2, workers=workers)
+
+    assert result["people"] == 4
+    assert result["repaired"] == 0
+    assert [
+        (m["person_id"], m["balance"], m["movements"])
+        for m in result["mismatches"]
+    ] == [(jim_id, 1000, 510), (dwight_id, None, 110)]
+
+
+@pytest.mark.unit
+def test_verify_ledger_repairs_balances():
+    load(PEOPLE_FILE)
+    add(10, dept="Sales")
+    dept_stats()
+    corrupt_balances()
+
+    result = verify_ledger(repair=True, chunk_size=2, workers=2)
+
+    assert result["repaired"] == 2
+    assert verify_ledger()["mismatches"] == []
+    with get_session() as session:
+        assert len(session.exec(select(Balance)).all()) == 4
+    balances = {person["email"]: person["balance"] for person in read()}
+    assert balances["jim@dundiermifflin.com"] == 510
+    assert balances["schrute@dundiermifflin.com"] == 110
+    sales = [row for row in dept_stats() if row["dept"] == "Sales"][0]
+    assert sales["balance"] == 620
@@ -1,8 +1,9 @@
 import pytest
+from sqlmodel import select
 
-from dundie.core import load, add_person
+from dundie.core import load, load_diff, add_person
 from dundie.database import get_session
-from dundie.models import Person
+from dundie.models import Person, PersonFingerprint, User
 from dundie.utils.auth import AuthenticationError
 
 from .constants import PEOPLE_FILE
@@ -29,14 +30,14 @@ def auth(monkeypatch):
 @pytest.mark.high
 def test_load_positive_has_2_people():
     """Test function load function."""
-    assert len(load(PEOPLE_FILE)) == 3
+    assert len(load(PEOPLE_FILE).rows) == 3
 
 
 @pytest.mark.unit
 @pytest.mark.high
 def test_load_positive_first_name_starts_with_j():
     """Test function load function."""
-    assert load(PEOPLE_FILE)[0]["name"] == "Jim Halpert"
+    assert load(PEOPLE_FILE).rows[0]["name"] == "Jim Halpert"
 
 
 @pytest.mark.unit
@@ -47,6 +48,138 @@ def test_negative_filenotfound():
         load("assets/invalid.csv")
 
 
+@pytest.mark.unit
+def test_load_writes_passwords_once_to_given_file(tmpdir):
+    passwords_file = str(tmpdir.join("load_passwords.txt"))
+    load(PEOPLE_FILE, passwords_file=passwords_file)
+
+    lines = tmpdir.join("load_passwords.txt").readlines()
+    assert len(lines) == 3
+    assert "jim@dundiermifflin.com" in lines[0]
+
+
+@pytest.mark.unit
+def test_load_per_run_passwords_file(tmpdir):
+    load(PEOPLE_FILE, per_run=True)
+
+    run_files = tmpdir.listdir(lambda p: p.basename.startswith("passwords_2"))
+    assert len(run_files) == 1
+    assert len(run_files[0].readlines()) == 3
+
+
+@pytest.mark.unit
+def test_delta_load_skips_unchanged_rows(tmpdir):
+    people_file = tmpdir.join("people.csv")
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD\n"
+        "Dwight Schrute, Sales, Manager, schrute@dundiermifflin.com, USD\n"
+    )
+    load(str(people_file), delta=True)
+
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD\n"
+        "Dwight Schrute, Sales, Salesman, schrute@dundiermifflin.com, USD\n"
+        "Gabe Lewis, Directory, Manager, glewis@dundiermifflin.com, BRL\n"
+    )
+    result = load(str(people_file), delta=True).rows
+
+    assert [person["status"] for person in result] == [
+        "unchanged",
+        "changed",
+        "new",
+    ]
+    assert [person["created"] for person in result] == [False, False, True]
+    assert result[0]["email"] == "jim@dundiermifflin.com"
+    with get_session() as session:
+        dwight = session.exec(
+            select(Person).where(Person.email == "schrute@dundiermifflin.com")
+        ).first()
+        assert dwight.role == "Salesman"
+        assert len(session.exec(select(PersonFingerprint)).all()) == 3
+
+
+@pytest.mark.unit
+def test_delta_load_updates_people_without_fingerprint():
+    load(PEOPLE_FILE)
+    with get_session() as session:
+        for fingerprint in session.exec(select(PersonFingerprint)):
+            session.delete(fingerprint)
+        session.commit()
+
+    result = load(PEOPLE_FILE, delta=True).rows
+
+    assert [person["status"] for person in result] == ["changed"] * 3
+    assert [
+        person["status"] for person in load(PEOPLE_FILE, delta=True).rows
+    ] == ["unchanged"] * 3
+
+
+@pytest.mark.unit
+def test_load_skips_and_reports_invalid_lines(tmpdir):
+    people_file = tmpdir.join("people.csv")
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD\n"
+        "Dwight Schrute, Sales, Manager, schrute@invalid, USD\n"
+        "Gabe Lewis, Directory, Manager, glewis@dundiermifflin.com, BRL\n"
+    )
+
+    preview = list(load_diff(str(people_file)))
+    result = load(str(people_file))
+
+    assert [person["email"] for person in result.rows] == [
+        "jim@dundiermifflin.com",
+        "glewis@dundiermifflin.com",
+    ]
+    assert result.errors == [(2, "Invalid email: schrute@invalid")]
+    assert [(row["status"], row["changes"]) for row in preview] == [
+        ("invalid", "Line 2: Invalid email: schrute@invalid"),
+        ("new", ""),
+        ("new", ""),
+    ]
+
+
+@pytest.mark.unit
+def test_load_diff_reports_changes_without_writing(tmpdir, monkeypatch):
+    load(PEOPLE_FILE)
+    people_file = tmpdir.join("people.csv")
+    people_file.write(
+        "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD\n"
+        "Dwight Schrute, Sales, Salesman, schrute@dundiermifflin.com, BRL\n"
+        "Pam Beesly, Reception, Receptionist, pam@dundiermifflin.com\n"
+        "Pam Beesly, Sales, Salesman, pam@dundiermifflin.com, USD\n"
+    )
+    monkeypatch.setattr(
+        "dundie.utils.db.get_password_hash",
+        lambda password: pytest.fail("Hashed a password"),
+    )
+
+    result = list(load_diff(str(people_file)))
+
+    assert [
+        (row["email"], row["status"], row["changes"]) for row in result
+    ] == [
+        ("jim@dundiermifflin.com", "unchanged", ""),
+        (
+            "schrute@dundiermifflin.com",
+            "changed",
+            "role: Manager -> Salesman, currency: USD -> BRL",
+        ),
+        ("pam@dundiermifflin.com", "new", ""),
+        (
+            "pam@dundiermifflin.com",
+            "changed",
+            "dept: Reception -> Sales, role: Receptionist -> Salesman",
+        ),
+    ]
+    with get_session() as session:
+        assert len(session.exec(select(Person)).all()) == 4
+        assert len(session.exec(select(User)).all()) == 4
+        dwight = session.exec(
+            select(Person).where(Person.email == "schrute@dundiermifflin.com")
+        ).first()
+        assert dwight.role == "Manager"
+
+
 @pytest.mark.unit
 def test_not_authorized_load_command(monkeypatch):
     with get_session() as session:
@@ -71,3 +204,6 @@ def test_not_authorized_load_command(monkeypatch):
         load(PEOPLE_FILE)
 
     assert "You can not perform this action!" in str(exc_info.value)
+
+    with pytest.raises(AuthenticationError):
+        load_diff(PEOPLE_FILE)
@@ -0,0 +1,176 @@
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import select
+
+from dundie.core import add, import_rates, movements
+from dundie.database import get_session, unit_of_work
+from dundie.models import Movement, Person
+from dundie.utils.db import add_person
+from dundie.utils.exchange import (
+    RateProvider,
+    StaticRateProvider,
+    set_rate_provider,
+)
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Bruno",
+            "email": "bruno@dm.com",
+            "currency": "BRL",
+        }
+        add_person(session, Person(**data))
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture(autouse=True)
+def rates():
+    set_rate_provider(StaticRateProvider({"BRL": 5}))
+    yield
+    set_rate_provider(None)
+
+
+class FailingRateProvider(RateProvider):
+    def get_rate(self, currency):
+        raise AssertionError(f"Fetched {currency}")
+
+
+def bruno_movements():
+    return [
+        movement["Converted Movement"]
+        for movement in movements()
+        if movement["Name"] == "Bruno"
+    ]
+
+
+@pytest.mark.unit
+def test_movements_are_converted_at_the_rate_of_their_date(tmpdir):
+    with get_session() as session:
+        movement = session.exec(select(Movement)).all()[-1]
+        movement.date = datetime(2021, 6, 1)
+        session.add(movement)
+        session.commit()
+    add(10, email="bruno@dm.com")
+
+    rates_file = tmpdir.join("rates.csv")
+    rates_file.write(
+        "currency,date,rate\n"
+        "BRL,2020-01-01,4\n"
+        "BRL,2022-01-01,4.5\n"
+        f"BRL,{date.today()},6\n"
+    )
+    assert import_rates(str(rates_file)) == 3
+
+    assert bruno_movements() == [60, 2000]
+
+
+@pytest.mark.unit
+def test_movements_without_history_use_the_stored_rate():
+    assert bruno_movements() == [2500]
+
+    set_rate_provider(FailingRateProvider())
+    add(10, email="bruno@dm.com")
+
+    assert bruno_movements() == [50, 2500]
+
+
+@pytest.mark.unit
+def test_import_rates_rejects_invalid_rows(tmpdir):
+    rates_file = tmpdir.join("rates.csv")
+    rates_file.write("currency,date,rate\nBRL,2020-01-01,abc\n")
+
+    with pytest.raises(ValueError, match="Invalid rate: abc"):
+        import_rates(str(rates_file))
+
+
+def set_date(value, day):
+    with get_session() as session:
+        movement = session.exec(
+            select(Movement).where(Movement.value == value)
+        ).one()
+        movement.date = day
+        session.add(movement)
+        session.commit()
+
+
+@pytest.mark.unit
+def test_movements_filtered_by_actor_and_dates():
+    add(10, email="bruno@dm.com")
+    add(20, email="bruno@dm.com")
+    add(30, dept="Management")
+    set_date(10, datetime(2024, 6, 30))
+    set_date(20, datetime(2024, 7, 15))
+
+    result = movements(
+        actor="scott@dm.com",
+        since=datetime(2024, 7, 1),
+        until=datetime(2024, 10, 1),
+    )
+
+    assert [(row["Name"], row["Movement"]) for row in result] == [
+        ("Bruno", 20)
+    ]
+
+
+@pytest.mark.unit
+def test_movements_filtered_by_person():
+    add(10, email="bruno@dm.com")
+
+    assert [row["Movement"] for row in movements(email="bruno@dm.com")] == [
+        10,
+        500,
+    ]
+    assert {row["Name"] for row in movements(dept="Management")} == {
+        "Michael Scott"
+    }
+    assert movements(dept="Sales", actor="nobody@dm.com") == []
+
+
+@pytest.mark.unit
+def test_movement_filters_use_indexes():
+    add(10, email="bruno@dm.com")
+    movements()  # stores the rates before the statements are recorded
+    statements = []
+
+    def record(conn, cursor, statement, parameters, *args):
+        if "AS converted" in statement:
+            statements.append((statement, parameters))
+
+    with unit_of_work() as session:
+        connection = session.connection()
+        event.listen(connection, "before_cursor_execute", record)
+        movements(actor="scott@dm.com", since=datetime(2024, 7, 1))
+        movements(email="bruno@dm.com", since=datetime(2024, 7, 1))
+        event.remove(connection, "before_cursor_execute", record)
+
+        plans = [
+            " ".join(
+                str(row[-1])
+                for row in connection.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+            )
+            for statement, parameters in statements
+        ]
+
+    assert (
+        "USING INDEX ix_movement_actor_date (actor=? AND date>?)" in plans[0]
+    )
+    assert "ix_movement_person_id_date (person_id=? AND date>?)" in plans[1]
@@ -0,0 +1,84 @@
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from dundie.utils.output import print_rows
+from dundie.utils.rows import HistoryRow
+
+ROWS = [
+    {
+        "email": "jim@dundiermifflin.com",
+        "name": "Jim",
+        "balance": Decimal(500),
+    },
+    {"email": "pam@dundiermifflin.com", "name": "Pam", "balance": Decimal(9)},
+]
+
+
+@pytest.mark.unit
+def test_print_rows_tsv():
+    output = io.StringIO()
+
+    assert print_rows(ROWS, "tsv", decimals=("balance",), file=output) == 2
+    assert output.getvalue().splitlines() == [
+        "email\tname\tbalance",
+        "jim@dundiermifflin.com\tJim\t500.00",
+        "pam@dundiermifflin.com\tPam\t9.00",
+    ]
+
+
+@pytest.mark.unit
+def test_print_rows_jsonl():
+    output = io.StringIO()
+
+    assert print_rows(iter(ROWS), "jsonl", file=output) == 2
+    lines = output.getvalue().splitlines()
+    assert json.loads(lines[0]) == {
+        "email": "jim@dundiermifflin.com",
+        "name": "Jim",
+        "balance": 500.0,
+    }
+
+
+@pytest.mark.unit
+def test_print_rows_plain_streams_rows():
+    output = io.StringIO()
+
+    def rows():
+        yield ROWS[0]
+        assert output.getvalue().count("\n") == 2
+        yield ROWS[1]
+
+    assert print_rows(rows(), "plain", file=output) == 2
+    assert output.getvalue().splitlines()[0] == "Email | Name | Balance"
+
+
+@pytest.mark.unit
+def test_print_rows_table_is_truncated(monkeypatch):
+    monkeypatch.setattr("dundie.utils.output.TABLE_MAX_ROWS", 1)
+    output = io.StringIO()
+
+    assert print_rows(ROWS, "table", title="Report", file=output) == 2
+    assert "jim@dundiermifflin.com" in output.getvalue()
+    assert "pam@dundiermifflin.com" not in output.getvalue()
+    assert "1 more rows not shown" in output.getvalue()
+
+
+@pytest.mark.unit
+def test_print_rows_table_of_report_rows():
+    output = io.StringIO()
+    rows = [HistoryRow("2024-01-01", Decimal(5), Decimal(505))]
+
+    assert print_rows(rows, "table", decimals=("balance",), file=output) == 1
+    table = output.getvalue()
+    assert "Date" in table and "Balance" in table
+    assert "505.00" in table
+
+
+@pytest.mark.unit
+def test_print_rows_empty(capsys):
+    assert print_rows([], "table") == 0
+    assert print_rows([], "jsonl") == 0
+    assert capsys.readouterr().out == "No results found.\n"
@@ -0,0 +1,133 @@
+import pytest
+
+from dundie.utils import parser
+from dundie.utils.parser import chunk_ranges, parse_file
+
+LINES = [
+    "Jim Halpert, Sales, Salesman, jim@dundiermifflin.com, USD",
+    "Dwight Schrute, Sales, Manager, schrute@dundiermifflin.com",
+    "Gabe Lewis, Directory, Manager, glewis@invalid",
+    "",
+    "Kevin Malone, Accountance, kevin@dundiermifflin.com",
+    "Pam Beesly, Reception, , pam@dundiermifflin.com, USD",
+    "Bruno, General, Guard, bruno@dm.com, BRL",
+]
+
+
+@pytest.fixture
+def people_file(tmpdir):
+    path = tmpdir.join("people.csv")
+    path.write("\n".join(LINES * 50) + "\n")
+    return str(path)
+
+
+@pytest.mark.unit
+def test_chunk_ranges_end_on_line_boundaries(people_file):
+    with open(people_file, "rb") as file:
+        data = file.read()
+
+    ranges = chunk_ranges(people_file, 100)
+
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0
+    assert ranges[-1][1] == len(data)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert data[end - 1 : end] == b"\n"
+
+
+@pytest.mark.unit
+def test_chunk_ranges_empty_file(tmpdir):
+    path = tmpdir.join("empty.csv")
+    path.write("")
+
+    assert chunk_ranges(str(path), 100) == []
+
+
+@pytest.mark.unit
+def test_parse_file_validates_rows(people_file):
+    batches = list(parse_file(people_file, workers=1))
+
+    assert len(batches) == 1
+    rows, errors = batches[0]
+    assert len(rows) == 150
+    assert rows[1] == {
+        "name": "Dwight Schrute",
+        "dept": "Sales",
+        "role": "Manager",
+        "email": "schrute@dundiermifflin.com",
+        "currency": "USD",
+    }
+    assert errors[:3] == [
+        (3, "Invalid email: glewis@invalid"),
+        (5, "Expected 4 or 5 columns, got 3"),
+        (6, "Empty field"),
+    ]
+    assert errors[-1] == (len(LINES) * 49 + 6, "Empty field")
+
+
+@pytest.mark.unit
+def test_parse_file_in_process_pool_matches_single_process(people_file):
+    single = list(parse_file(people_file, workers=1))
+    pooled = list(parse_file(people_file, workers=2, chunk_size=200))
+
+    assert len(pooled) > 2
+    assert [row for batch in pooled for row in batch.rows] == single[0].rows
+    assert [error for batch in pooled for error in batch.errors] == single[
+        0
+    ].errors
+
+
+@pytest.mark.unit
+def test_parse_file_keeps_quoted_newlines(tmpdir):
+    path = tmpdir.join("people.csv")
+    path.write_text(
+        '"Jim\nHalpert", Sales, Salesman, jim@dundiermifflin.com\n'
+        "Pam\u2028Beesly, Reception, Receptionist, pam@dundiermifflin.com\n"
+        "Gabe Lewis, Directory, Manager, glewis@invalid\n",
+        encoding="utf-8",
+    )
+
+    [batch] = parse_file(str(path), workers=1)
+
+    assert [row["name"] for row in batch.rows] == [
+        "Jim\nHalpert",
+        "Pam\u2028Beesly",
+    ]
+    assert batch.errors == [(4, "Invalid email: glewis@invalid")]
+
+
+@pytest.mark.unit
+def test_chunk_ranges_do_not_split_quoted_fields(tmpdir):
+    path = tmpdir.join("people.csv")
+    path.write('"Jim\n\n\nHalpert", Sales, Salesman, jim@dm.com\n' * 20)
+
+    ranges = chunk_ranges(str(path), 10)
+
+    assert len(ranges) == 20
+    batches = list(parse_file(str(path), workers=2, chunk_size=10))
+    assert [row["name"] for batch in batches for row in batch.rows] == [
+        "Jim\n\n\nHalpert"
+    ] * 20
+
+
+@pytest.mark.unit
+def test_parse_file_spawns_the_workers(people_file, monkeypatch):
+    contexts = []
+
+    class Pool(parser.ProcessPoolExecutor):
+        def __init__(self, max_workers, mp_context):
+            contexts.append(mp_context.get_start_method())
+            super().__init__(max_workers, mp_context)
+
+    monkeypatch.setattr(parser, "ProcessPoolExecutor", Pool)
+
+    list(parse_file(people_file, workers=2, chunk_size=200))
+
+    assert contexts == ["spawn"]
+
+
+@pytest.mark.unit
+def test_parse_file_not_found():
+    with pytest.raises(FileNotFoundError):
+        parse_file("assets/invalid.csv")
@@ -1,9 +1,10 @@
 import pytest
 
-from dundie.core import load, read
+from dundie.core import load, read, read_page
 from dundie.database import get_session
 from dundie.models import Person
 from dundie.utils.db import add_person
+from dundie.utils.pagination import InvalidCursorError
 
 from .constants import PEOPLE_FILE
 
@@ -83,6 +84,78 @@ def test_read_only_one_person(monkeypatch):
     assert len(result) == 1
 
 
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "order_by,expected",
+    [
+        (
+            "id",
+            [
+                "jim@dundiermifflin.com",
+                "schrute@dundiermifflin.com",
+                "glewis@dundiermifflin.com",
+            ],
+        ),
+        (
+            "dept",
+            [
+                "glewis@dundiermifflin.com",
+                "jim@dundiermifflin.com",
+                "schrute@dundiermifflin.com",
+            ],
+        ),
+    ],
+)
+def test_read_page_walks_every_page(monkeypatch, order_by, expected):
+    monkeypatch.setenv("DUNDIE_EMAIL", "schrute@dundiermifflin.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "123456")
+    monkeypatch.setattr("dundie.utils.auth.verify_password", lambda x, y: True)
+
+    load(PEOPLE_FILE)
+
+    emails = []
+    cursor = None
+    for _ in range(2):
+        page = read_page(limit=2, order_by=order_by, cursor=cursor)
+        emails.extend(person["email"] for person in page.rows)
+        cursor = page.next_cursor
+
+    assert cursor is None
+    assert emails == expected
+    assert read(order_by=order_by) == read(limit=3, order_by=order_by)
+
+
+@pytest.mark.unit
+def test_read_page_rejects_invalid_cursor(monkeypatch):
+    monkeypatch.setenv("DUNDIE_EMAIL", "schrute@dundiermifflin.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "123456")
+    monkeypatch.setattr("dundie.utils.auth.verify_password", lambda x, y: True)
+
+    load(PEOPLE_FILE)
+    cursor = read_page(limit=1).next_cursor
+
+    with pytest.raises(InvalidCursorError):
+        read_page(limit=1, order_by="dept", cursor=cursor)
+
+    with pytest.raises(InvalidCursorError):
+        read_page(limit=1, cursor="not-a-cursor")
+
+
+@pytest.mark.unit
+def test_read_page_rejects_invalid_limit(monkeypatch):
+    monkeypatch.setenv("DUNDIE_EMAIL", "schrute@dundiermifflin.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "123456")
+    monkeypatch.setattr("dundie.utils.auth.verify_password", lambda x, y: True)
+
+    load(PEOPLE_FILE)
+
+    with pytest.raises(ValueError):
+        read_page(limit=0)
+
+    with pytest.raises(ValueError):
+        read(limit=-1)
+
+
 @pytest.mark.unit
 def test_not_authorized_read_dept_command(monkeypatch):
     with get_session() as session:
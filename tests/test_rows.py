@@ -0,0 +1,146 @@
+import gc
+import json
+import tracemalloc
+from datetime import datetime
+
+import pytest
+from sqlmodel import func, select
+
+from dundie.core import movements, read
+from dundie.database import get_session
+from dundie.models import Balance, ExchangeRate, Movement, Person
+from dundie.utils.db import add_person, converted_value
+from dundie.utils.rows import MovementRow, PersonRow, jsonable
+
+PEOPLE = 1000
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture
+def many_people():
+    with get_session() as session:
+        for index in range(PEOPLE):
+            person = Person(
+                email=f"employee{index}@dm.com",
+                name=f"Employee {index}",
+                dept="Sales",
+                role="Salesman",
+                currency="USD",
+            )
+            person.balance.append(Balance(value=index))
+            person.movement.append(
+                Movement(
+                    actor="scott@dm.com", value=index, date=datetime.now()
+                )
+            )
+            session.add(person)
+        session.commit()
+
+
+def orm_report():
+    """Builds the report of `read` from ORM objects and dicts."""
+    last_movement = (
+        select(func.max(Movement.date))
+        .where(Movement.person_id == Person.id)
+        .scalar_subquery()
+    )
+    sql = (
+        select(
+            Person,
+            Balance.value,
+            last_movement,
+            converted_value(Balance.value),
+        )
+        .join(Balance, Balance.person_id == Person.id)
+        .outerjoin(ExchangeRate, ExchangeRate.currency == Person.currency)
+        .order_by(Person.id)
+    )
+    with get_session() as session:
+        return [
+            {
+                "email": person.email,
+                "balance": balance,
+                "last movement": date.strftime("%d/%m/%Y %H:%M:%S"),
+                **person.dict(exclude={"id"}),
+                **{"value": total},
+            }
+            for person, balance, date, total in session.exec(sql).all()
+        ]
+
+
+def traced(function):
+    """Returns the result, the peak and the retained memory of a call."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak, retained
+
+
+@pytest.mark.unit
+def test_rows_read_like_dicts():
+    row = MovementRow("Jim", "01/01/2024 00:00:00", 10, 10, "scott@dm.com")
+
+    assert row["Converted Movement"] == 10
+    assert row[0] == "Jim"
+    assert dict(row) == row.as_dict()
+    assert list(row.keys()) == list(MovementRow.KEYS)
+    with pytest.raises(KeyError):
+        row["name"]
+    with pytest.raises(TypeError):
+        MovementRow("Jim")
+
+
+@pytest.mark.unit
+def test_jsonable_converts_nested_rows():
+    row = MovementRow("Jim", "01/01/2024 00:00:00", 10, 10, "scott@dm.com")
+
+    result = jsonable(([row], None))
+
+    assert json.loads(json.dumps(result)) == [[row.as_dict()], None]
+
+
+@pytest.mark.unit
+def test_read_matches_the_orm_report(many_people):
+    rows = read(order_by="id")
+
+    assert all(isinstance(row, PersonRow) for row in rows)
+    assert [row.as_dict() for row in rows] == orm_report()
+
+
+@pytest.mark.unit
+def test_reports_use_less_memory_than_orm_objects(many_people):
+    read()  # fetch the rates outside of the measurements
+    movements()
+
+    expected, orm_peak, orm_retained = traced(orm_report)
+    rows, peak, retained = traced(read)
+
+    assert len(rows) == len(expected) == PEOPLE + 1
+    assert peak < orm_peak / 1.5
+    assert retained < orm_retained
+
+    _, _, rows_retained = traced(movements)
+    _, _, dicts_retained = traced(
+        lambda: [row.as_dict() for row in movements()]
+    )
+    assert rows_retained < dicts_retained
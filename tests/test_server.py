@@ -0,0 +1,156 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+from dundie.cli import main
+from dundie.client import Client, RemoteCore, RemoteError, parse_address
+from dundie.database import get_session
+from dundie.models import Person
+from dundie.server import Server, create_server
+from dundie.utils.db import add_person
+
+from .constants import PEOPLE_FILE
+
+EMAIL = "jim@dundiermifflin.com"
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture
+def remote(tmpdir):
+    server = create_server(str(tmpdir.join("dundie.sock")), rates_ttl=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    with Client(server.server_address) as client:
+        yield RemoteCore(client)
+
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.unit
+def test_parse_address():
+    assert parse_address("127.0.0.1:8765")[1] == ("127.0.0.1", 8765)
+    assert parse_address("/tmp/dundie.sock")[1] == "/tmp/dundie.sock"
+
+
+@pytest.mark.unit
+def test_server_verifies_credentials_once(monkeypatch):
+    calls = []
+
+    def verify_password(password, hashed):
+        calls.append(password)
+        return password == "1234"
+
+    monkeypatch.setattr("dundie.utils.auth.verify_password", verify_password)
+    server = Server()
+    request = {"op": "read", "email": "scott@dm.com", "password": "1234"}
+
+    assert server.handle(request)["ok"] is True
+    assert server.handle(request)["ok"] is True
+    assert calls == ["1234"]
+
+    response = server.handle({**request, "password": "wrong"})
+    assert response["ok"] is False
+    assert response["error"] == "AuthenticationError"
+
+
+@pytest.mark.unit
+def test_server_rejects_missing_credentials(monkeypatch):
+    response = Server().handle({"op": "read"})
+
+    assert response == {
+        "ok": False,
+        "error": "AuthenticationError",
+        "message": "Variables DUNDIE_EMAIL and DUNDIE_PASSWORD not definied.",
+    }
+
+
+@pytest.mark.unit
+def test_remote_core_runs_operations(remote):
+    remote.load(filepath=PEOPLE_FILE)
+    remote.add(value=10, dept="Sales")
+
+    rows, cursor = remote.read_page(limit=2, dept="Sales")
+
+    assert cursor is None
+    assert [row["balance"] for row in rows] == [510, 110]
+    assert remote.client.call("ping") == "pong"
+
+
+@pytest.mark.unit
+def test_remote_core_raises_server_errors(remote, monkeypatch):
+    with pytest.raises(ValueError, match="Unknown operation: drop"):
+        remote.drop()
+
+    with pytest.raises(RuntimeError, match="Not Found"):
+        remote.add(value=10, dept="Nowhere")
+
+    monkeypatch.setenv("DUNDIE_PASSWORD", "wrong")
+    with pytest.raises(RemoteError, match="AuthenticationError"):
+        remote.read()
+
+
+@pytest.mark.unit
+def test_cli_add_in_client_mode(remote, monkeypatch):
+    monkeypatch.setattr("dundie.cli.get_core", lambda: remote)
+    remote.load(filepath=PEOPLE_FILE)
+
+    out = CliRunner().invoke(main, ["add", "10", "--email", EMAIL])
+
+    assert out.exit_code == 0, out.output
+    assert [row["balance"] for row in remote.read(email=EMAIL)] == [510]
+
+
+@pytest.mark.unit
+def test_transfer_prints_on_the_client(remote, monkeypatch, capsys):
+    remote.load(filepath=PEOPLE_FILE)
+    remote.add(value=100, email="scott@dm.com")
+    capsys.readouterr()
+
+    remote.transfer(value=10, to_person=EMAIL)
+    assert capsys.readouterr().out == ""
+
+    monkeypatch.setattr("dundie.cli.get_core", lambda: remote)
+    out = CliRunner().invoke(
+        main, ["transfer", "--value", "10", "--to", EMAIL]
+    )
+
+    assert out.exit_code == 0, out.output
+    assert "Success! You have transfered 10 points" in out.output
+
+
+@pytest.mark.unit
+def test_cli_does_not_import_the_database_in_client_mode(monkeypatch):
+    monkeypatch.setenv("DUNDIE_SERVER", "/nonexistent.sock")
+    code = (
+        "import sys\n"
+        "from dundie.cli import get_core\n"
+        "get_core()\n"
+        "print('sqlmodel' in sys.modules, 'dundie.database' in sys.modules)"
+    )
+
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True
+    )
+
+    assert out.stdout.split() == ["False", "False"], out.stderr
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dundie.core import add, compact, load, read, summary, top
+from dundie.database import get_session
+from dundie.models import Person
+from dundie.utils.auth import AuthenticationError
+from dundie.utils.db import add_person
+from dundie.utils.exchange import StaticRateProvider, set_rate_provider
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.fixture(autouse=True)
+def rates():
+    set_rate_provider(StaticRateProvider({"BRL": 5}))
+    yield
+    set_rate_provider(None)
+
+
+@pytest.fixture
+def people():
+    load(PEOPLE_FILE)
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Bruno",
+            "email": "bruno@dm.com",
+            "currency": "BRL",
+        }
+        add_person(session, Person(**data))
+        session.commit()
+
+
+@pytest.mark.unit
+def test_summary_groups_by_currency(people):
+    result = summary()
+
+    assert [
+        (row["currency"], row["people"], row["balance"], row["value"])
+        for row in result["currencies"]
+    ] == [("BRL", 1, 500, 2500), ("USD", 4, 800, 800)]
+    assert result["value"] == 3300
+    assert result["movements value"] == 3300
+
+
+@pytest.mark.unit
+def test_summary_movements_window(people):
+    add(10, dept="Sales")
+    tomorrow = datetime.now() + timedelta(days=1)
+
+    assert summary(since=tomorrow)["movements value"] == 0
+    assert summary(dept="Sales")["movements value"] == 510 + 110 + 510 * 5
+
+
+@pytest.mark.unit
+def test_summary_includes_archived_movements(people):
+    before = summary()
+
+    compact(datetime.now() + timedelta(days=1))
+
+    assert summary() == before
+
+
+@pytest.mark.unit
+def test_summary_requires_superuser(monkeypatch, people):
+    monkeypatch.setenv("DUNDIE_EMAIL", "jim@dundiermifflin.com")
+    monkeypatch.setattr("dundie.utils.auth.verify_password", lambda x, y: True)
+
+    with pytest.raises(AuthenticationError):
+        summary()
+
+
+@pytest.mark.unit
+def test_reports_reuse_stored_rates(monkeypatch, people):
+    def bruno_value():
+        result = read(email="bruno@dm.com")
+        return result[0]["value"]
+
+    assert bruno_value() == 2500
+
+    set_rate_provider(StaticRateProvider({}))
+    assert bruno_value() == 2500
+
+    set_rate_provider(StaticRateProvider({"BRL": 6}))
+    monkeypatch.setattr("dundie.core.RATES_MAX_AGE", 60)
+    assert bruno_value() == 2500
+
+    monkeypatch.setattr("dundie.core.RATES_MAX_AGE", 0)
+    assert bruno_value() == 3000
+    assert top(n=1, converted=True)[0]["value"] == 3000
@@ -0,0 +1,149 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dundie.core import add, compact, load, top
+from dundie.database import get_session
+from dundie.models import Person
+from dundie.utils.auth import AuthenticationError
+from dundie.utils.db import add_person
+from dundie.utils.exchange import USDRate
+
+from .constants import PEOPLE_FILE
+
+
+@pytest.fixture(scope="function", autouse=True)
+def auth(monkeypatch):
+    with get_session() as session, monkeypatch.context() as ctx:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        ctx.setenv("DUNDIE_EMAIL", person.email)
+        ctx.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+        yield
+
+
+@pytest.mark.unit
+def test_top_orders_by_balance_and_limits():
+    load(PEOPLE_FILE)
+    add(1000, email="glewis@dundiermifflin.com")
+
+    result = top(n=2)
+
+    assert len(result) == 2
+    assert result[0]["email"] == "glewis@dundiermifflin.com"
+    assert result[0]["points"] == 1100
+    assert result[0]["rank"] == 1
+    assert result[1]["email"] == "jim@dundiermifflin.com"
+    assert "value" not in result[0]
+
+
+@pytest.mark.unit
+def test_top_rejects_invalid_n():
+    load(PEOPLE_FILE)
+
+    with pytest.raises(ValueError):
+        top(n=0)
+
+    with pytest.raises(ValueError):
+        top(n=-1)
+
+
+@pytest.mark.unit
+def test_top_filtered_by_dept():
+    load(PEOPLE_FILE)
+
+    result = top(dept="Sales")
+
+    assert [person["email"] for person in result] == [
+        "jim@dundiermifflin.com",
+        "schrute@dundiermifflin.com",
+    ]
+
+
+@pytest.mark.unit
+def test_top_received_in_last_days():
+    load(PEOPLE_FILE)
+    add(500, email="schrute@dundiermifflin.com")
+    add(-50, email="jim@dundiermifflin.com")
+
+    result = top(n=1, days=30)
+
+    assert result[0]["email"] == "schrute@dundiermifflin.com"
+    assert result[0]["points"] == 600
+
+
+@pytest.mark.unit
+def test_top_received_in_last_days_includes_archived_movements():
+    load(PEOPLE_FILE)
+    add(500, email="schrute@dundiermifflin.com")
+    compact(datetime.now() + timedelta(seconds=1))
+
+    result = top(n=1, days=30)
+
+    assert result[0]["email"] == "schrute@dundiermifflin.com"
+    assert result[0]["points"] == 600
+
+
+@pytest.mark.unit
+def test_top_currency_converted(monkeypatch):
+    rates = {"USD": USDRate(high=1), "BRL": USDRate(high=5)}
+    monkeypatch.setattr(
+        "dundie.core.get_rates",
+        lambda currencies: {
+            currency: rates[currency] for currency in currencies
+        },
+    )
+    with get_session() as session:
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Bruno",
+            "email": "bruno@dm.com",
+            "currency": "BRL",
+        }
+        add_person(session, Person(**data))
+        data = {
+            "role": "Salesman",
+            "dept": "Sales",
+            "name": "Joe Doe",
+            "email": "joe@doe.com",
+            "currency": "USD",
+        }
+        add_person(session, Person(**data))
+        session.commit()
+
+    result = top(n=2, converted=True)
+
+    assert result[0]["email"] == "bruno@dm.com"
+    assert result[0]["points"] == 500
+    assert result[0]["value"] == 2500
+    assert result[1]["email"] == "joe@doe.com"
+    assert result[1]["value"] == 500
+
+
+@pytest.mark.unit
+def test_not_authorized_top_command(monkeypatch):
+    with get_session() as session:
+        data = {
+            "name": "Jim Doe",
+            "dept": "Sales",
+            "role": "Salesman",
+            "email": "jim@doe.com",
+        }
+        password = "1234"
+        person, _ = add_person(session, Person(**data), password)
+        monkeypatch.setenv("DUNDIE_EMAIL", person.email)
+        monkeypatch.setenv("DUNDIE_PASSWORD", password)
+        session.commit()
+
+    with pytest.raises(AuthenticationError) as exc_info:
+        top()
+
+    assert "You can not perform this action!" in str(exc_info.value)
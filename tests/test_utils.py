@@ -1,13 +1,39 @@
+import os
+import sqlite3
+
 import pytest
 import httpx
 
 from unittest.mock import MagicMock
-from dundie.models import Person
-from dundie.utils.exchange import get_rates, USDRate
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+
+from dundie import database
+from dundie.core import read
+from dundie.database import IMMEDIATE, get_session
+from dundie.models import Person, User
+from dundie.utils.db import add_person
+from dundie.utils.exchange import (
+    RateProvider,
+    SnapshotRateProvider,
+    StaticRateProvider,
+    configure_rates_cache,
+    get_rate_provider,
+    get_rates,
+    set_rate_provider,
+    save_snapshot,
+    USDRate,
+)
 from dundie.utils.email import check_valid_email
+from dundie.utils.passwords import PasswordWriter
 from dundie.utils.user import (
     generate_simple_password,
     get_password_hash,
+    make_password_hash,
+    needs_rehash,
     verify_password,
 )
 from dundie.utils.auth import requires_auth, AuthenticationError
@@ -30,6 +56,45 @@ def test_password_hash():
     assert verify_password(password, hashed)
 
 
+@pytest.mark.unit
+def test_password_profiles_verify_each_other():
+    fast = make_password_hash("fast").hash("batatinha123")
+    default = make_password_hash("default").hash("batatinha123")
+
+    assert "t=1" in fast and "t=1" not in default
+    assert make_password_hash("default").verify("batatinha123", fast)
+    assert make_password_hash("fast").verify("batatinha123", default)
+
+    with pytest.raises(ValueError):
+        make_password_hash("unknown")
+
+
+@pytest.mark.unit
+def test_password_writer_buffers_until_commit(tmpdir):
+    path = str(tmpdir.join("passwords.txt"))
+    writer = PasswordWriter(path)
+    writer.write("joe@doe.com", "1234")
+    writer.write("jim@doe.com", "5678")
+
+    assert not tmpdir.join("passwords.txt").exists()
+
+    writer.commit()
+    lines = tmpdir.join("passwords.txt").readlines()
+
+    assert len(lines) == 2
+    assert "Email: joe@doe.com | Password: 1234" in lines[0]
+    assert "Email: jim@doe.com | Password: 5678" in lines[1]
+
+
+@pytest.mark.unit
+def test_password_writer_for_run_uses_unique_files():
+    first = PasswordWriter.for_run()
+    second = PasswordWriter.for_run()
+
+    assert first.path != second.path
+    assert os.path.basename(first.path).startswith("passwords_")
+
+
 @pytest.mark.unit
 @pytest.mark.parametrize(
     "address", ["brunochiconato01@gmail.com", "joe@doe.com", "a@b.pt"]
@@ -122,6 +187,111 @@ def test_get_rates_failure(monkeypatch):
     assert float(rates["BRL"].values) == 0
 
 
+@pytest.mark.unit
+def test_get_rates_cache(monkeypatch):
+    calls = []
+
+    def fake_get(url, **kwargs):
+        calls.append(url)
+        return fake_get_success(url, **kwargs)
+
+    monkeypatch.setattr(httpx, "get", fake_get)
+    configure_rates_cache(60)
+    try:
+        get_rates(["BRL"])
+        rates = get_rates(["BRL", "USD"])
+    finally:
+        configure_rates_cache(0)
+
+    assert len(calls) == 1
+    assert float(rates["BRL"].values) == 5.0
+
+    get_rates(["BRL"])
+    assert len(calls) == 2
+
+
+@pytest.mark.unit
+def test_get_rates_with_static_provider():
+    provider = StaticRateProvider({"BRL": "5.5"})
+
+    rates = get_rates(["USD", "BRL", "EUR"], provider=provider)
+
+    assert float(rates["USD"].values) == 1
+    assert float(rates["BRL"].values) == 5.5
+    assert rates["EUR"].name == "Error"
+
+
+@pytest.mark.unit
+def test_static_provider_selected_by_settings(monkeypatch):
+    monkeypatch.setattr("dundie.utils.exchange.RATES_PROVIDER", "static")
+    monkeypatch.setattr("dundie.utils.exchange.RATES_STATIC", "brl=5.5, EUR=6")
+    set_rate_provider(None)
+    try:
+        provider = get_rate_provider()
+        rates = get_rates(["BRL", "EUR"])
+    finally:
+        set_rate_provider(None)
+
+    assert isinstance(provider, StaticRateProvider)
+    assert float(rates["BRL"].values) == 5.5
+    assert float(rates["EUR"].values) == 6
+
+
+@pytest.mark.unit
+def test_rate_provider_requires_get_rate():
+    class NoRates(RateProvider):
+        pass
+
+    with pytest.raises(TypeError):
+        NoRates()
+
+
+@pytest.mark.unit
+def test_save_snapshot_and_read_it_back(tmpdir, monkeypatch):
+    monkeypatch.setattr(httpx, "get", fake_get_success)
+    path = str(tmpdir.join("rates.json"))
+
+    save_snapshot(["USD", "BRL", "EUR"], path)
+    monkeypatch.setattr(httpx, "get", fake_get_failure)
+    rates = get_rates(["BRL", "EUR"], provider=SnapshotRateProvider(path))
+
+    assert rates["BRL"].name == "Dólar Americano/BRL"
+    assert float(rates["EUR"].values) == 5.0
+
+
+@pytest.mark.unit
+def test_save_snapshot_keeps_file_on_failure(tmpdir, monkeypatch):
+    monkeypatch.setattr(httpx, "get", fake_get_failure)
+    path = tmpdir.join("rates.json")
+    path.write("{}")
+
+    with pytest.raises(RuntimeError, match="Could not fetch rates for BRL"):
+        save_snapshot(["BRL"], str(path))
+
+    assert path.read() == "{}"
+
+
+@pytest.mark.unit
+def test_csv_snapshot_provider(tmpdir):
+    path = tmpdir.join("rates.csv")
+    path.write("currency,rate\nBRL,5.25\n")
+
+    rates = get_rates(["BRL"], provider=SnapshotRateProvider(str(path)))
+
+    assert float(rates["BRL"].values) == 5.25
+
+
+class FakeSessionCM:
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        return self.session
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pass
+
+
 @pytest.mark.unit
 def test_env_vars_not_found(monkeypatch):
     monkeypatch.delenv("DUNDIE_EMAIL", raising=False)
@@ -131,15 +301,8 @@ def test_env_vars_not_found(monkeypatch):
 
     fake_session.exec.return_value.first.return_value = object()
 
-    class FakeSessionCM:
-        def __enter__(self):
-            return fake_session
-
-        def __exit__(self, exc_type, exc_value, traceback):
-            pass
-
     monkeypatch.setattr(
-        "dundie.utils.auth.get_session", lambda: FakeSessionCM()
+        "dundie.database.get_session", lambda: FakeSessionCM(fake_session)
     )
 
     decorated_func = requires_auth(
@@ -158,33 +321,12 @@ def test_auth_user_not_found(monkeypatch):
     monkeypatch.setenv("DUNDIE_EMAIL", "test@test.com")
     monkeypatch.setenv("DUNDIE_PASSWORD", "1234")
 
-    fake_session_first = MagicMock()
-    fake_session_first.exec.return_value.first.return_value = object()
-
-    fake_session_second = MagicMock()
-    fake_session_second.exec.return_value.first.return_value = None
-
-    class FakeSessionCM:
-        def __init__(self, session):
-            self.session = session
-
-        def __enter__(self):
-            return self.session
-
-        def __exit__(self, exc_type, exc_value, traceback):
-            pass
-
-    call_count = 0
-
-    def fake_get_session():
-        nonlocal call_count
-        if call_count == 0:
-            call_count += 1
-            return FakeSessionCM(fake_session_first)
-        else:
-            return FakeSessionCM(fake_session_second)
+    fake_session = MagicMock()
+    fake_session.exec.return_value.first.side_effect = [object(), None]
 
-    monkeypatch.setattr("dundie.utils.auth.get_session", fake_get_session)
+    monkeypatch.setattr(
+        "dundie.database.get_session", lambda: FakeSessionCM(fake_session)
+    )
 
     decorated_func = requires_auth(
         lambda *args, **kwargs: kwargs.get("from_person")
@@ -204,36 +346,18 @@ def test_auth_incorrect_password(monkeypatch):
     class DummyPerson:
         user = DummyUser()
 
-    class FakeSessionCM:
-        def __init__(self, session):
-            self.session = session
-
-        def __enter__(self):
-            return self.session
-
-        def __exit__(self, exc_type, exc_value, traceback):
-            pass
-
-    call_count = 0
-
-    def fake_get_session():
-        nonlocal call_count
-        if call_count == 0:
-            call_count += 1
-            return FakeSessionCM(fake_session_first)
-        else:
-            return FakeSessionCM(fake_session_second)
-
     monkeypatch.setenv("DUNDIE_EMAIL", "test@test.com")
     monkeypatch.setenv("DUNDIE_PASSWORD", "1234")
 
-    fake_session_first = MagicMock()
-    fake_session_first.exec.return_value.first.return_value = object()
-
-    fake_session_second = MagicMock()
-    fake_session_second.exec.return_value.first.return_value = DummyPerson()
+    fake_session = MagicMock()
+    fake_session.exec.return_value.first.side_effect = [
+        object(),
+        DummyPerson(),
+    ]
 
-    monkeypatch.setattr("dundie.utils.auth.get_session", fake_get_session)
+    monkeypatch.setattr(
+        "dundie.database.get_session", lambda: FakeSessionCM(fake_session)
+    )
 
     monkeypatch.setattr(
         "dundie.utils.auth.verify_password", lambda pwd, db_pwd: False
@@ -247,3 +371,90 @@ def test_auth_incorrect_password(monkeypatch):
         decorated_func()
 
     assert "Authentication Error." in str(exc_info.value)
+
+
+@pytest.mark.unit
+def test_auth_rehashes_outdated_password(monkeypatch):
+    outdated = PasswordHash(
+        (Argon2Hasher(time_cost=2, memory_cost=8, parallelism=1),)
+    ).hash("1234")
+
+    with get_session() as session:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        person, _ = add_person(session, Person(**data), "1234")
+        person.user.password = outdated
+        session.commit()
+
+    monkeypatch.setenv("DUNDIE_EMAIL", "scott@dm.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "1234")
+    requires_auth(lambda from_person: None)()
+
+    with get_session() as session:
+        user = session.exec(select(User)).one()
+        assert user.password != outdated
+        assert not needs_rehash(user.password)
+        assert verify_password("1234", user.password)
+
+
+def add_outdated_manager():
+    outdated = PasswordHash(
+        (Argon2Hasher(time_cost=2, memory_cost=8, parallelism=1),)
+    ).hash("1234")
+
+    with get_session() as session:
+        data = {
+            "role": "Manager",
+            "dept": "Management",
+            "name": "Michael Scott",
+            "email": "scott@dm.com",
+        }
+        person, _ = add_person(session, Person(**data), "1234")
+        person.user.password = outdated
+        session.commit()
+    return outdated
+
+
+@pytest.mark.unit
+def test_auth_rehashes_in_a_write_transaction_of_its_own(monkeypatch):
+    add_outdated_manager()
+    monkeypatch.setenv("DUNDIE_EMAIL", "scott@dm.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "1234")
+    updates = []
+
+    def record(connection, cursor, statement, *args):
+        if statement.startswith("UPDATE user"):
+            options = connection.get_execution_options()
+            updates.append(bool(options.get(IMMEDIATE)))
+
+    event.listen(database.engine, "before_cursor_execute", record)
+    try:
+        read()
+    finally:
+        event.remove(database.engine, "before_cursor_execute", record)
+
+    assert updates == [True]
+
+
+@pytest.mark.unit
+def test_auth_goes_on_when_the_rehash_fails(monkeypatch):
+    outdated = add_outdated_manager()
+    monkeypatch.setenv("DUNDIE_EMAIL", "scott@dm.com")
+    monkeypatch.setenv("DUNDIE_PASSWORD", "1234")
+
+    def locked(user_id, password_hash):
+        raise OperationalError(
+            "UPDATE user", {}, sqlite3.OperationalError("database is locked")
+        )
+
+    monkeypatch.setattr("dundie.utils.auth._save_password", locked)
+
+    assert requires_auth(lambda from_person: from_person.email)() == (
+        "scott@dm.com"
+    )
+    with get_session() as session:
+        assert session.exec(select(User)).one().password == outdated